@@ -12,10 +12,33 @@ Notes:
 __all__ = [
     "config",
     "schema",
+    "records",
     "utils",
+    "checkpoint",
+    "store",
+    "bundle",
+    "scheduler",
+    "shard",
+    "watch",
+    "fingerprint",
+    "ratelimit",
+    "stages",
+    "parallel",
+    "plan",
     "llm",
+    "router",
+    "sections",
     "map_analyze",
+    "batch",
+    "batch_emulator",
+    "topk",
+    "topics",
     "reduce_analyze",
+    "network",
+    "cube",
+    "publish",
+    "related",
+    "columnar",
 ]
 
 
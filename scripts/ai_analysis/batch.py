@@ -0,0 +1,264 @@
+"""Batch mode for map prompts via an OpenAI-compatible batch API.
+
+For backfills, `run_batch` collects every pending map request of the given
+articles (`pending_map_prompts`: whole short articles, and the uncached
+sections of long ones). Each request is routed to a tier like a synchronous
+call would be. The requests of each tier are written to a JSONL job file
+under BATCH_DIR, uploaded to `/files` and submitted to `/batches`. The jobs
+are then polled until they finish.
+
+Valid replies are stored exactly where the synchronous path would store them:
+sections in the section cache, whole articles as the memoized `llm` stage.
+The normal analyze run that follows finds every LLM output cached, so
+assembly, the manifest and the reduce work unchanged. Anything missing,
+failed or invalid is simply still pending and goes through `call_routed`
+(with escalation) as usual.
+
+Submitted jobs are kept in `BATCH_DIR/jobs.json` until their results are
+ingested, so an interrupted run resumes polling instead of paying twice.
+Batch calls bypass the interactive rate limiter; they are recorded in the
+routing table with reason `batch`, the job's turnaround as latency and
+MODEL_PRICES x BATCH_PRICE_FACTOR as cost.
+
+`batch_emulator.py` serves the same endpoints locally for tests.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence
+from urllib.parse import urlparse
+
+import requests
+
+from .config import (
+    API_KEY,
+    BATCH_BASE_URL,
+    BATCH_COMPLETION_WINDOW,
+    BATCH_DIR,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_S,
+    BATCH_PRICE_FACTOR,
+    BATCH_TIMEOUT_S,
+    REQUEST_TIMEOUT_S,
+)
+from .llm import LlmError, parse_completion
+from .map_analyze import MAP_TEMPERATURE, MapPrompt, pending_map_prompts, store_map_result
+from .parallel import map_local
+from .router import TIERS, Tier, choose_tier, measure, record_attempt
+from .utils import retry_request, safe_load_json, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+JOBS_PATH = BATCH_DIR / "jobs.json"
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchClient:
+    """Minimal client for the `/files` and `/batches` endpoints under `base_url`."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        # Request lines name the endpoint by path, e.g. /v1/chat/completions
+        self.endpoint = f"{urlparse(self.base_url).path.rstrip('/')}/chat/completions"
+        self.headers = {"Authorization": f"Bearer {API_KEY}"} if API_KEY else {}
+
+    @retry_request()
+    def upload(self, path: Path) -> str:
+        with path.open("rb") as f:
+            resp = requests.post(
+                f"{self.base_url}/files",
+                headers=self.headers,
+                data={"purpose": "batch"},
+                files={"file": (path.name, f, "application/jsonl")},
+                timeout=REQUEST_TIMEOUT_S,
+            )
+        resp.raise_for_status()
+        return resp.json()["id"]
+
+    @retry_request()
+    def create(self, input_file_id: str) -> Dict:
+        resp = requests.post(
+            f"{self.base_url}/batches",
+            headers=self.headers,
+            json={
+                "input_file_id": input_file_id,
+                "endpoint": self.endpoint,
+                "completion_window": BATCH_COMPLETION_WINDOW,
+            },
+            timeout=REQUEST_TIMEOUT_S,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    @retry_request()
+    def get(self, batch_id: str) -> Dict:
+        resp = requests.get(f"{self.base_url}/batches/{batch_id}", headers=self.headers, timeout=REQUEST_TIMEOUT_S)
+        resp.raise_for_status()
+        return resp.json()
+
+    @retry_request()
+    def content(self, file_id: str) -> str:
+        resp = requests.get(
+            f"{self.base_url}/files/{file_id}/content", headers=self.headers, timeout=REQUEST_TIMEOUT_S
+        )
+        resp.raise_for_status()
+        return resp.text
+
+
+def _load_jobs() -> List[Dict]:
+    return (safe_load_json(JOBS_PATH) or {}).get("jobs", [])
+
+
+def _save_jobs(jobs: List[Dict]) -> None:
+    safe_write_json(JOBS_PATH, {"jobs": jobs})
+
+
+def _tier_of(job: Dict) -> Tier:
+    return Tier(job["tier"], job["model"], job["tier_base_url"])
+
+
+def _submit(prompts: Sequence[MapPrompt], jobs: List[Dict]) -> None:
+    """Write and submit one job per tier (and per BATCH_MAX_REQUESTS lines).
+
+    Each job is appended to `jobs` and saved as soon as it is created, so a
+    failure or interruption further on never loses a paid-for batch.
+    """
+    by_tier: Dict[Tier, List[MapPrompt]] = {}
+    for p in prompts:
+        index, _ = choose_tier(measure(p.text, p.key))
+        by_tier.setdefault(TIERS[index], []).append(p)
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for tier, group in by_tier.items():
+        client = BatchClient(BATCH_BASE_URL or tier.base_url)
+        part = 0
+        for start in range(0, len(group), max(1, BATCH_MAX_REQUESTS)):
+            lines = group[start : start + max(1, BATCH_MAX_REQUESTS)]
+            # A quick rerun may share the stamp: never overwrite a kept job's input
+            input_path = BATCH_DIR / f"{stamp}-{tier.name}-{part}.jsonl"
+            while input_path.exists():
+                part += 1
+                input_path = BATCH_DIR / f"{stamp}-{tier.name}-{part}.jsonl"
+            part += 1
+            input_path.parent.mkdir(parents=True, exist_ok=True)
+            with input_path.open("w", encoding="utf-8") as f:
+                for p in lines:
+                    body = {"model": tier.model, "messages": p.messages, "temperature": MAP_TEMPERATURE}
+                    request = {"custom_id": p.custom_id, "method": "POST", "url": client.endpoint, "body": body}
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            batch = client.create(client.upload(input_path))
+            jobs.append(
+                {
+                    "id": batch["id"],
+                    "base_url": client.base_url,
+                    "tier": tier.name,
+                    "model": tier.model,
+                    "tier_base_url": tier.base_url,
+                    "input": input_path.name,
+                    "submitted": time.time(),
+                    "custom_ids": [p.custom_id for p in lines],
+                }
+            )
+            _save_jobs(jobs)
+            logger.info(f"Submitted batch {batch['id']}: {len(lines)} {tier.name} requests ({input_path.name})")
+
+
+def _ingest(job: Dict, batch: Dict, prompts: Dict[str, MapPrompt]) -> Counter:
+    """Store the valid results of a finished job; returns outcome counts."""
+    client = BatchClient(job["base_url"])
+    tier = _tier_of(job)
+    latency = time.time() - job["submitted"]
+    stats: Counter = Counter()
+    answered = set()
+    outputs = []
+    for field in ("output_file_id", "error_file_id"):
+        if batch.get(field):
+            text = client.content(batch[field])
+            (BATCH_DIR / f"{Path(job['input']).stem}.{field.split('_')[0]}.jsonl").write_text(text, encoding="utf-8")
+            outputs.extend(line for line in text.splitlines() if line.strip())
+
+    for line in outputs:
+        result = json.loads(line)
+        prompt = prompts.get(result.get("custom_id"))
+        if prompt is None:
+            # The article changed (or was analyzed) since submission
+            stats["stale"] += 1
+            continue
+        answered.add(prompt.custom_id)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            stats["failed"] += 1
+            record_attempt(prompt.task, prompt.key, tier, "batch", "error", latency, {})
+            continue
+        try:
+            raw, usage = parse_completion(response.get("body") or {})
+        except LlmError:
+            stats["failed"] += 1
+            record_attempt(prompt.task, prompt.key, tier, "batch", "error", latency, {})
+            continue
+        try:
+            store_map_result(prompt, raw)
+        except Exception as e:  # noqa: BLE001
+            stats["invalid"] += 1
+            logger.warning(f"Invalid batch output for {prompt.custom_id}: {e}")
+            record_attempt(prompt.task, prompt.key, tier, "batch", "invalid", latency, usage, BATCH_PRICE_FACTOR)
+            continue
+        stats["ok"] += 1
+        record_attempt(prompt.task, prompt.key, tier, "batch", "ok", latency, usage, BATCH_PRICE_FACTOR)
+    # Requests still wanted that got no output line at all (stale ones are not wanted)
+    stats["missing"] += len({cid for cid in job["custom_ids"] if cid in prompts} - answered)
+    return stats
+
+
+def run_batch(
+    paths: Sequence[Path], poll_s: float = BATCH_POLL_S, timeout_s: float = BATCH_TIMEOUT_S
+) -> Dict[str, int]:
+    """Prefill the LLM caches of `paths` through batch jobs.
+
+    Returns counts of submitted requests and ingested outcomes (`ok`,
+    `invalid`, `failed`, `missing`, `stale`). Jobs still running after
+    `timeout_s` stay in jobs.json for the next run.
+    """
+    prompts: Dict[str, MapPrompt] = {}
+    for found in map_local(pending_map_prompts, paths):
+        for p in found:
+            prompts.setdefault(p.custom_id, p)
+
+    jobs = _load_jobs()
+    in_flight = {cid for job in jobs for cid in job["custom_ids"]}
+    fresh = [p for cid, p in prompts.items() if cid not in in_flight]
+    if jobs:
+        logger.info(f"Resuming {len(jobs)} submitted batch job(s)")
+    if fresh:
+        _submit(fresh, jobs)
+
+    stats: Counter = Counter(submitted=len(fresh))
+    deadline = time.monotonic() + timeout_s
+    while jobs:
+        for job in list(jobs):
+            batch = BatchClient(job["base_url"]).get(job["id"])
+            status = batch.get("status")
+            if status not in TERMINAL:
+                continue
+            if status != "completed":
+                logger.warning(f"Batch {job['id']} ended as {status}: {batch.get('errors')}")
+            stats.update(_ingest(job, batch, prompts))
+            jobs.remove(job)
+            _save_jobs(jobs)
+        if not jobs:
+            break
+        if time.monotonic() >= deadline:
+            logger.warning(f"{len(jobs)} batch job(s) still running; rerun to resume polling them")
+            break
+        time.sleep(poll_s)
+
+    logger.info(
+        f"Batch: {stats['submitted']} submitted, {stats['ok']} ingested, {stats['invalid']} invalid, "
+        f"{stats['failed']} failed, {stats['missing']} missing, {stats['stale']} stale"
+    )
+    return dict(stats)
@@ -0,0 +1,247 @@
+"""Local stand-in for an OpenAI-compatible batch API, for tests.
+
+Serves the endpoints `batch.py` uses, in memory:
+`POST /v1/files` (multipart upload), `POST /v1/batches`,
+`GET /v1/batches/{id}` and `GET /v1/files/{id}/content`.
+
+A batch reports `in_progress` until `delay` seconds after its creation, and
+is then answered line by line, with no network. Map prompts get a valid
+analysis built from their schema hint: keywords and concepts are the most
+frequent words and bigrams of the content, and title/date/tags are copied from
+the meta. Every other request gets `{}`. A `fail_rate` share of the lines
+(chosen by a hash of their custom_id, so reruns agree) gets non-JSON text, and
+the same share of the rest gets an HTTP 500 result, to exercise the invalid
+and failed paths.
+
+Usage:
+  python -m scripts.ai_analysis.batch_emulator [--port 8765] [--delay 2] [--fail-rate 0]
+  AI_BATCH_BASE_URL=http://127.0.0.1:8765/v1 python -m scripts.ai_analysis.run analyze --batch
+"""
+
+from __future__ import annotations
+
+import argparse
+import email.parser
+import email.policy
+import json
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields the pipeline sets itself (see _assemble_stage)
+_LOCAL_KEYS = ("id", "slug", "path", "md5", "metrics")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9+#.-]{2,}|[一-鿿]+")
+
+
+def _terms(text: str, n: int) -> List[str]:
+    counts: Counter = Counter()
+    for word in _WORD_RE.findall(text):
+        if word[0].isascii():
+            counts[word.lower()] += 1
+        else:
+            counts.update(word[i : i + 2] for i in range(len(word) - 1))
+    return [t for t, _ in counts.most_common(n)]
+
+
+def _fill(hint: Any, meta: Dict, content: str, name: str = "") -> Any:
+    """A value shaped like `hint`, filled deterministically from the request."""
+    if isinstance(hint, dict):
+        return {k: _fill(v, meta, content, k) for k, v in hint.items() if k not in _LOCAL_KEYS}
+    if name in ("title", "date", "tags") and meta.get(name) is not None:
+        return meta[name]
+    if isinstance(hint, list):
+        if name == "keywords":
+            return _terms(content, 8)
+        if name == "concepts":
+            return _terms(content, 12)[8:] or _terms(content, 4)
+        return []
+    if hint == "float":
+        return 0.5 if name != "score" else 0.0
+    if hint == "int":
+        return 0
+    if name == "label":
+        return "neutral"
+    return ""
+
+
+def respond(body: Dict) -> str:
+    """Reply content for one chat completion request body."""
+    try:
+        payload = json.loads(body["messages"][-1]["content"])
+        hint = payload["json_schema_hint"]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return "{}"
+    return json.dumps(_fill(hint, payload.get("meta") or {}, str(payload.get("content", ""))), ensure_ascii=False)
+
+
+class Emulator:
+    """In-memory files and batches."""
+
+    def __init__(self, delay: float = 0.0, fail_rate: float = 0.0) -> None:
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.lock = threading.RLock()
+
+    def add_file(self, data: bytes) -> Dict:
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "purpose": "batch"}
+
+    def create_batch(self, request: Dict) -> Tuple[int, Dict]:
+        if request.get("input_file_id") not in self.files:
+            return 404, {"error": {"message": "input file not found"}}
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get("endpoint"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window"),
+            "status": "in_progress",
+            "created_at": time.time(),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        return 200, batch
+
+    def _bucket(self, custom_id: str, salt: str) -> bool:
+        return zlib.crc32(f"{salt}:{custom_id}".encode("utf-8")) % 1000 < self.fail_rate * 1000
+
+    def _run(self, batch: Dict) -> None:
+        out, err = [], []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            req = json.loads(line)
+            cid = req.get("custom_id")
+            if self._bucket(cid, "error"):
+                err.append(
+                    {
+                        "id": f"resp_{cid}",
+                        "custom_id": cid,
+                        "response": {"status_code": 500, "body": {}},
+                        "error": {"message": "emulated failure"},
+                    }
+                )
+                continue
+            content = "not json" if self._bucket(cid, "invalid") else respond(req.get("body") or {})
+            messages = (req.get("body") or {}).get("messages") or []
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages)
+            body = {
+                "id": f"chatcmpl-{cid}",
+                "object": "chat.completion",
+                "model": (req.get("body") or {}).get("model"),
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content),
+                    "total_tokens": prompt_tokens + len(content),
+                },
+            }
+            response = {"status_code": 200, "body": body}
+            out.append({"id": f"resp_{cid}", "custom_id": cid, "response": response, "error": None})
+        for field, rows in (("output_file_id", out), ("error_file_id", err)):
+            if rows:
+                data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+                batch[field] = self.add_file(data)["id"]
+        batch["request_counts"] = {"total": len(out) + len(err), "completed": len(out), "failed": len(err)}
+        batch["status"] = "completed"
+        batch["completed_at"] = time.time()
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+            if batch and batch["status"] == "in_progress" and time.time() - batch["created_at"] >= self.delay:
+                self._run(batch)
+            return dict(batch) if batch else None
+
+
+def _parse_multipart(content_type: str, data: bytes) -> Dict[str, bytes]:
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + data
+    )
+    return {
+        part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+        for part in message.iter_parts()
+    }
+
+
+def _handler(emulator: Emulator):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Any, raw: bool = False) -> None:
+            data = payload if raw else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self) -> None:  # noqa: N802
+            path = self.path.rstrip("/")
+            if path.endswith("/files"):
+                parts = _parse_multipart(self.headers.get("Content-Type", ""), self._body())
+                if "file" not in parts:
+                    return self._send(400, {"error": {"message": "missing file"}})
+                return self._send(200, emulator.add_file(parts["file"]))
+            if path.endswith("/batches"):
+                return self._send(*emulator.create_batch(json.loads(self._body() or b"{}")))
+            self._send(404, {"error": {"message": f"unknown endpoint {self.path}"}})
+
+        def do_GET(self) -> None:  # noqa: N802
+            parts = self.path.rstrip("/").split("/")
+            if len(parts) >= 2 and parts[-2] == "batches":
+                batch = emulator.get_batch(parts[-1])
+                return self._send(200, batch) if batch else self._send(404, {"error": {"message": "no such batch"}})
+            if len(parts) >= 3 and parts[-1] == "content" and parts[-3] == "files":
+                data = emulator.files.get(parts[-2])
+                if data is None:
+                    return self._send(404, {"error": {"message": "no such file"}})
+                return self._send(200, data, raw=True)
+            self._send(404, {"error": {"message": f"unknown endpoint {self.path}"}})
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            pass
+
+    return Handler
+
+
+def serve(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the emulator on a background thread; its base URL is
+    `http://127.0.0.1:{server.server_port}/v1`. Stop it with `server.shutdown()`."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), _handler(Emulator(delay, fail_rate)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible batch API emulator")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds before a batch completes")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of invalid and of failed lines")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _handler(Emulator(args.delay, args.fail_rate)))
+    print(f"Batch emulator on http://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
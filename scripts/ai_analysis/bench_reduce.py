@@ -0,0 +1,136 @@
+"""Peak-memory benchmark for the streaming reduce.
+
+Builds synthetic caches of increasing size from the real cached analyses.
+Each copy gets a unique id, path and date, plus Zipf-distributed extra
+keywords and concepts, so the bounded counters have to prune. Each size is
+then published by `publish_global` (no LLM: `name_topics=False`) in a fresh
+child process, which reports its peak RSS above the RSS it had once the list
+of input paths was built. Flat numbers across sizes mean that the reduce
+itself does not grow with the corpus.
+
+Usage:
+  python -m scripts.ai_analysis.bench_reduce [--sizes 36,1000,10000,100000] [--keep DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .config import CACHE_DIR, MANIFEST_PATH
+from .utils import md5_hash_text, safe_load_json
+
+VOCABULARY = 50_000
+
+
+def _templates() -> List[Dict]:
+    manifest = safe_load_json(MANIFEST_PATH) or {}
+    out = [js for js in (safe_load_json(CACHE_DIR / e) for e in manifest.get("latest", {}).values()) if js]
+    if not out:
+        raise SystemExit("No cached analyses to build the synthetic corpus from")
+    return out
+
+
+def _zipf_term(rng: random.Random, prefix: str) -> str:
+    return f"{prefix}{int(rng.paretovariate(1.1)) % VOCABULARY}"
+
+
+def build_corpus(size: int, root: Path, seed: int = 0) -> List[Path]:
+    """Write `size` synthetic analyses under `root` and return their paths."""
+    rng = random.Random(seed)
+    templates = _templates()
+    files = []
+    for i in range(size):
+        js = dict(templates[i % len(templates)])
+        year, month, day = 2010 + i % 16, 1 + (i // 16) % 12, 1 + i % 28
+        slug = f"{year}-{month:02d}-{day:02d}-bench-{i}"
+        js["id"] = slug
+        js["path"] = f"src/content/blog/{slug}.md"
+        js["date"] = f"{year}-{month:02d}-{day:02d}"
+        js["md5"] = md5_hash_text(slug)
+        content = dict(js.get("content") or {})
+        content["keywords"] = list(content.get("keywords") or [])[:5] + [_zipf_term(rng, "kw") for _ in range(5)]
+        content["concepts"] = list(content.get("concepts") or [])[:4] + [_zipf_term(rng, "c") for _ in range(4)]
+        js["content"] = content
+        cf = root / js["md5"][:2] / f"{js['md5']}.json"
+        cf.parent.mkdir(parents=True, exist_ok=True)
+        cf.write_text(json.dumps(js, ensure_ascii=False), encoding="utf-8")
+        files.append(cf)
+    return files
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(root: Path) -> None:
+    """Publish the corpus under `root` and print one JSON line of measurements."""
+    from .publish import publish_global
+
+    files = sorted(root.glob("*/*.json"))
+    # The path list is the input (O(N) by nature); growth is measured past it
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    publish_global(files, name_topics=False, output=root / "global.json", summary_output=root / "summary.json")
+    print(
+        json.dumps(
+            {
+                "articles": len(files),
+                "seconds": round(time.perf_counter() - start, 2),
+                "baseline_mb": round(baseline, 1),
+                "peak_mb": round(_peak_rss_mb(), 1),
+                "output_mb": round((root / "global.json").stat().st_size / 2**20, 1),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Peak RSS of the streaming reduce by corpus size")
+    parser.add_argument("--sizes", default="36,1000,10000", help="comma-separated corpus sizes")
+    parser.add_argument("--keep", type=Path, help="keep the synthetic corpora under this directory")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child)
+        return
+
+    rows = []
+    base = args.keep or Path(tempfile.mkdtemp(prefix="bench-reduce-"))
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            root = base / str(size)
+            if not root.exists():
+                build_corpus(size, root)
+            proc = subprocess.run(
+                [sys.executable, "-m", __spec__.name, "--child", str(root)],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    finally:
+        if args.keep is None:
+            shutil.rmtree(base, ignore_errors=True)
+
+    print(f"{'articles':>9} {'seconds':>8} {'inputs MB':>10} {'peak MB':>8} {'reduce MB':>10} {'output MB':>10}")
+    for r in rows:
+        print(
+            f"{r['articles']:>9} {r['seconds']:>8} {r['baseline_mb']:>10} {r['peak_mb']:>8} "
+            f"{r['peak_mb'] - r['baseline_mb']:>10.1f} {r['output_mb']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
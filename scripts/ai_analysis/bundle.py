@@ -0,0 +1,137 @@
+"""Export/import of the analysis cache as one integrity-checked bundle.
+
+The bundle is a gzip-compressed tar with:
+- `index.json`: format version plus the SHA-256 of every other member
+- `manifest.json`: the (relative-keyed) manifest
+- `cache/...`: every cache file (article objects, sections, reduce memo)
+
+Import verifies every member against the index before writing anything, and
+only fills entries that are missing locally. A fresh CI runner can restore the
+bundle and rebuild without a single network call.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, Tuple
+
+from .config import CACHE_DIR
+from .store import normalize_manifest
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 1
+
+
+class BundleError(Exception):
+    pass
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _cache_files() -> Iterator[Tuple[str, Path]]:
+    for p in sorted(CACHE_DIR.rglob("*.json")):
+        if p.name.startswith("."):
+            continue  # in-flight temp files
+        yield p.relative_to(CACHE_DIR).as_posix(), p
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0  # reproducible bundles
+    tar.addfile(info, io.BytesIO(data))
+
+
+def export_bundle(bundle_path: Path, manifest: Dict) -> Dict[str, int]:
+    """Pack manifest and cache into `bundle_path`. Returns simple stats."""
+    members: Dict[str, bytes] = {"manifest.json": json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")}
+    for rel, p in _cache_files():
+        members[f"cache/{rel}"] = p.read_bytes()
+    index = {
+        "version": BUNDLE_VERSION,
+        "files": {name: _sha256(data) for name, data in members.items()},
+    }
+
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = bundle_path.with_name(f".{bundle_path.name}.tmp")
+    with tarfile.open(tmp, "w:gz", compresslevel=9) as tar:
+        _add_bytes(tar, "index.json", json.dumps(index, indent=2).encode("utf-8"))
+        for name, data in members.items():
+            _add_bytes(tar, name, data)
+    os.replace(tmp, bundle_path)
+
+    raw_size = sum(len(d) for d in members.values())
+    logger.info(
+        f"Exported {len(members) - 1} cache files to {bundle_path} "
+        f"({raw_size} -> {bundle_path.stat().st_size} bytes, sha256={_sha256(bundle_path.read_bytes())})"
+    )
+    return {"files": len(members) - 1, "bytes": bundle_path.stat().st_size}
+
+
+def _safe_member_name(name: str) -> bool:
+    parts = PurePosixPath(name).parts
+    return bool(parts) and not PurePosixPath(name).is_absolute() and ".." not in parts
+
+
+def _read_verified(bundle_path: Path) -> Tuple[Dict, Dict[str, bytes]]:
+    """Read the whole bundle and verify it against its index."""
+    try:
+        with tarfile.open(bundle_path, "r:gz") as tar:
+            data: Dict[str, bytes] = {}
+            for member in tar.getmembers():
+                if not member.isfile() or not _safe_member_name(member.name):
+                    raise BundleError(f"Unexpected bundle member: {member.name}")
+                f = tar.extractfile(member)
+                data[member.name] = f.read() if f else b""
+    except (tarfile.TarError, OSError, EOFError) as e:
+        raise BundleError(f"Cannot read bundle {bundle_path}: {e}") from e
+
+    if "index.json" not in data:
+        raise BundleError("Bundle has no index.json")
+    index = json.loads(data.pop("index.json"))
+    if index.get("version") != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle version: {index.get('version')}")
+    expected = index.get("files") or {}
+    if set(expected) != set(data):
+        raise BundleError("Bundle members do not match its index")
+    for name, blob in data.items():
+        if _sha256(blob) != expected[name]:
+            raise BundleError(f"Checksum mismatch for {name}")
+    return index, data
+
+
+def import_bundle(bundle_path: Path, manifest: Dict) -> Dict[str, int]:
+    """Restore cache files and merge manifest entries missing locally."""
+    _, data = _read_verified(bundle_path)
+
+    written = 0
+    for name, blob in data.items():
+        if not name.startswith("cache/"):
+            continue
+        target = CACHE_DIR / name[len("cache/") :]
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, target)
+        written += 1
+
+    merged = 0
+    imported = normalize_manifest(json.loads(data.get("manifest.json", b"{}") or b"{}"))
+    for section in ("latest", "fingerprints"):
+        for key, value in (imported.get(section) or {}).items():
+            if key not in manifest[section]:
+                manifest[section][key] = value
+                merged += section == "latest"
+    logger.info(f"Imported {written} cache files and {merged} manifest entries from {bundle_path}")
+    return {"files": written, "entries": merged}
@@ -0,0 +1,131 @@
+"""Crash-safe run state: manifest journal and resumable task list.
+
+Every finished article is appended (and fsynced) to a JSONL journal as soon as
+its cache file is written. Loading the manifest replays the journal, so a run
+that dies half-way still points at every analysis it paid for. The planned
+task list is kept next to it so `--resume` can pick up exactly the unfinished
+tasks without rescanning the tree.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .store import article_path, normalize_manifest, relative_key
+from .utils import safe_load_json, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+
+def empty_manifest() -> Dict:
+    return {"latest": {}, "history": [], "fingerprints": {}}
+
+
+class Journal:
+    """Append-only log of manifest updates made since the last commit."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, entry: Dict) -> None:
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        out: List[Dict] = []
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            try:
+                out.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-write is simply dropped
+                logger.warning(f"Skipping corrupt journal line in {self.path.name}")
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+
+
+def apply_entry(manifest: Dict, entry: Dict) -> None:
+    manifest["latest"][entry["path"]] = entry["cache"]
+    if entry.get("fingerprint"):
+        manifest["fingerprints"][entry["path"]] = entry["fingerprint"]
+    if entry.get("analyzed"):
+        manifest["history"].append({"path": entry["path"], "md5": entry["md5"]})
+
+
+def load_manifest(manifest_path: Path, journal: Journal) -> Dict:
+    """Load the committed manifest and replay uncommitted journal entries."""
+    manifest = safe_load_json(manifest_path) or empty_manifest()
+    for key, value in empty_manifest().items():
+        manifest.setdefault(key, value)
+    normalize_manifest(manifest)
+    replayed = journal.entries()
+    for entry in replayed:
+        apply_entry(manifest, entry)
+    if replayed:
+        logger.info(f"Recovered {len(replayed)} completed articles from journal")
+    return manifest
+
+
+def commit_manifest(
+    manifest_path: Path, manifest: Dict, journal: Journal, run_state: Optional["RunState"] = None
+) -> None:
+    """Atomically persist the manifest, then drop the folded-in journal.
+
+    `run_state` first forgets the tasks the journal shows as finished, since
+    the journal can no longer tell `--resume` about them afterwards.
+    """
+    safe_write_json(manifest_path, manifest)
+    if run_state is not None:
+        run_state.drop_finished(journal)
+    journal.clear()
+
+
+class RunState:
+    """Planned task list of the current (or last interrupted) run."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def save(self, tasks: List[Path]) -> None:
+        safe_write_json(self.path, {"tasks": [relative_key(t) for t in tasks]})
+
+    def load(self) -> Optional[List[Path]]:
+        js = safe_load_json(self.path)
+        if not js:
+            return None
+        return [article_path(t) for t in js.get("tasks", [])]
+
+    def pending(self, journal: Journal) -> Optional[List[Path]]:
+        tasks = self.load()
+        if tasks is None:
+            return None
+        done: Set[str] = {e["path"] for e in journal.entries() if e.get("analyzed")}
+        return [t for t in tasks if relative_key(t) not in done]
+
+    def drop_finished(self, journal: Journal) -> None:
+        """Keep only the tasks not finished in `journal`; clear when none are left."""
+        pending = self.pending(journal)
+        if pending is None:
+            return
+        if pending:
+            self.save(pending)
+        else:
+            self.clear()
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
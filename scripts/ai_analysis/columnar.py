@@ -0,0 +1,191 @@
+"""Columnar analytics export of per-article analyses.
+
+Flattens cached ArticleAnalysis payloads into typed columns and writes them as
+Parquet with dictionary-encoded strings. Ad-hoc questions ("tone over time",
+"depth by tag") then become vectorized group-bys over a few columns instead of
+walking the nested `perArticle` JSON.
+
+Requires the optional `pyarrow` dependency.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import ANALYTICS_PATH
+from .records import TONE_KEYS
+from .reduce_analyze import categorize_sentiment
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pc = pq = None
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEYS: Tuple[str, ...] = ("1-10", "11-20", "21-30", "30+")
+
+# Low-cardinality string columns stored as categoricals
+CATEGORICAL_COLUMNS: Tuple[str, ...] = (
+    "month",
+    "sentiment_label",
+    "sentiment_category",
+    "structure_pattern",
+    "depth",
+)
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for columnar export: pip install pyarrow")
+
+
+def _parse_date(value) -> Optional[datetime.date]:
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _flatten(js: Dict) -> Dict:
+    metrics = js.get("metrics") or {}
+    buckets = metrics.get("sentenceLenBuckets") or {}
+    readability = metrics.get("readability") or {}
+    tone = (js.get("style") or {}).get("tone") or {}
+    content = js.get("content") or {}
+    sentiment = js.get("sentiment") or {}
+    date = _parse_date(js.get("date"))
+
+    row = {
+        "id": js.get("id"),
+        "slug": js.get("slug"),
+        "title": js.get("title"),
+        "path": js.get("path"),
+        "md5": js.get("md5"),
+        "date": date,
+        "year": date.year if date else None,
+        "month": date.strftime("%Y-%m") if date else None,
+        "tags": [t for t in js.get("tags") or [] if t],
+        "keywords": [k for k in content.get("keywords") or [] if k],
+        "concepts": [c for c in content.get("concepts") or [] if c],
+        "sentence_avg_len": metrics.get("sentenceAvgLen"),
+        "chars": readability.get("chars"),
+        "paragraphs": readability.get("paragraphs"),
+        "sentiment_label": sentiment.get("label"),
+        "sentiment_category": categorize_sentiment(sentiment.get("label")),
+        "sentiment_score": sentiment.get("score"),
+        "structure_pattern": (js.get("structure") or {}).get("pattern"),
+        "depth": js.get("depth"),
+    }
+    for k in TONE_KEYS:
+        row[f"tone_{k}"] = tone.get(k)
+    for k in BUCKET_KEYS:
+        row[f"len_{k.replace('-', '_').replace('+', 'plus')}"] = buckets.get(k)
+    return row
+
+
+def _schema() -> "pa.Schema":
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        pa.field("id", pa.string()),
+        pa.field("slug", pa.string()),
+        pa.field("title", pa.string()),
+        pa.field("path", pa.string()),
+        pa.field("md5", pa.string()),
+        pa.field("date", pa.date32()),
+        pa.field("year", pa.int16()),
+        pa.field("tags", pa.list_(pa.string())),
+        pa.field("keywords", pa.list_(pa.string())),
+        pa.field("concepts", pa.list_(pa.string())),
+        pa.field("sentence_avg_len", pa.float32()),
+        pa.field("chars", pa.int32()),
+        pa.field("paragraphs", pa.int32()),
+        pa.field("sentiment_score", pa.float32()),
+    ]
+    fields += [pa.field(f"tone_{k}", pa.float32()) for k in TONE_KEYS]
+    fields += [
+        pa.field(f"len_{k.replace('-', '_').replace('+', 'plus')}", pa.int32())
+        for k in BUCKET_KEYS
+    ]
+    fields += [pa.field(c, categorical) for c in CATEGORICAL_COLUMNS]
+    return pa.schema(fields)
+
+
+def build_table(payloads: Iterable[Dict]) -> "pa.Table":
+    """Flatten analysis dicts into a typed Arrow table."""
+    _require_pyarrow()
+    schema = _schema()
+    columns: Dict[str, List] = {f.name: [] for f in schema}
+    for js in payloads:
+        row = _flatten(js)
+        for name, values in columns.items():
+            values.append(row.get(name))
+
+    arrays = []
+    for f in schema:
+        if pa.types.is_dictionary(f.type):
+            arrays.append(pa.array(columns[f.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[f.name], type=f.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def export_columnar(payloads: Iterable[Dict], out_path: Path = ANALYTICS_PATH) -> int:
+    """Write per-article analyses to Parquet. Returns the number of rows."""
+    table = build_table(payloads)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    pq.write_table(table, tmp, compression="zstd", use_dictionary=True)
+    tmp.replace(out_path)
+    logger.info(
+        f"Columnar export: {table.num_rows} rows, {out_path.stat().st_size} bytes -> {out_path}"
+    )
+    return table.num_rows
+
+
+def load_table(path: Path = ANALYTICS_PATH, columns: Optional[Sequence[str]] = None) -> "pa.Table":
+    _require_pyarrow()
+    return pq.read_table(path, columns=list(columns) if columns else None)
+
+
+def explode(table: "pa.Table", column: str, alias: Optional[str] = None) -> "pa.Table":
+    """Turn a list column (tags/keywords/concepts) into one row per element."""
+    parents = pc.list_parent_indices(table[column])
+    values = pc.list_flatten(table[column])
+    out = table.drop_columns([column]).take(parents)
+    return out.append_column(alias or column, values)
+
+
+def aggregate(
+    by: Sequence[str],
+    metrics: Sequence[Tuple[str, str]],
+    path: Path = ANALYTICS_PATH,
+) -> Dict[str, List]:
+    """Vectorized group-by over the exported columns.
+
+    `by` may include "tag", "keyword" or "concept" to group by list elements.
+    `metrics` are (column, function) pairs understood by Arrow, e.g.
+    ("tone_reflective", "mean") or ("id", "count").
+
+    Example: aggregate(["year"], [("tone_reflective", "mean"), ("id", "count")])
+    """
+    exploded = {"tag": "tags", "keyword": "keywords", "concept": "concepts"}
+    needed = {exploded.get(c, c) for c in by} | {m for m, _ in metrics}
+    table = load_table(path, columns=sorted(needed))
+    for alias, column in exploded.items():
+        if alias in by:
+            table = explode(table, column, alias)
+    # Group keys are decoded so results come back as plain values
+    for name in by:
+        if pa.types.is_dictionary(table.schema.field(name).type):
+            idx = table.schema.get_field_index(name)
+            table = table.set_column(idx, name, pc.cast(table[name], pa.string()))
+    result = table.group_by(list(by)).aggregate(list(metrics))
+    return result.sort_by([(c, "ascending") for c in by]).to_pydict()
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 
 
@@ -21,22 +21,170 @@ API_KEY: Optional[str] = os.getenv("API_KEY")
 REQUEST_TIMEOUT_S: int = int(os.getenv("AI_REQUEST_TIMEOUT_S", "500"))
 MAX_RETRIES: int = int(os.getenv("AI_MAX_RETRIES", "3"))
 
+# Shared rate limits per model, enforced across processes (see ratelimit.py).
+# Defaults apply to every model; AI_RATE_LIMITS="model=RPM/TPM;..." overrides.
+# 0 disables a bucket. Buckets refill at HEADROOM x the limit.
+RATE_LIMIT_RPM = int(os.getenv("AI_RATE_LIMIT_RPM", "60"))
+RATE_LIMIT_TPM = int(os.getenv("AI_RATE_LIMIT_TPM", "200000"))
+RATE_LIMIT_HEADROOM = float(os.getenv("AI_RATE_LIMIT_HEADROOM", "0.9"))
+# Output budget assumed when a request sets no max_tokens
+RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv("AI_RATE_LIMIT_OUTPUT_TOKENS", "1024"))
+
 # IO paths (adjusted for location under project_root/scripts/ai_analysis)
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../blog
 CONTENT_BLOG_DIR = PROJECT_ROOT / "src" / "content" / "blog"
 
 AI_DIR = PROJECT_ROOT / "scripts" / "ai_analysis"
 CACHE_DIR = AI_DIR / "cache"
+SECTION_CACHE_DIR = CACHE_DIR / "sections"
+REDUCE_CACHE_DIR = CACHE_DIR / "reduce"
+# Memoized per-article stage outputs, keyed by hash(inputs, stage version)
+STAGE_CACHE_DIR = CACHE_DIR / "stages"
+SHARD_DIR = CACHE_DIR / "shards"
+# Cover image prompts, keyed by body MD5 (generate_cover_image.py)
+COVER_CACHE_DIR = CACHE_DIR / "covers"
 MANIFEST_PATH = AI_DIR / "manifest.json"
+# Crash-safety: completed-article journal and the planned task list of a run
+JOURNAL_PATH = AI_DIR / "manifest.journal"
+RUN_STATE_PATH = AI_DIR / "run_state.json"
+
+# Rate limiter state shared by all processes on this machine
+RATE_LIMIT_DB = AI_DIR / "ratelimit.sqlite"
+# Batch jobs (see batch.py): JSONL inputs/outputs and the in-flight job list
+BATCH_DIR = AI_DIR / "batch"
+# Model routing decisions and per-tier latency/cost (see router.py)
+ROUTING_DB = AI_DIR / "routing.sqlite"
+
+# Portable cache bundle (export/import) for CI artifact caching
+BUNDLE_PATH = AI_DIR / "cache-bundle.tar.gz"
 
 PUBLIC_DATA_DIR = PROJECT_ROOT / "public" / "data"
 OUTPUT_GLOBAL = PUBLIC_DATA_DIR / "blog-analysis.json"
+# Summary only (pre-aggregated chart data) for the About page
+OUTPUT_SUMMARY = PUBLIC_DATA_DIR / "blog-summary.json"
+# Related posts (related.py): published index and its incremental state
+RELATED_PATH = PUBLIC_DATA_DIR / "related.json"
+RELATED_STATE_PATH = AI_DIR / "related_state.npz"
+
+# Columnar analytics export (Parquet, requires pyarrow)
+ANALYTICS_PATH = AI_DIR / "analytics" / "articles.parquet"
+
+# Near-duplicate reuse: minimum estimated Jaccard similarity (MinHash) between
+# the analyzed and the current body to reuse the old analysis. 0 disables.
+REUSE_SIMILARITY = float(os.getenv("AI_REUSE_SIMILARITY", "0.92"))
+
+# Bodies at least this long are analyzed and cached per top-level section
+SECTION_MIN_CHARS = int(os.getenv("AI_SECTION_MIN_CHARS", "4000"))
+
+# Watch mode: quiet time before local metrics refresh / before the LLM run
+WATCH_DEBOUNCE_S = float(os.getenv("AI_WATCH_DEBOUNCE_S", "0.5"))
+WATCH_SETTLE_S = float(os.getenv("AI_WATCH_SETTLE_S", "20"))
+
+# Map task order (comma-separated policies, see scheduler.py) and progressive
+# publication of the global output during long runs. 0 disables a trigger.
+PRIORITY = os.getenv("AI_PRIORITY", "missing,newest,recent")
+PUBLISH_EVERY = int(os.getenv("AI_PUBLISH_EVERY", "10"))
+PUBLISH_INTERVAL_S = float(os.getenv("AI_PUBLISH_INTERVAL_S", "120"))
+
+# Process pool for CPU-bound local work (planning, record loading), kept
+# apart from the LLM I/O threads. Items are sent in chunks of LOCAL_CHUNK.
+LOCAL_WORKERS = int(os.getenv("AI_LOCAL_WORKERS", str(os.cpu_count() or 1)))
+LOCAL_CHUNK = int(os.getenv("AI_LOCAL_CHUNK", "16"))
 
 # Clustering parameters
 NUM_TOPICS = int(os.getenv("AI_NUM_TOPICS", "4"))  # 3-5 recommended
 
+# Topic naming tree reduce: articles per leaf prompt, candidate lists merged
+# per call on higher levels, and concurrent calls per level
+TOPIC_BATCH_SIZE = int(os.getenv("AI_TOPIC_BATCH_SIZE", "20"))
+TOPIC_MERGE_FANIN = int(os.getenv("AI_TOPIC_MERGE_FANIN", "6"))
+TOPIC_WORKERS = int(os.getenv("AI_TOPIC_WORKERS", "4"))
+
+# Aggregate cube (cube.py): tags kept as their own column, the rest is "其他"
+CUBE_MAX_TAGS = int(os.getenv("AI_CUBE_MAX_TAGS", "12"))
+
+# Streaming reduce: keys kept per bounded counter (keywords, tags, concepts,
+# structures) and per concept-pair counter, independent of the article count
+STREAM_TOP_CAPACITY = int(os.getenv("AI_STREAM_TOP_CAPACITY", "5000"))
+STREAM_PAIR_CAPACITY = int(os.getenv("AI_STREAM_PAIR_CAPACITY", "100000"))
+
+# Concept network size: node cap and per-node edge budget
+CONCEPT_MAX_NODES = int(os.getenv("AI_CONCEPT_MAX_NODES", "80"))
+CONCEPT_TOP_K = int(os.getenv("AI_CONCEPT_TOP_K", "3"))
+
+# Related posts: neighbors per article, hashed feature dimensions, rows per
+# similarity block, and the corpus size from which LSH replaces exact scoring
+RELATED_K = int(os.getenv("AI_RELATED_K", "5"))
+RELATED_DIM = int(os.getenv("AI_RELATED_DIM", "4096"))
+RELATED_BLOCK = int(os.getenv("AI_RELATED_BLOCK", "512"))
+RELATED_LSH_MIN = int(os.getenv("AI_RELATED_LSH_MIN", "3000"))
+
+# Model tiers for map prompts, cheapest first (see router.py).
+# AI_MODEL_TIERS="fast=deepseek-chat;strong=deepseek-reasoner@https://host/v1"
+# AI_MODEL_PRICES="model=IN/OUT;..." in USD per 1M input/output tokens.
+STRONG_MODEL: str = os.getenv("AI_STRONG_MODEL", "deepseek-reasoner")
+# Tasks at or above these go straight to the strong tier: body characters,
+# share of Latin letters among letters, and earlier invalid outputs
+ROUTE_LONG_CHARS = int(os.getenv("AI_ROUTE_LONG_CHARS", "12000"))
+ROUTE_LATIN_RATIO = float(os.getenv("AI_ROUTE_LATIN_RATIO", "0.5"))
+ROUTE_MAX_FAILURES = int(os.getenv("AI_ROUTE_MAX_FAILURES", "1"))
+
+# Batch mode (run.py analyze --batch) against an OpenAI-compatible /files +
+# /batches API. AI_BATCH_BASE_URL sends every job to one endpoint (e.g. the
+# local emulator) instead of each tier's own base URL. PRICE_FACTOR scales
+# MODEL_PRICES for batch calls, which providers usually bill at a discount.
+BATCH_BASE_URL: Optional[str] = os.getenv("AI_BATCH_BASE_URL") or None
+BATCH_POLL_S = float(os.getenv("AI_BATCH_POLL_S", "30"))
+BATCH_TIMEOUT_S = float(os.getenv("AI_BATCH_TIMEOUT_S", str(25 * 3600)))
+BATCH_MAX_REQUESTS = int(os.getenv("AI_BATCH_MAX_REQUESTS", "50000"))
+BATCH_COMPLETION_WINDOW = os.getenv("AI_BATCH_COMPLETION_WINDOW", "24h")
+BATCH_PRICE_FACTOR = float(os.getenv("AI_BATCH_PRICE_FACTOR", "0.5"))
+
+
+def _parse_rate_limits(value: str) -> Dict[str, Tuple[int, int]]:
+    limits: Dict[str, Tuple[int, int]] = {}
+    for item in value.split(";"):
+        model, sep, spec = item.partition("=")
+        rpm, _, tpm = spec.partition("/")
+        if sep and rpm.strip().isdigit() and (not tpm.strip() or tpm.strip().isdigit()):
+            limits[model.strip()] = (int(rpm), int(tpm or 0))
+    return limits
+
+
+RATE_LIMITS: Dict[str, Tuple[int, int]] = _parse_rate_limits(os.getenv("AI_RATE_LIMITS", ""))
+
+
+def _parse_model_tiers(value: str) -> List[Tuple[str, str, str]]:
+    tiers: List[Tuple[str, str, str]] = []
+    for item in value.split(";"):
+        name, sep, spec = item.partition("=")
+        model, _, base_url = spec.partition("@")
+        if sep and name.strip() and model.strip():
+            tiers.append((name.strip(), model.strip(), base_url.strip() or BASE_URL))
+    return tiers
+
+
+def _parse_model_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    prices: Dict[str, Tuple[float, float]] = {}
+    for item in value.split(";"):
+        model, sep, spec = item.partition("=")
+        price_in, _, price_out = spec.partition("/")
+        try:
+            prices[model.strip()] = (float(price_in), float(price_out or price_in))
+        except ValueError:
+            continue
+    return prices
+
+
+MODEL_TIERS: List[Tuple[str, str, str]] = _parse_model_tiers(
+    os.getenv("AI_MODEL_TIERS", f"fast={TEXT_MODEL};strong={STRONG_MODEL}")
+)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = _parse_model_prices(
+    os.getenv("AI_MODEL_PRICES", "deepseek-chat=0.27/1.10;deepseek-reasoner=0.55/2.19")
+)
+
 # Ensure directories exist at import time (safe operation)
-for p in (CACHE_DIR, PUBLIC_DATA_DIR):
+for p in (CACHE_DIR, SECTION_CACHE_DIR, PUBLIC_DATA_DIR):
     try:
         p.mkdir(parents=True, exist_ok=True)
     except Exception:
@@ -0,0 +1,137 @@
+"""Aggregate cube over topic × period × tag for the About page charts.
+
+Every article gets a topic index, a year/month and its (top) tags. The cube
+cells are dense numpy arrays, filled one article at a time by `CubeBuilder`
+once the axes are known, and emitted as nested lists. Their size depends on
+the number of topics, periods and tags, never on the article count, so the
+browser renders pre-aggregated numbers instead of grouping raw articles.
+
+Layout (`Summary.cube`):
+- axes: `topics` (plus "其他" for unassigned articles), `years`, `months`
+  (contiguous), `tags` (top CUBE_MAX_TAGS plus "其他"), `toneKeys`,
+  `sentimentKeys`
+- `articles[topic][year]`: article counts
+- `tagCounts[topic][year][tag]`: an article counts once for each of its tags
+- `monthCounts[topic][month]`: article counts
+- `tone[topic][year][k]`: mean tone score, null without data
+- `sentiment[topic][year][k]`: article counts per sentiment category
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .config import CUBE_MAX_TAGS
+from .records import TONE_KEYS, ArticleRecord
+
+OTHER = "其他"
+
+_DATE_RE = re.compile(r"(\d{4})-(\d{2})-\d{2}")
+
+
+def article_month(a: ArticleRecord) -> Optional[str]:
+    """`YYYY-MM` from the analysis date, else from the date prefix of the path."""
+    parts = a.path.rsplit("/", 2)
+    slug = parts[-2] if a.path.lower().endswith("/index.md") and len(parts) > 1 else parts[-1]
+    for value in (a.date or "", slug):
+        m = _DATE_RE.match(str(value))
+        if m:
+            return f"{m.group(1)}-{m.group(2)}"
+    return None
+
+
+def _month_range(first: str, last: str) -> List[str]:
+    y, m = int(first[:4]), int(first[5:7])
+    out = []
+    while f"{y:04d}-{m:02d}" <= last:
+        out.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _means(sums: np.ndarray, counts: np.ndarray) -> List:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.round(sums / counts, 3)
+    return np.where(counts > 0, means, np.nan).tolist()
+
+
+def _nulls(values):
+    """NaN -> None, recursively, for JSON."""
+    if isinstance(values, list):
+        return [_nulls(v) for v in values]
+    return None if isinstance(values, float) and values != values else values
+
+
+class CubeBuilder:
+    """Fill the cube one article at a time once the axes are known.
+
+    The streaming reduce learns the months and tag frequencies in its first
+    pass and adds articles in the second, so memory depends on the axes
+    only. An "其他" topic row collects unassigned articles and is dropped
+    again when it stays empty.
+    """
+
+    def __init__(
+        self,
+        topic_names: Sequence[str],
+        months: Iterable[str],
+        tag_freq: Counter,
+        sentiment_keys: Sequence[str],
+    ) -> None:
+        dated = sorted(months)
+        self.topics = list(topic_names) + [OTHER]
+        self.months = _month_range(dated[0], dated[-1]) if dated else []
+        self.years = sorted({m[:4] for m in dated})
+        self.month_pos = {m: i for i, m in enumerate(self.months)}
+        self.year_pos = {y: i for i, y in enumerate(self.years)}
+        # Tags: keep the most frequent ones, fold the rest (and untagged) into OTHER
+        tags = [t for t, _ in tag_freq.most_common(CUBE_MAX_TAGS)]
+        self.tag_pos = {t: i for i, t in enumerate(tags)}
+        self.tags = tags + [OTHER]
+        self.sentiment_keys = list(sentiment_keys)
+
+        T, Y, M, K = len(self.topics), len(self.years), len(self.months), len(TONE_KEYS)
+        self.article_counts = np.zeros((T, Y), dtype=np.int64)
+        self.month_counts = np.zeros((T, M), dtype=np.int64)
+        self.tag_counts = np.zeros((T, Y, len(self.tags)), dtype=np.int64)
+        self.tone_sums = np.zeros((T, Y, K))
+        self.tone_counts = np.zeros((T, Y, K))
+        self.sentiment = np.zeros((T, Y, len(self.sentiment_keys)), dtype=np.int64)
+
+    def add(self, a: ArticleRecord, topic: int, sentiment: int) -> None:
+        """Add one article; `topic` -1 is unassigned, `sentiment` -1 unknown."""
+        month = article_month(a)
+        if month is None:
+            return
+        t = topic if topic >= 0 else len(self.topics) - 1
+        y, m = self.year_pos[month[:4]], self.month_pos[month]
+        self.article_counts[t, y] += 1
+        self.month_counts[t, m] += 1
+        found = {self.tag_pos[g] for g in a.tags if g in self.tag_pos} or {len(self.tags) - 1}
+        self.tag_counts[t, y, sorted(found)] += 1
+        tone = np.array([np.nan if v is None else v for v in a.tone], dtype=np.float64)
+        self.tone_sums[t, y] += np.nan_to_num(tone)
+        self.tone_counts[t, y] += ~np.isnan(tone)
+        if sentiment >= 0:
+            self.sentiment[t, y, sentiment] += 1
+
+    def result(self) -> Dict:
+        # The OTHER topic row only stays when some article is unassigned
+        rows = slice(None) if self.article_counts[-1].any() else slice(0, len(self.topics) - 1)
+        return {
+            "topics": self.topics[rows],
+            "years": self.years,
+            "months": self.months,
+            "tags": self.tags,
+            "toneKeys": list(TONE_KEYS),
+            "sentimentKeys": self.sentiment_keys,
+            "articles": self.article_counts[rows].tolist(),
+            "tagCounts": self.tag_counts[rows].tolist(),
+            "monthCounts": self.month_counts[rows].tolist(),
+            "tone": _nulls(_means(self.tone_sums[rows], self.tone_counts[rows])),
+            "sentiment": self.sentiment[rows].tolist(),
+        }
@@ -0,0 +1,88 @@
+"""Near-duplicate fingerprints for article bodies.
+
+The cache is keyed by the MD5 of the raw body, so a typo fix or a new image URL
+would normally trigger a full LLM re-analysis. Two cheaper checks run first:
+
+1) A normalized fingerprint (image URLs dropped, whitespace collapsed, case
+   folded). Equal fingerprints mean the edit is purely cosmetic.
+2) A MinHash signature over character shingles, whose agreement rate
+   estimates the Jaccard similarity between the old and new body.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+
+_rng = np.random.default_rng(20240819)
+# Odd multipliers keep (x ^ a) * b a bijection on uint64
+_PERM_XOR = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+_PERM_MUL = _rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_HTML_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_body(text: str) -> str:
+    text = _IMAGE_RE.sub(r"![\1]()", text)
+    text = _HTML_IMG_RE.sub("<img>", text)
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def normalized_md5(text: str) -> str:
+    return hashlib.md5(normalize_body(text).encode("utf-8")).hexdigest()
+
+
+def _shingle_hashes(norm: str) -> np.ndarray:
+    if len(norm) <= SHINGLE_SIZE:
+        shingles = {norm}
+    else:
+        shingles = {norm[i : i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash(text: str) -> str:
+    """Return a MinHash signature of the normalized body as a hex string."""
+    hashes = _shingle_hashes(normalize_body(text))
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] ^ _PERM_XOR[None, :]) * _PERM_MUL[None, :]
+    # 32 bits per slot are plenty for similarity estimation and halve the size
+    return (permuted.min(axis=0) >> np.uint64(32)).astype("<u4").tobytes().hex()
+
+
+def similarity(sig_a: str, sig_b: str) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    a = np.frombuffer(bytes.fromhex(sig_a), dtype="<u4")
+    b = np.frombuffer(bytes.fromhex(sig_b), dtype="<u4")
+    if a.shape != b.shape or a.size == 0:
+        return 0.0
+    return float(np.mean(a == b))
+
+
+def fingerprint(text: str, body_md5: str) -> Dict[str, str]:
+    return {"md5": body_md5, "norm": normalized_md5(text), "minhash": minhash(text)}
+
+
+def is_near_duplicate(previous: Optional[Dict[str, str]], text: str, threshold: float) -> bool:
+    """True when `text` is close enough to the analyzed version to reuse it."""
+    if not previous:
+        return False
+    if previous.get("norm") == normalized_md5(text):
+        return True
+    if not previous.get("minhash"):
+        return False
+    return similarity(previous["minhash"], minhash(text)) >= threshold
@@ -7,12 +7,14 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import List, Literal, Optional
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Tuple
 
 import requests
 
 from .config import BASE_URL, API_KEY, REQUEST_TIMEOUT_S, TEXT_MODEL
-from .utils import retry_request
+from .ratelimit import estimate_tokens, limiter_for, retry_after_seconds
+from .utils import md5_hash_text, retry_request, safe_load_json, safe_write_json
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +25,41 @@ class LlmError(Exception):
     pass
 
 
+def parse_completion(result: Dict) -> Tuple[str, Dict]:
+    """(content without code fences, usage) of a chat completion response body."""
+    try:
+        content = result["choices"][0]["message"]["content"].strip()
+        finish_reason = result["choices"][0].get("finish_reason")
+        
+        # Extract JSON from markdown code blocks if present
+        if content.startswith("```"):
+            logger.debug("Removing markdown code block markers")
+            lines = content.split("\n")
+            # Remove first line if it starts with ```
+            if lines and lines[0].startswith("```"):
+                lines = lines[1:]
+            # Remove last line if it's just ```
+            if lines and lines[-1].strip() == "```":
+                lines = lines[:-1]
+            content = "\n".join(lines).strip()
+        
+        logger.debug(f"LLM response: {len(content)} chars, finish_reason={finish_reason}")
+        if finish_reason == "length":
+            logger.warning("LLM response was truncated (finish_reason=length)")
+        
+        return content, result.get("usage") or {}
+    except Exception as e:  # noqa: BLE001
+        raise LlmError(f"Unexpected LLM response: {json.dumps(result)[:500]}") from e
+
+
 @retry_request()
-def call_llm(
+def call_llm_usage(
     messages: List[dict],
     model: Optional[str] = None,
     temperature: float = 0.7,
-) -> str:
+    base_url: Optional[str] = None,
+) -> Tuple[str, Dict]:
+    """Chat completion; returns (content, usage as reported by the API)."""
     if not API_KEY:
         raise LlmError("API_KEY not set in environment")
 
@@ -42,38 +73,54 @@ def call_llm(
         "temperature": temperature,
     }
 
+    base_url = base_url or BASE_URL
     logger.debug(f"LLM call: model={model or TEXT_MODEL}")
+    # Shared with other processes (e.g. cover generation) hitting the same quota
+    limiter = limiter_for(base_url, data["model"])
+    estimated = estimate_tokens(messages)
+    limiter.acquire(estimated)
     resp = requests.post(
-        f"{BASE_URL}/chat/completions",
+        f"{base_url}/chat/completions",
         headers=headers,
         json=data,
         timeout=REQUEST_TIMEOUT_S,
     )
+    if resp.status_code == 429:
+        limiter.pause(retry_after_seconds(resp.headers))
     resp.raise_for_status()
     result = resp.json()
-    
-    try:
-        content = result["choices"][0]["message"]["content"].strip()
-        finish_reason = result["choices"][0].get("finish_reason")
-        
-        # Extract JSON from markdown code blocks if present
-        if content.startswith("```"):
-            logger.debug("Removing markdown code block markers")
-            lines = content.split("\n")
-            # Remove first line if it starts with ```
-            if lines and lines[0].startswith("```"):
-                lines = lines[1:]
-            # Remove last line if it's just ```
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]
-            content = "\n".join(lines).strip()
-        
-        logger.debug(f"LLM response: {len(content)} chars, finish_reason={finish_reason}")
-        if finish_reason == "length":
-            logger.warning("LLM response was truncated (finish_reason=length)")
-        
-        return content
-    except Exception as e:  # noqa: BLE001
-        raise LlmError(f"Unexpected LLM response: {json.dumps(result)[:500]}") from e
+    usage = result.get("usage") or {}
+    limiter.settle(estimated, usage.get("total_tokens"))
+    return parse_completion(result)
+
+
+def call_llm(
+    messages: List[dict],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    base_url: Optional[str] = None,
+) -> str:
+    return call_llm_usage(messages, model=model, temperature=temperature, base_url=base_url)[0]
+
+
+def call_llm_cached(
+    messages: List[dict],
+    cache_dir: Path,
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+) -> str:
+    """call_llm memoized on disk by a hash of the full request.
 
+    Lets cache-warm rebuilds (e.g. CI after a bundle import) run without network.
+    """
+    request = {"model": model or TEXT_MODEL, "messages": messages, "temperature": temperature}
+    key = md5_hash_text(json.dumps(request, ensure_ascii=False, sort_keys=True))
+    cache_file = cache_dir / key[:2] / f"{key}.json"
+    cached = safe_load_json(cache_file)
+    if cached and "content" in cached:
+        logger.debug(f"LLM cache hit: {key}")
+        return cached["content"]
+    content = call_llm(messages, model=model, temperature=temperature)
+    safe_write_json(cache_file, {"content": content})
+    return content
 
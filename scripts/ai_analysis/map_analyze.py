@@ -1,12 +1,18 @@
 """Map stage: analyze a single article to structured JSON using LLM + jieba.
 
-Steps:
-1) Parse frontmatter and body
-2) Compute MD5 for cache key
-3) Extract basic metrics (sentence lengths, readability proxies)
-4) Use jieba for top words as hints
-5) Prompt LLM to produce structured JSON (ArticleAnalysis)
-6) Validate with pydantic, fallback to minimal structure on failure
+The per-article work is a small stage DAG (stages.py), each stage memoized by
+hash(inputs, stage version):
+- sources: `ident` (id, path), `meta` (title, date, tags) and the body
+- `metrics`: deterministic local metrics (sentence lengths, readability proxies)
+- `llm`: prompt the LLM for structured JSON (style, sentiment, topics, ...)
+- `analysis`: fill defaults, add local fields, validate with pydantic
+
+Bumping METRICS_VERSION recomputes metrics for every article without an LLM
+call; bumping PROMPT_VERSION re-runs only the LLM stage.
+
+Long articles (>= SECTION_MIN_CHARS) are analyzed per top-level section.
+Section results are cached by section MD5 and merged, so an edited post only
+re-sends the sections that changed.
 """
 
 from __future__ import annotations
@@ -14,13 +20,19 @@ from __future__ import annotations
 import json
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-from .llm import call_llm
-from .schema import ArticleAnalysis
+from .config import SECTION_CACHE_DIR, SECTION_MIN_CHARS
+from .router import call_routed
+from .schema import ArticleAnalysis, SectionAnalysis
+from .sections import Section, merge_section_analyses, split_sections
+from .stages import Pipeline, Stage, source_keys
+from .store import article_id, relative_key
 from .utils import (
     md5_hash_text,
     parse_frontmatter_and_body,
+    safe_load_json,
+    safe_write_json,
     sentence_length_buckets,
     sentence_lengths,
 )
@@ -28,6 +40,54 @@ from .utils import (
 logger = logging.getLogger(__name__)
 
 
+# Stage versions (see stages.py). Bumping one recomputes that stage and
+# everything downstream of it, for every article, on the next run.
+METRICS_VERSION = 1  # compute_metrics
+PROMPT_VERSION = 1  # map prompts and schema hints; re-runs the LLM stage
+ASSEMBLE_VERSION = 1  # defaults and validation of the final analysis
+
+MAP_TEMPERATURE = 0.5
+
+
+class IncompleteAnalysis(Exception):
+    """The model gave no valid output for the article or one of its sections.
+
+    Raised from the LLM stage so that nothing is memoized or published; valid
+    sections are already in the section cache and are not re-sent.
+    """
+
+# Analysis fields that do not come from the LLM stage
+_LOCAL_FIELDS = ("id", "path", "md5", "metrics", "stages")
+
+SCHEMA_HINT = {
+    "id": "str",
+    "title": "str",
+    "date": "str",
+    "tags": ["str"],
+    "slug": "str",
+    "path": "str",
+    "md5": "str",
+    "metrics": {
+        "sentenceAvgLen": "float",
+        "sentenceLenBuckets": {"1-10": "int", "11-20": "int", "21-30": "int", "30+": "int"},
+        "readability": {"chars": "int", "words": "int", "paragraphs": "int"},
+    },
+    "style": {"tone": {"teaching": "float", "reflective": "float", "humor": "float", "critical": "float"}, "rhythm": "str", "tropes": ["str"]},
+    "content": {"keywords": ["str"], "concepts": ["str"]},
+    "sentiment": {"label": "str", "score": "float"},
+    "structure": {"pattern": "str", "opening": "str", "closing": "str"},
+    "depth": "str",
+}
+
+SECTION_SCHEMA_HINT = {
+    "style": {"tone": {"teaching": "float", "reflective": "float", "humor": "float", "critical": "float"}, "rhythm": "str", "tropes": ["str"]},
+    "content": {"keywords": ["str"], "concepts": ["str"]},
+    "sentiment": {"label": "str", "score": "float"},
+    "structure": {"pattern": "str", "opening": "str", "closing": "str"},
+    "depth": "str",
+}
+
+
 def _build_map_prompt(meta: Dict, content: str, schema_hint: Dict) -> List[dict]:
     system_prompt = (
         "你是一个精确的文学和技术风格分析师。 给定一个中文博客文章块和元数据，生成符合模式的严格的 JSON。 不要包含解释。只输出 JSON，回复内容必须使用中文。下面是我的内容: "
@@ -43,88 +103,278 @@ def _build_map_prompt(meta: Dict, content: str, schema_hint: Dict) -> List[dict]
     ]
 
 
-def analyze_single_article(path: Path) -> ArticleAnalysis:
-    logger.info(f"Analyzing article: {path.name}")
-    meta, body = parse_frontmatter_and_body(path)
-    article_id = path.stem
-    title = meta.get("title", article_id)
-    date = meta.get("pubDate") or meta.get("date")
+def compute_metrics(body: str) -> Dict:
+    """Deterministic local metrics; no LLM involved."""
+    lens = sentence_lengths(body)
+    avg_len = round(sum(lens) / max(1, len(lens)), 2) if lens else 0.0
+    return {
+        "sentenceAvgLen": avg_len,
+        "sentenceLenBuckets": sentence_length_buckets(lens),
+        "readability": {
+            "chars": len(body),
+            "words": len(body),
+            "paragraphs": len(body.splitlines()),
+        },
+    }
+
+
+class MapPrompt(NamedTuple):
+    """One pending map request, sent on its own or as a line of a batch job."""
+
+    custom_id: str
+    task: str  # "article" or "section"
+    key: str  # MD5 of `text`, for routing
+    text: str
+    messages: List[dict]
+    target: str  # section cache file name, or the article's llm stage key
+
+
+def _section_cache_file(section: Section) -> Path:
+    # Version 1 keeps the original section cache names
+    suffix = "" if PROMPT_VERSION == 1 else f".v{PROMPT_VERSION}"
+    return SECTION_CACHE_DIR / f"{section.md5}{suffix}.json"
+
+
+def _section_prompt(meta: Dict, section: Section, index: int, total: int) -> List[dict]:
+    section_meta = dict(meta)
+    section_meta["section"] = {"heading": section.heading, "index": index + 1, "total": total}
+    return _build_map_prompt(section_meta, section.text, SECTION_SCHEMA_HINT)
+
+
+def _parse_section(raw: str) -> Dict:
+    return SectionAnalysis(**json.loads(raw)).model_dump()
+
+
+def _analyze_section(
+    meta: Dict, section: Section, index: int, total: int
+) -> Tuple[Optional[Dict], bool]:
+    """Analyze one section, served from the section cache when unchanged.
+
+    Returns (analysis or None, whether it came from cache).
+    """
+    cache_file = _section_cache_file(section)
+    cached = safe_load_json(cache_file)
+    if cached:
+        return cached, True
+
+    analysis = call_routed(
+        "section",
+        section.md5,
+        _section_prompt(meta, section, index, total),
+        section.text,
+        _parse_section,
+        temperature=MAP_TEMPERATURE,
+    )
+    if analysis is None:
+        # Not cached; the article fails and the section is retried next run,
+        # starting on a stronger tier
+        logger.warning(f"Failed to parse section JSON ({section.heading or 'preamble'})")
+        return None, False
+    safe_write_json(cache_file, analysis)
+    return analysis, False
+
+
+def _analyze_by_sections(meta: Dict, sections: List[Section]) -> Dict:
+    """Analyze a long article per section and merge the results.
+
+    Every section is attempted, so valid ones are cached, but any invalid
+    section raises IncompleteAnalysis instead of returning a partial merge.
+    """
+    parts: List[Dict] = []
+    weights: List[int] = []
+    fresh = 0
+    failed = 0
+    for i, section in enumerate(sections):
+        part, cached = _analyze_section(meta, section, i, len(sections))
+        fresh += 0 if cached else 1
+        if part is None:
+            failed += 1
+            continue
+        parts.append(part)
+        weights.append(section.chars)
+    logger.info(
+        f"Section analysis: {len(sections)} sections, {len(sections) - fresh} from cache, {fresh} sent to LLM"
+    )
+    if failed:
+        raise IncompleteAnalysis(f"{failed}/{len(sections)} sections returned no valid analysis")
+    return merge_section_analyses(parts, weights)
+
+
+def _parse_article(raw: str) -> Dict:
+    """Parse a whole-article reply; raises when its LLM fields do not validate."""
+    parsed = json.loads(raw)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"expected a JSON object, got {type(parsed).__name__}")
+    SectionAnalysis(**{k: v for k, v in parsed.items() if k in SectionAnalysis.model_fields})
+    return parsed
+
+
+def _by_sections(body: str, sections: List[Section]) -> bool:
+    return len(body) >= SECTION_MIN_CHARS and len(sections) > 1
+
+
+def _llm_stage(meta: Dict, body: str) -> Dict:
+    """LLM stage: raw analysis fields, per section for long articles."""
+    sections = split_sections(body)
+    if _by_sections(body, sections):
+        parsed_data = _analyze_by_sections(meta, sections)
+        parsed_data["sections"] = [s.md5 for s in sections]
+        return parsed_data
+
+    messages = _build_map_prompt(meta, body, SCHEMA_HINT)
+    parsed = call_routed("article", md5_hash_text(body), messages, body, _parse_article, temperature=MAP_TEMPERATURE)
+    if parsed is None:
+        # Raised rather than memoized, so the article is retried next run
+        raise IncompleteAnalysis("no valid LLM JSON on any model tier")
+    return parsed
+
+
+def _assemble_stage(ident: Dict, meta: Dict, body: str, llm: Dict, metrics: Dict) -> Dict:
+    """Final stage: defaults, local fields and validation."""
+    parsed_data = dict(llm)
+    parsed_data.setdefault("title", meta["title"])
+    parsed_data.setdefault("date", meta["date"])
+    parsed_data.setdefault("tags", meta["tags"])
+    parsed_data.setdefault("slug", ident["id"])
+    # Identity and metrics are local facts, never taken from the model
+    parsed_data["id"] = ident["id"]
+    parsed_data["path"] = ident["path"]
+    parsed_data["md5"] = md5_hash_text(body)
+    parsed_data["metrics"] = metrics
+    return ArticleAnalysis(**parsed_data).model_dump()
+
+
+ARTICLE_PIPELINE = Pipeline(
+    [
+        Stage("metrics", METRICS_VERSION, ("body",), compute_metrics, memo=False),
+        Stage("llm", PROMPT_VERSION, ("meta", "body"), _llm_stage),
+        # Published as the content-addressed cache object, so not memoized here
+        Stage("analysis", ASSEMBLE_VERSION, ("ident", "meta", "body", "llm", "metrics"), _assemble_stage, memo=False),
+    ]
+)
+
+
+def article_sources(path: Path, meta: Dict, body: str) -> Dict:
+    """Source values of the article pipeline."""
+    name = article_id(path)
     tags = []
     if meta.get("tags"):
         # naive split for simple frontmatter lists
         tags = [t.strip().strip("- ") for t in str(meta["tags"]).split("\n") if t.strip()]
+    return {
+        "ident": {"id": name, "path": relative_key(path)},
+        "meta": {"title": meta.get("title", name), "date": meta.get("pubDate") or meta.get("date"), "tags": tags},
+        "body": body,
+    }
 
-    content_md5 = md5_hash_text(body)
 
-    lens = sentence_lengths(body)
-    avg_len = round(sum(lens) / max(1, len(lens)), 2) if lens else 0.0
-    buckets = sentence_length_buckets(lens)
-
-    schema_hint = {
-        "id": "str",
-        "title": "str",
-        "date": "str",
-        "tags": ["str"],
-        "slug": "str",
-        "path": "str",
-        "md5": "str",
-        "metrics": {
-            "sentenceAvgLen": "float",
-            "sentenceLenBuckets": {"1-10": "int", "11-20": "int", "21-30": "int", "30+": "int"},
-            "readability": {"chars": "int", "words": "int", "paragraphs": "int"},
-        },
-        "style": {"tone": {"teaching": "float", "reflective": "float", "humor": "float", "critical": "float"}, "rhythm": "str", "tropes": ["str"]},
-        "content": {"keywords": ["str"], "concepts": ["str"]},
-        "sentiment": {"label": "str", "score": "float"},
-        "structure": {"pattern": "str", "opening": "str", "closing": "str"},
-        "depth": "str",
-    }
+def _llm_fields(cached: Dict) -> Dict:
+    return {k: v for k, v in cached.items() if k not in _LOCAL_FIELDS}
 
-    messages = _build_map_prompt(
-        {
-            "id": article_id,
-            "title": title,
-            "date": date,
-            "tags": tags,
-            "path": str(path),
-        },
-        body,
-        schema_hint,
-    )
-    raw = call_llm(messages, temperature=0.5)
-    
-    # Parse LLM response
-    try:
-        parsed_data = json.loads(raw)
-    except Exception as e:
-        logger.warning(f"Failed to parse LLM JSON: {e} {raw}")
-        # Fallback to minimal data
-        parsed_data = {}
-
-    # Fill required fields with defaults
-    parsed_data.setdefault("id", article_id)
-    parsed_data.setdefault("title", title)
-    parsed_data.setdefault("date", date)
-    parsed_data.setdefault("tags", tags)
-    parsed_data.setdefault("slug", article_id)
-    parsed_data.setdefault("path", str(path))
-    parsed_data["md5"] = content_md5
-    
-    # Fill metrics if missing
-    if "metrics" not in parsed_data or not parsed_data["metrics"]:
-        parsed_data["metrics"] = {}
-    parsed_data["metrics"].setdefault("sentenceAvgLen", avg_len)
-    parsed_data["metrics"].setdefault("sentenceLenBuckets", buckets)
-    parsed_data["metrics"].setdefault("readability", {
-        "chars": len(body), 
-        "words": len(body), 
-        "paragraphs": len(body.splitlines())
-    })
-
-
-    result = ArticleAnalysis(**parsed_data)
-    logger.info(f"Successfully analyzed: {title}")
-    return result
 
+def _run_pipeline(sources: Dict, keys: Dict[str, str], force: bool = False) -> Dict:
+    analysis, _ = ARTICLE_PIPELINE.run(sources, "analysis", keys, force=force)
+    analysis["stages"] = keys
+    return analysis
+
+
+def update_cached_analysis(
+    cached: Dict, path: Path, meta: Dict, body: str, dry_run: bool = False
+) -> Optional[Dict]:
+    """Bring the cached analysis of this exact body up to the current stage versions.
+
+    Returns `cached` itself when it is current, a locally recomputed analysis
+    when only local stages changed, or None when the LLM stage has to run.
+    Analyses written before stages existed are adopted as output of the
+    current LLM stage. With `dry_run` nothing is seeded or memoized, and a
+    copy of `cached` stands in for the analysis that would be recomputed.
+    """
+    sources = article_sources(path, meta, body)
+    keys = ARTICLE_PIPELINE.keys(source_keys(sources))
+    stamps = cached.get("stages") or {}
+    if stamps.get("analysis") == keys["analysis"]:
+        return cached
+    adoptable = not stamps or stamps.get("llm") == keys["llm"]
+    if dry_run:
+        if adoptable or "llm" not in ARTICLE_PIPELINE.pending("analysis", keys):
+            return dict(cached)
+        return None
+    if adoptable:
+        ARTICLE_PIPELINE.seed("llm", keys, _llm_fields(cached))
+    if "llm" in ARTICLE_PIPELINE.pending("analysis", keys):
+        return None
+    return _run_pipeline(sources, keys)
+
+
+def refresh_cached_analysis(cached: Dict, path: Path, body: str) -> Optional[Dict]:
+    """Reuse a previous analysis for a near-identical body.
+
+    The LLM stage output of the previous body is carried over to the new one
+    and the local stages are recomputed. Returns None if the previous analysis
+    came from an older LLM stage version (or different metadata).
+    """
+    meta, _ = parse_frontmatter_and_body(path)
+    sources = article_sources(path, meta, body)
+    ids = source_keys(sources)
+    stamps = cached.get("stages")
+    if stamps and stamps.get("llm") != ARTICLE_PIPELINE.keys({**ids, "body": cached.get("md5", "")})["llm"]:
+        return None
+    keys = ARTICLE_PIPELINE.keys(ids)
+    ARTICLE_PIPELINE.seed("llm", keys, _llm_fields(cached))
+    return _run_pipeline(sources, keys)
 
 
+def pending_map_prompts(path: Path) -> List[MapPrompt]:
+    """Map requests still needed before `path` can be analyzed without the LLM.
+
+    Empty when its LLM stage is memoized. Long articles list only their
+    uncached sections.
+    """
+    meta, body = parse_frontmatter_and_body(path)
+    sources = article_sources(path, meta, body)
+    keys = ARTICLE_PIPELINE.keys(source_keys(sources))
+    if "llm" not in ARTICLE_PIPELINE.pending("analysis", keys):
+        return []
+    meta = sources["meta"]
+    sections = split_sections(body)
+    if not _by_sections(body, sections):
+        messages = _build_map_prompt(meta, body, SCHEMA_HINT)
+        return [MapPrompt(f"article-{keys['llm']}", "article", md5_hash_text(body), body, messages, keys["llm"])]
+    prompts = []
+    for i, section in enumerate(sections):
+        cache_file = _section_cache_file(section)
+        if not cache_file.exists():
+            messages = _section_prompt(meta, section, i, len(sections))
+            prompts.append(
+                MapPrompt(f"section-{cache_file.stem}", "section", section.md5, section.text, messages, cache_file.name)
+            )
+    return prompts
+
+
+def store_map_result(prompt: MapPrompt, raw: str) -> None:
+    """Validate a reply to `prompt` and cache it where the pipeline will look.
+
+    Raises when the reply does not parse or validate; nothing is stored then.
+    """
+    if prompt.task == "section":
+        safe_write_json(SECTION_CACHE_DIR / prompt.target, _parse_section(raw))
+    else:
+        ARTICLE_PIPELINE.seed("llm", {"llm": prompt.target}, _parse_article(raw))
+
+
+def analyze_single_article(path: Path, force: bool = False) -> ArticleAnalysis:
+    """Analyze one article; `force` ignores the stage memos and the section cache."""
+    meta, body = parse_frontmatter_and_body(path)
+    sources = article_sources(path, meta, body)
+    keys = ARTICLE_PIPELINE.keys(source_keys(sources))
+    if force:
+        pending = list(ARTICLE_PIPELINE.stages)
+        # The LLM stage reads finished sections from their own cache
+        for section in split_sections(body):
+            _section_cache_file(section).unlink(missing_ok=True)
+    else:
+        pending = ARTICLE_PIPELINE.pending("analysis", keys)
+    logger.info(f"Analyzing article: {path.name} (stages: {', '.join(pending)})")
+    result = ArticleAnalysis(**_run_pipeline(sources, keys, force))
+    logger.info(f"Successfully analyzed: {result.title}")
+    return result
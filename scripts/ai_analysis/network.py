@@ -0,0 +1,132 @@
+"""Corpus-level concept co-occurrence network.
+
+Concepts co-occur when they appear in the same article. Pair counts are kept
+sparse (only observed pairs), weighted by normalized PMI, pruned to the top-k
+edges per node and capped to the most frequent concepts. Node positions and
+community ids are computed offline so the front-end can render the graph with
+`layout: 'none'` instead of simulating forces in the browser.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+
+import networkx as nx
+
+from .config import CONCEPT_MAX_NODES, CONCEPT_TOP_K
+from .schema import ConceptLink, ConceptNode
+
+logger = logging.getLogger(__name__)
+
+# Layout is deterministic so reruns do not reshuffle the graph
+LAYOUT_SEED = 42
+LAYOUT_SCALE = 1000.0
+
+
+def npmi(pair_count: int, count_a: int, count_b: int, num_docs: int) -> float:
+    """Normalized pointwise mutual information in [-1, 1]."""
+    if pair_count <= 0 or num_docs <= 0:
+        return -1.0
+    p_ab = pair_count / num_docs
+    if p_ab >= 1.0:
+        return 1.0
+    pmi = math.log(p_ab / ((count_a / num_docs) * (count_b / num_docs)))
+    return pmi / -math.log(p_ab)
+
+
+def _select_nodes(node_df: Counter, max_nodes: int) -> List[str]:
+    # Most frequent first, name as a stable tie-breaker
+    ranked = sorted(node_df.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [k for k, _ in ranked[:max_nodes]]
+
+
+def _prune_top_k(
+    weighted: Dict[Tuple[str, str], float], top_k: int
+) -> Dict[Tuple[str, str], float]:
+    """Keep an edge if it is among the top-k edges of either endpoint."""
+    per_node: Dict[str, List[Tuple[float, Tuple[str, str]]]] = {}
+    for key, w in weighted.items():
+        for n in key:
+            per_node.setdefault(n, []).append((w, key))
+    kept = set()
+    for edges in per_node.values():
+        edges.sort(key=lambda e: (-e[0], e[1]))
+        kept.update(key for _, key in edges[:top_k])
+    return {k: weighted[k] for k in kept}
+
+
+def _layout(
+    nodes: List[str], edges: Dict[Tuple[str, str], float]
+) -> Tuple[Dict[str, Tuple[float, float]], Dict[str, int]]:
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    graph.add_weighted_edges_from((a, b, w) for (a, b), w in edges.items())
+
+    communities = nx.community.louvain_communities(graph, weight="weight", seed=LAYOUT_SEED)
+    # Largest community gets id 0 so colors stay stable between small edits
+    communities = sorted(communities, key=lambda c: (-len(c), min(c)))
+    community_of = {n: cid for cid, members in enumerate(communities) for n in members}
+
+    pos = nx.spring_layout(graph, weight="weight", seed=LAYOUT_SEED, scale=LAYOUT_SCALE)
+    positions = {n: (round(float(x), 1), round(float(y), 1)) for n, (x, y) in pos.items()}
+    return positions, community_of
+
+
+def add_cooccurrence(concepts: Sequence[str], node_df: Counter, pair_df: Counter) -> bool:
+    """Count one article into `node_df`/`pair_df`; False when it has no concepts."""
+    uniq = sorted({c for c in concepts if c})
+    if not uniq:
+        return False
+    node_df.update(uniq)
+    # uniq is sorted, so every pair is already in canonical (a < b) order
+    pair_df.update(combinations(uniq, 2))
+    return True
+
+
+def network_from_counts(
+    num_docs: int,
+    node_df: Counter,
+    pair_df: Counter,
+    max_nodes: int = CONCEPT_MAX_NODES,
+    top_k: int = CONCEPT_TOP_K,
+) -> Dict[str, List[Dict]]:
+    """Network from co-occurrence counts, exact or bounded (topk.TopCounter)."""
+    if not node_df:
+        return {"nodes": [], "links": []}
+
+    nodes = _select_nodes(node_df, max_nodes)
+    keep = set(nodes)
+    weighted: Dict[Tuple[str, str], float] = {}
+    for (a, b), c in pair_df.items():
+        if a in keep and b in keep:
+            w = npmi(c, node_df[a], node_df[b], num_docs)
+            # Only positive association is informative for the graph
+            if w > 0:
+                weighted[(a, b)] = w
+    edges = _prune_top_k(weighted, top_k)
+
+    positions, community_of = _layout(nodes, edges)
+    logger.debug(
+        f"Concept network: {len(node_df)} concepts, {len(pair_df)} pairs "
+        f"-> {len(nodes)} nodes, {len(edges)} links"
+    )
+
+    node_items = [
+        ConceptNode(
+            id=n,
+            weight=node_df[n],
+            x=positions[n][0],
+            y=positions[n][1],
+            category=community_of.get(n, 0),
+        ).model_dump()
+        for n in nodes
+    ]
+    link_items = [
+        ConceptLink(source=a, target=b, weight=round(w, 3), count=pair_df[(a, b)]).model_dump()
+        for (a, b), w in sorted(edges.items())
+    ]
+    return {"nodes": node_items, "links": link_items}
@@ -0,0 +1,48 @@
+"""Process pool for CPU-bound local work.
+
+LLM calls are I/O bound and stay on the thread pool in run.py. Local work
+(frontmatter parsing, hashing, MinHash fingerprints, pydantic validation,
+cache record loading) holds the GIL, so it runs in a separate process pool.
+
+Items are sent in chunks of LOCAL_CHUNK to amortize IPC. Worker functions
+write large payloads (analyses) to the cache themselves and return only
+compact results, such as manifest entries or `__slots__` records, so little
+crosses the process boundary. Inputs of fewer than two chunks run inline,
+where a pool would cost more than it saves.
+
+Worker functions must live in an importable module (not `__main__`) so they
+also pickle under the spawn start method.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+from .config import LOCAL_CHUNK, LOCAL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_local(
+    fn: Callable[[T], R], items: Iterable[T], chunksize: int = LOCAL_CHUNK, workers: Optional[int] = None
+) -> List[R]:
+    """`[fn(x) for x in items]` on the local process pool, results in input order."""
+    items = list(items)
+    chunksize = max(1, chunksize)
+    workers = min(workers or LOCAL_WORKERS, -(-len(items) // chunksize))
+    if workers <= 1:
+        return [fn(x) for x in items]
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(fn, items, chunksize=chunksize))
+    except (OSError, BrokenProcessPool) as e:
+        # No usable multiprocessing here (e.g. sandboxed /dev/shm); workers are
+        # idempotent, so redoing the batch inline is safe
+        logger.warning(f"Process pool unavailable ({e}), running {len(items)} items inline")
+        return [fn(x) for x in items]
@@ -0,0 +1,78 @@
+"""Per-article planning, run on the local process pool (parallel.py).
+
+`inspect_article` parses and hashes one article and decides what it needs,
+without touching shared state: the manifest and the journal are only
+updated by the caller, from the small entries returned here.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .config import CACHE_DIR, REUSE_SIMILARITY
+from .fingerprint import fingerprint, is_near_duplicate
+from .map_analyze import refresh_cached_analysis, update_cached_analysis
+from .store import find_cached, legacy_name, object_name, object_path, relative_key
+from .utils import md5_hash_text, parse_frontmatter_and_body, safe_load_json, safe_write_json
+
+# Outcomes of inspect_article
+HIT = "hit"  # cached analysis is current
+LOCAL = "local"  # recomputed locally after a local stage version bump
+REUSED = "reused"  # near-duplicate of the analyzed body, LLM output carried over
+TASK = "task"  # needs the LLM
+
+# (article path, force, dry_run, previous cache entry, previous fingerprint)
+PlanJob = Tuple[Path, bool, bool, Optional[str], Optional[Dict]]
+
+
+def _try_reuse(ap: Path, body: str, body_md5: str, prev_entry: Optional[str], previous: Optional[Dict]) -> Optional[str]:
+    """Reuse the previous analysis of `ap` if the body only changed trivially.
+
+    Returns the new cache entry on success. Fingerprints always describe the
+    version the LLM actually analyzed, so repeated small edits cannot drift.
+    """
+    if REUSE_SIMILARITY <= 0:
+        return None
+    if not prev_entry or not is_near_duplicate(previous, body, REUSE_SIMILARITY):
+        return None
+    cached = safe_load_json(CACHE_DIR / prev_entry)
+    if not cached:
+        return None
+    refreshed = refresh_cached_analysis(cached, ap, body)
+    if refreshed is None:
+        return None
+    safe_write_json(object_path(body_md5), refreshed)
+    return object_name(body_md5)
+
+
+def inspect_article(job: PlanJob) -> Tuple[str, Dict]:
+    """Return (outcome, entry) for one article.
+
+    For LOCAL and REUSED the cache object is already written and `entry` is
+    the journal entry; for HIT it is the current cache mapping.
+    """
+    ap, force, dry_run, prev_entry, previous = job
+    key = relative_key(ap)
+    if force:
+        return TASK, {"path": key}
+    meta, body = parse_frontmatter_and_body(ap)
+    h = md5_hash_text(body)
+    cached = find_cached(legacy_name(ap, h), h)
+    js = safe_load_json(CACHE_DIR / cached) if cached is not None else None
+    updated = update_cached_analysis(js, ap, meta, body, dry_run) if js else None
+    if updated is not None:
+        entry = {"path": key, "cache": cached, "md5": h}
+        # Fingerprints are only computed when the manifest has none yet
+        if previous is None:
+            entry["fingerprint"] = fingerprint(body, h)
+        if updated is js:
+            return HIT, entry
+        if not dry_run:
+            safe_write_json(object_path(h), updated)
+            entry["cache"] = object_name(h)
+        return LOCAL, entry
+    reused_entry = None if dry_run else _try_reuse(ap, body, h, prev_entry, previous)
+    if reused_entry is not None:
+        return REUSED, {"path": key, "cache": reused_entry, "md5": h}
+    return TASK, {"path": key}
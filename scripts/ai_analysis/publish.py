@@ -0,0 +1,137 @@
+"""Streaming publish of the global output.
+
+`publish_global` runs the two passes of `StreamingReduce` over the cache
+files. Pass 1 loads compact records on the local process pool, one chunk at
+a time. Pass 2 loads each full analysis, tags it with its topic and appends
+it to a temporary per-article file right away. The summary is only known at
+the end, so the final file is assembled from the summary, the per-article
+file and the closing brackets, then swapped in atomically. The layout is
+byte-for-byte what `safe_write_json` would produce for the whole document.
+
+Nothing here holds more than one chunk of records or one full analysis at a
+time. What remains O(N) is the list of cache paths and one topic index per
+article, about a few bytes each.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import textwrap
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+from .config import LOCAL_CHUNK, LOCAL_WORKERS, OUTPUT_GLOBAL, OUTPUT_SUMMARY
+from .parallel import map_local
+from .records import ArticleRecord, load_record
+from .reduce_analyze import StreamingReduce
+from .schema import Summary
+from .store import normalize_key
+from .utils import safe_load_json, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+# Records loaded per process-pool round in pass 1
+STREAM_CHUNK = LOCAL_CHUNK * max(1, LOCAL_WORKERS) * 4
+
+# Article-level keys of a perArticle entry in the indented output
+_ARTICLE_FIELD_RE = re.compile(r'^ {6}"(path|topic)": (.*?),?$')
+
+
+def iter_records(cache_files: Sequence[Path], warn: bool = True) -> Iterator[ArticleRecord]:
+    """Records of `cache_files` in order, loaded a chunk at a time; unreadable files are skipped."""
+    for start in range(0, len(cache_files), STREAM_CHUNK):
+        part = cache_files[start : start + STREAM_CHUNK]
+        for cf, record in zip(part, map_local(load_record, part)):
+            if record is None:
+                if warn:
+                    logger.warning(f"Failed to load cached analysis {cf.name}")
+                continue
+            yield record
+
+
+def read_previous_assignment(path: Path = OUTPUT_GLOBAL) -> Dict[str, str]:
+    """Path -> topic of the published perArticle entries, read line by line."""
+    assignment: Dict[str, str] = {}
+    current = None
+    try:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                m = _ARTICLE_FIELD_RE.match(line.rstrip("\n"))
+                if not m:
+                    continue
+                value = json.loads(m.group(2))
+                if m.group(1) == "path":
+                    current = normalize_key(value)
+                elif current and value:
+                    assignment[current] = value
+    except (OSError, ValueError):
+        return {}
+    return assignment
+
+
+def _record(js: Optional[Dict]) -> Optional[ArticleRecord]:
+    try:
+        return ArticleRecord.from_dict(js) if js else None
+    except Exception:
+        return None
+
+
+def _assemble(output: Path, summary: Summary, articles: Path, count: int) -> None:
+    head = json.dumps({"summary": summary.model_dump()}, ensure_ascii=False, indent=2)
+    head = head[: -len("\n}")] + ',\n  "perArticle": ['
+    tmp = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as out:
+            out.write(head)
+            if count:
+                out.write("\n")
+                with articles.open(encoding="utf-8") as src:
+                    shutil.copyfileobj(src, out)
+                out.write("\n  ")
+            out.write("]\n}")
+        os.replace(tmp, output)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def publish_global(
+    cache_files: Sequence[Path],
+    name_topics: bool = True,
+    previous_topics: Optional[list] = None,
+    previous_assignment: Optional[Dict[str, str]] = None,
+    output: Path = OUTPUT_GLOBAL,
+    summary_output: Path = OUTPUT_SUMMARY,
+) -> Summary:
+    """Reduce `cache_files` and write the global and compact summary outputs."""
+    with StreamingReduce(name_topics, previous_topics, previous_assignment) as reducer:
+        for record in iter_records(cache_files):
+            reducer.add(record)
+        logger.info(f"Loaded {reducer.count} total articles for global reduction")
+        reducer.name_topics()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    articles = output.with_name(f".{output.name}.{os.getpid()}.articles.tmp")
+    count = 0
+    try:
+        with articles.open("w", encoding="utf-8") as f:
+            for cf in cache_files:
+                js = safe_load_json(cf)
+                record = _record(js)
+                if record is None:
+                    continue
+                js["topic"] = reducer.assign(record)
+                if count:
+                    f.write(",\n")
+                f.write(textwrap.indent(json.dumps(js, ensure_ascii=False, indent=2), "    "))
+                count += 1
+        summary = reducer.summary()
+        _assemble(output, summary, articles, count)
+    finally:
+        articles.unlink(missing_ok=True)
+    # Fetched by the About page: compact, and independent of the article count
+    safe_write_json(summary_output, {"summary": summary.model_dump()}, compact=True)
+    return summary
@@ -0,0 +1,176 @@
+"""Cross-process request/token rate limiting per provider and model.
+
+Every HTTP call to a model API first takes one request from the RPM bucket and
+an estimated token count from the TPM bucket of its `(host, model)` pair. The
+bucket state lives in a small SQLite table, so concurrently running scripts
+(the analysis pipeline and the cover generator) share one budget. Each check
+runs inside a `BEGIN IMMEDIATE` transaction, which SQLite serializes across
+processes.
+
+Buckets refill at `RATE_LIMIT_HEADROOM` x the configured limit and hold at most
+10 seconds of burst, so traffic stays just under the quota instead of bursting
+into 429s. Actual token usage reported by the API is settled afterwards, and a
+429 with `Retry-After` pauses the key for every process.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import (
+    RATE_LIMIT_DB,
+    RATE_LIMIT_HEADROOM,
+    RATE_LIMIT_OUTPUT_TOKENS,
+    RATE_LIMIT_RPM,
+    RATE_LIMIT_TPM,
+    RATE_LIMITS,
+)
+
+logger = logging.getLogger(__name__)
+
+_BURST_S = 10.0
+_MAX_WAIT_S = 5.0  # re-check at least this often while waiting
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+def estimate_tokens(messages: List[dict], max_tokens: Optional[int] = None) -> int:
+    """Conservative token estimate: ~1 token per CJK char, plus the output budget."""
+    prompt = sum(len(str(m.get("content", ""))) for m in messages)
+    return prompt + (max_tokens or RATE_LIMIT_OUTPUT_TOKENS)
+
+
+class _Bucket:
+    __slots__ = ("name", "rate", "capacity")
+
+    def __init__(self, name: str, per_minute: int) -> None:
+        self.name = name
+        self.rate = per_minute * RATE_LIMIT_HEADROOM / 60.0  # units per second
+        self.capacity = max(1.0, self.rate * _BURST_S)
+
+
+class RateLimiter:
+    """RPM + TPM token buckets for one `(host, model)` key, shared via SQLite."""
+
+    def __init__(self, base_url: str, model: str) -> None:
+        self.key = f"{urlparse(base_url).hostname or base_url}:{model}"
+        rpm, tpm = RATE_LIMITS.get(model, (RATE_LIMIT_RPM, RATE_LIMIT_TPM))
+        self.buckets: List[_Bucket] = []
+        if rpm > 0:
+            self.buckets.append(_Bucket(f"{self.key}:rpm", rpm))
+        if tpm > 0:
+            self.buckets.append(_Bucket(f"{self.key}:tpm", tpm))
+
+    def _connect(self) -> sqlite3.Connection:
+        RATE_LIMIT_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(RATE_LIMIT_DB, timeout=30, isolation_level=None)
+        conn.execute(_SCHEMA)
+        return conn
+
+    def _amounts(self, tokens: int) -> List[float]:
+        # A request larger than the burst only needs a full bucket
+        return [
+            1.0 if b.name.endswith(":rpm") else min(float(tokens), b.capacity)
+            for b in self.buckets
+        ]
+
+    def _try_take(self, conn: sqlite3.Connection, amounts: List[float]) -> float:
+        """Take `amounts` atomically; return 0 on success, else seconds to wait."""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            wait = 0.0
+            for b, need in zip(self.buckets, amounts):
+                row = conn.execute(
+                    "SELECT level, updated, blocked_until FROM buckets WHERE name = ?", (b.name,)
+                ).fetchone()
+                level, updated, blocked_until = row or (b.capacity, now, 0.0)
+                level = min(b.capacity, level + (now - updated) * b.rate)
+                levels.append((level, blocked_until))
+                wait = max(wait, blocked_until - now, (need - level) / b.rate)
+            if wait <= 0:
+                for b, need, (level, blocked_until) in zip(self.buckets, amounts, levels):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, level, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                        (b.name, level - need, now, blocked_until),
+                    )
+            conn.execute("COMMIT")
+            return max(0.0, wait)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of ~`tokens` tokens fits; return seconds waited."""
+        if not self.buckets:
+            return 0.0
+        amounts = self._amounts(tokens)
+        waited = 0.0
+        with closing(self._connect()) as conn:
+            while True:
+                wait = self._try_take(conn, amounts)
+                if wait <= 0:
+                    break
+                if waited == 0:
+                    logger.debug(f"Rate limit {self.key}: waiting {wait:.1f}s")
+                wait = min(wait, _MAX_WAIT_S)
+                time.sleep(wait)
+                waited += wait
+        return waited
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Return over-estimated tokens to (or charge the shortfall from) the TPM bucket."""
+        tpm = next((b for b in self.buckets if b.name.endswith(":tpm")), None)
+        if tpm is None or actual is None or actual == estimated:
+            return
+        delta = min(float(estimated), tpm.capacity) - actual
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE buckets SET level = MIN(?, level + ?) WHERE name = ?",
+                (tpm.capacity, delta, tpm.name),
+            )
+
+    def pause(self, seconds: float) -> None:
+        """Block this key for every process, e.g. after a 429 with Retry-After."""
+        until = time.time() + max(0.0, seconds)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for b in self.buckets:
+                conn.execute(
+                    "INSERT INTO buckets (name, level, updated, blocked_until) VALUES (?, 0, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                    (b.name, time.time(), until),
+                )
+            conn.execute("COMMIT")
+        logger.warning(f"Rate limited by provider ({self.key}), pausing {seconds:.0f}s")
+
+
+_LIMITERS: Dict[Tuple[str, str], RateLimiter] = {}
+
+
+def limiter_for(base_url: str, model: str) -> RateLimiter:
+    key = (base_url, model)
+    if key not in _LIMITERS:
+        _LIMITERS[key] = RateLimiter(base_url, model)
+    return _LIMITERS[key]
+
+
+def retry_after_seconds(headers, default: float = 10.0) -> float:
+    """Parse a numeric Retry-After header (HTTP-date values fall back to `default`)."""
+    try:
+        return float(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,123 @@
+"""Lightweight internal records for the reduce path.
+
+Pydantic models in schema.py guard the trust boundary (LLM output in the map
+stage). Cache files are always written from validated models, so loading them
+back only needs a cheap projection of the fields that the reduce stage reads.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+TONE_KEYS: Tuple[str, ...] = ("teaching", "reflective", "humor", "critical")
+BUCKET_KEYS: Tuple[str, ...] = ("1-10", "11-20", "21-30", "30+")
+
+
+def _interned(values: Iterable) -> Tuple[str, ...]:
+    # Tags, keywords and concepts repeat heavily across articles
+    return tuple(sys.intern(str(v)) for v in values if v)
+
+
+def _opt_str(value) -> Optional[str]:
+    return sys.intern(str(value)) if value else None
+
+
+class ArticleRecord:
+    """Compact, read-only view of one cached ArticleAnalysis."""
+
+    __slots__ = (
+        "id",
+        "title",
+        "date",
+        "tags",
+        "path",
+        "md5",
+        "sentence_avg_len",
+        "sentence_buckets",
+        "tone",
+        "keywords",
+        "concepts",
+        "sentiment_label",
+        "sentiment_score",
+        "structure_pattern",
+        "depth",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        path: str,
+        md5: str,
+        date: Optional[str] = None,
+        tags: Tuple[str, ...] = (),
+        sentence_avg_len: float = 0.0,
+        sentence_buckets: Tuple[int, ...] = (0,) * len(BUCKET_KEYS),
+        tone: Tuple[Optional[float], ...] = (None,) * len(TONE_KEYS),
+        keywords: Tuple[str, ...] = (),
+        concepts: Tuple[str, ...] = (),
+        sentiment_label: Optional[str] = None,
+        sentiment_score: Optional[float] = None,
+        structure_pattern: Optional[str] = None,
+        depth: Optional[str] = None,
+    ) -> None:
+        self.id = id
+        self.title = title
+        self.path = path
+        self.md5 = md5
+        self.date = date
+        self.tags = tags
+        self.sentence_avg_len = sentence_avg_len
+        self.sentence_buckets = sentence_buckets
+        self.tone = tone
+        self.keywords = keywords
+        self.concepts = concepts
+        self.sentiment_label = sentiment_label
+        self.sentiment_score = sentiment_score
+        self.structure_pattern = structure_pattern
+        self.depth = depth
+
+    @classmethod
+    def from_dict(cls, js: Dict) -> "ArticleRecord":
+        """Build a record from a trusted (already validated) analysis dict.
+
+        Raises KeyError when the identifying fields are missing.
+        """
+        metrics = js.get("metrics") or {}
+        style = js.get("style") or {}
+        tone = style.get("tone") or {}
+        content = js.get("content") or {}
+        buckets = metrics.get("sentenceLenBuckets") or {}
+        sentiment = js.get("sentiment") or {}
+        structure = js.get("structure") or {}
+        score = sentiment.get("score")
+        return cls(
+            id=js["id"],
+            title=js.get("title") or js["id"],
+            path=js["path"],
+            md5=js["md5"],
+            date=js.get("date") or None,
+            tags=_interned(js.get("tags") or ()),
+            sentence_avg_len=float(metrics.get("sentenceAvgLen") or 0.0),
+            sentence_buckets=tuple(int(buckets.get(k) or 0) for k in BUCKET_KEYS),
+            tone=tuple(
+                float(tone[k]) if tone.get(k) is not None else None for k in TONE_KEYS
+            ),
+            keywords=_interned(content.get("keywords") or ()),
+            concepts=_interned(content.get("concepts") or ()),
+            sentiment_label=_opt_str(sentiment.get("label")),
+            sentiment_score=float(score) if score is not None else None,
+            structure_pattern=_opt_str(structure.get("pattern")),
+            depth=_opt_str(js.get("depth")),
+        )
+
+
+def load_record(path: Path) -> Optional[ArticleRecord]:
+    """Fast path for trusted cache files: plain json + projection, no pydantic."""
+    try:
+        return ArticleRecord.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except Exception:
+        return None
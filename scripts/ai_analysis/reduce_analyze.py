@@ -1,209 +1,251 @@
 """Reduce stage: aggregate article analyses into global summary.
 
-Combines statistical signals (TF-IDF/KMeans draft, cooccurrence) with LLM
-to produce human-friendly topic naming and high-level interpretations.
+Combines statistical signals (frequency draft, cooccurrence) with LLM to
+produce human-friendly topic naming and high-level interpretations. Topic
+naming covers the whole corpus through a tree reduce (topics.py). Chart data
+is pre-aggregated here (cube.py), so its size does not grow with the article
+count.
+
+The reduce streams: `StreamingReduce` sees each article twice, in the same
+order, and keeps only running sums, bounded counters (topk.py), per-month
+totals and one topic index per article. Callers can feed it from a generator
+over the cache and write per-article output during the second pass.
 """
 
 from __future__ import annotations
 
-import json
 import logging
-from collections import Counter, defaultdict
-from typing import Dict, List, Tuple
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 
-from .config import NUM_TOPICS
-from .llm import call_llm
-from .schema import ArticleAnalysis, ConceptLink, ConceptNode, GlobalAnalysis, StructureItem, Summary, TopicItem
+import numpy as np
 
-logger = logging.getLogger(__name__)
+from .config import NUM_TOPICS, STREAM_PAIR_CAPACITY, STREAM_TOP_CAPACITY
+from .cube import CubeBuilder, article_month
+from .network import add_cooccurrence, network_from_counts
+from .records import BUCKET_KEYS, TONE_KEYS, ArticleRecord
+from .schema import StructureItem, Summary, TopicItem, TopicSentiment
+from .topics import TopicTree
+from .topk import TopCounter
 
+logger = logging.getLogger(__name__)
 
-def _draft_topics(articles: List[ArticleAnalysis]) -> List[Tuple[str, float]]:
-    # Simple frequency-based draft: use top tags/keywords as topic hints
-    pool: Counter[str] = Counter()
-    for a in articles:
-        for t in a.tags:
-            if t:
-                pool[t] += 1
-        for k in a.content.keywords:
-            if k:
-                pool[k] += 1
-    total = sum(pool.values()) or 1
-    top = pool.most_common(NUM_TOPICS)
-    return [(w, c / total) for w, c in top]
-
-
-def _concept_network(articles: List[ArticleAnalysis]) -> Dict[str, List[Dict]]:
-    node_weight: Counter[str] = Counter()
-    link_weight: Counter[Tuple[str, str]] = Counter()
-    for a in articles:
-        concepts = [c for c in a.content.concepts if c]
-        for i, s in enumerate(concepts):
-            node_weight[s] += 1
-            for j in range(i + 1, min(len(concepts), i + 10)):
-                t = concepts[j]
-                key = (s, t) if s < t else (t, s)
-                link_weight[key] += 1
-    nodes = [ConceptNode(id=k, weight=v).dict() for k, v in node_weight.items()]
-    links = [
-        {"source": s, "target": t, "weight": w} for (s, t), w in link_weight.items()
-    ]
-    return {"nodes": nodes, "links": links}
-
-
-def _calculate_tone_avg(articles: List[ArticleAnalysis]) -> Dict[str, float]:
-    """Calculate average tone across all articles."""
-    tone_keys = ["teaching", "reflective", "humor", "critical"]
-    tone_sums: Dict[str, float] = defaultdict(float)
-    tone_counts: Dict[str, int] = defaultdict(int)
-    
-    for a in articles:
-        for key in tone_keys:
-            val = a.style.tone.get(key)
+MAX_CLOUD_WORDS = 60
+
+
+SENTIMENT_CATEGORIES = ("positive", "neutral", "negative")
+
+_SENTIMENT_MAP = {
+    "positive": ["积极", "积极反思", "积极向上", "理性积极", "积极指导"],
+    "neutral": ["中性", "中性偏", "中性技术说明", "反思性中立", "中性偏技术"],
+    "negative": ["消极", "负面"]
+}
+
+
+def categorize_sentiment(label: Optional[str]) -> Optional[str]:
+    """Map a free-form sentiment label to positive/neutral/negative."""
+    if not label:
+        return None
+    # Fuzzy matching for sentiment labels
+    for category, keywords in _SENTIMENT_MAP.items():
+        if any(kw in label for kw in keywords):
+            return category
+    # Default to neutral if no match
+    return "neutral"
+
+
+_DEPTH_MAP = {
+    1: ["入门", "基础", "浅", "简单", "概述", "intro"],
+    2: ["中等", "应用", "实践", "实用", "application"],
+    3: ["原理", "深入", "底层", "深度", "principle"],
+}
+
+
+def categorize_depth(label: Optional[str]) -> Optional[int]:
+    """Map a free-form depth label to 1 (intro), 2 (application) or 3 (principle)."""
+    if not label:
+        return None
+    for level, keywords in _DEPTH_MAP.items():
+        if any(kw in label for kw in keywords):
+            return level
+    return 2
+
+
+def _local_topic(a: ArticleRecord, by_title: Dict[str, int], by_name: Dict[str, int]) -> int:
+    """Topic without the LLM: the topic listing the article as a representative,
+    else the first topic named like one of its tags/keywords, else -1."""
+    return by_title.get(a.title, next((by_name[t] for t in (*a.tags, *a.keywords) if t in by_name), -1))
+
+
+class StreamingReduce:
+    """Two-pass reduce with bounded state.
+
+    Pass 1, `add(a)` for every article: running sums, bounded counters and
+    the topic tree leaves. `name_topics()` then names the topics. Pass 2,
+    `assign(a)` for the same articles in the same order: topic per article,
+    the cube and the per-topic sentiment. `summary()` builds the Summary.
+
+    With `name_topics=False` the LLM is skipped and `previous_topics` (or the
+    draft topics) are kept, which incremental republishing uses to stay
+    local and fast. Articles keep their topic from `previous_assignment`
+    (path -> topic name) then.
+    """
+
+    def __init__(
+        self,
+        name_topics: bool = True,
+        previous_topics: Optional[List[Dict]] = None,
+        previous_assignment: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.count = 0
+        self._tone_sums: Dict[str, float] = defaultdict(float)
+        self._tone_counts: Dict[str, int] = defaultdict(int)
+        self._sentence_sum = 0.0
+        self._sentence_n = 0
+        self._sentiment = {k: 0 for k in SENTIMENT_CATEGORIES}
+        self._concept_docs = 0
+        self._node_df = TopCounter(STREAM_TOP_CAPACITY)
+        self._pair_df = TopCounter(STREAM_PAIR_CAPACITY)
+        self._depth: Dict[str, List[float]] = {}  # month -> [count, level sum]
+        self._months = set()
+        self._structures = TopCounter(STREAM_TOP_CAPACITY)
+        self._buckets = np.zeros(len(BUCKET_KEYS), dtype=np.int64)
+        self._keywords = TopCounter(STREAM_TOP_CAPACITY)
+        self._draft_pool = TopCounter(STREAM_TOP_CAPACITY)
+        self._tag_freq = TopCounter(STREAM_TOP_CAPACITY)
+        self._tree = TopicTree() if name_topics else None
+        self._previous_topics = previous_topics
+        self._previous_assignment = previous_assignment or {}
+
+        self.topics: List[TopicItem] = []
+        self._topic_of: Optional[List[int]] = None
+        self._cube: Optional[CubeBuilder] = None
+        self._topic_sentiment: Optional[np.ndarray] = None
+        self._assigned = 0
+
+    def __enter__(self) -> "StreamingReduce":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the topic tree's workers (a no-op once topics are named)."""
+        if self._tree is not None:
+            self._tree.close()
+
+    # ---------- pass 1 ----------
+
+    def add(self, a: ArticleRecord) -> None:
+        self.count += 1
+        for key, val in zip(TONE_KEYS, a.tone):
             if val is not None:
-                tone_sums[key] += val
-                tone_counts[key] += 1
-    
-    return {k: round(tone_sums[k] / tone_counts[k], 2) if tone_counts[k] > 0 else 0.0 
-            for k in tone_keys}
-
-
-def _calculate_sentiment_dist(articles: List[ArticleAnalysis]) -> Dict[str, float]:
-    """Calculate sentiment distribution across all articles."""
-    sentiment_map = {
-        "positive": ["积极", "积极反思", "积极向上", "理性积极", "积极指导"],
-        "neutral": ["中性", "中性偏", "中性技术说明", "反思性中立", "中性偏技术"],
-        "negative": ["消极", "负面"]
-    }
-    
-    counts = {"positive": 0, "neutral": 0, "negative": 0}
-    total = 0
-    
-    for a in articles:
-        label = a.sentiment.label
-        if not label:
-            continue
-        total += 1
-        
-        # Fuzzy matching for sentiment labels
-        categorized = False
-        for category, keywords in sentiment_map.items():
-            if any(kw in label for kw in keywords):
-                counts[category] += 1
-                categorized = True
-                break
-        
-        # Default to neutral if no match
-        if not categorized:
-            counts["neutral"] += 1
-    
-    if total == 0:
-        return {"positive": 0.0, "neutral": 0.0, "negative": 0.0}
-    
-    return {k: round(v / total, 3) for k, v in counts.items()}
-
-
-def _calculate_timeline_depth(articles: List[ArticleAnalysis]) -> List[Dict[str, str]]:
-    """Build timeline of article depth by date."""
-    timeline = []
-    for a in articles:
-        if a.date and a.depth:
-            timeline.append({"date": a.date, "depth": a.depth})
-    
-    # Sort by date
-    timeline.sort(key=lambda x: x["date"] if x["date"] else "")
-    return timeline
-
-
-def _calculate_structures(articles: List[ArticleAnalysis]) -> List[StructureItem]:
-    """Count structure patterns."""
-    pattern_counts: Counter[str] = Counter()
-    for a in articles:
-        pattern = a.structure.pattern
-        if pattern:
-            pattern_counts[pattern] += 1
-    
-    return [StructureItem(pattern=p, count=c) for p, c in pattern_counts.most_common()]
-
-
-def _build_reduce_prompt(articles: List[ArticleAnalysis], draft_topics: List[Tuple[str, float]]):
-    """Build LLM prompt for topic naming (optional enhancement)."""
-    system_prompt = (
-        "你是一位负责整合多篇文章分析的高级编辑。根据提供的草拟主题，为这些主题命名（3-5个主题）并给出每个主题的代表性文章。"
-        "返回严格的JSON格式：{\"topics\": [{\"name\": \"主题名\", \"ratio\": 0.x, \"representatives\": [\"文章标题\"]}]}"
-    )
-    light_articles = [
-        {
-            "id": a.id,
-            "title": a.title,
-            "tags": a.tags[:3],  # Only top 3 tags
-            "keywords": a.content.keywords[:5],  # Only top 5 keywords
+                self._tone_sums[key] += val
+                self._tone_counts[key] += 1
+        if a.sentence_avg_len:
+            self._sentence_sum += a.sentence_avg_len
+            self._sentence_n += 1
+        category = categorize_sentiment(a.sentiment_label)
+        if category is not None:
+            self._sentiment[category] += 1
+        self._concept_docs += add_cooccurrence(a.concepts, self._node_df, self._pair_df)
+        month = article_month(a)
+        if month:
+            self._months.add(month)
+            level = categorize_depth(a.depth)
+            if level:
+                totals = self._depth.setdefault(month, [0, 0.0])
+                totals[0] += 1
+                totals[1] += level
+        if a.structure_pattern:
+            self._structures.add(a.structure_pattern)
+        self._buckets += a.sentence_buckets
+        self._keywords.update(a.keywords)
+        # Simple frequency-based draft: use top tags/keywords as topic hints
+        self._draft_pool.update(t for t in a.tags if t)
+        self._draft_pool.update(k for k in a.keywords if k)
+        self._tag_freq.update(list(dict.fromkeys(a.tags)))
+        if self._tree is not None:
+            self._tree.add(a)
+
+    def _draft_topics(self) -> List[Tuple[str, float]]:
+        total = sum(self._draft_pool.values()) or 1
+        return [(w, c / total) for w, c in self._draft_pool.most_common(NUM_TOPICS)]
+
+    def name_topics(self) -> List[TopicItem]:
+        """End of pass 1: name the topics (LLM tree reduce or kept topics)."""
+        draft_topics = self._draft_topics()
+        if self._tree is not None:
+            try:
+                self.topics, self._topic_of = self._tree.finish(draft_topics)
+            except Exception as e:
+                logger.warning(f"Failed to get LLM topic naming, using draft topics: {e}")
+                # Fallback to draft topics, assigned locally in pass 2
+                self.topics = [TopicItem(name=name, ratio=ratio, representatives=[]) for name, ratio in draft_topics]
+        else:
+            self.topics = [TopicItem(**t) for t in self._previous_topics or [] if isinstance(t, dict)] or [
+                TopicItem(name=name, ratio=ratio, representatives=[]) for name, ratio in draft_topics
+            ]
+        self._by_title = {title: i for i, t in enumerate(self.topics) for title in t.representatives}
+        self._by_name = {t.name: i for i, t in enumerate(self.topics)}
+        self._cube = CubeBuilder([t.name for t in self.topics], self._months, self._tag_freq, SENTIMENT_CATEGORIES)
+        self._topic_sentiment = np.zeros((len(self.topics), len(SENTIMENT_CATEGORIES)))
+        return self.topics
+
+    # ---------- pass 2 ----------
+
+    def assign(self, a: ArticleRecord) -> Optional[str]:
+        """Topic name of the next article (same order as pass 1), or None."""
+        if self._topic_of is not None:
+            t = self._topic_of[self._assigned]
+        else:
+            local = _local_topic(a, self._by_title, self._by_name)
+            t = self._by_name.get(self._previous_assignment.get(a.path, ""), local)
+        self._assigned += 1
+        category = categorize_sentiment(a.sentiment_label)
+        s = SENTIMENT_CATEGORIES.index(category) if category else -1
+        self._cube.add(a, t, s)
+        if t >= 0 and s >= 0:
+            self._topic_sentiment[t, s] += 1
+        return self.topics[t].name if t >= 0 else None
+
+    def summary(self) -> Summary:
+        tone_avg = {
+            k: round(self._tone_sums[k] / self._tone_counts[k], 2) if self._tone_counts[k] > 0 else 0.0
+            for k in TONE_KEYS
         }
-        for a in articles
-    ]
-    user_payload = {
-        "articles": light_articles[:20],  # Sample only 20 articles to reduce token usage
-        "draft_topics": draft_topics,
-        "num_topics": NUM_TOPICS
-    }
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
-    ]
-    return messages
-
-
-def reduce_global(articles: List[ArticleAnalysis]) -> GlobalAnalysis:
-    """Reduce all articles into global summary with statistics."""
-    logger.info(f"Starting global analysis reduction for {len(articles)} articles")
-    
-    # Calculate all statistics directly via code
-    tone_avg = _calculate_tone_avg(articles)
-    logger.debug(f"Calculated tone averages: {tone_avg}")
-    
-    avg_sentence = 0.0
-    lens = [a.metrics.sentenceAvgLen for a in articles if a.metrics.sentenceAvgLen]
-    if lens:
-        avg_sentence = round(sum(lens) / len(lens), 2)
-    
-    sentiment_dist = _calculate_sentiment_dist(articles)
-    logger.debug(f"Calculated sentiment distribution: {sentiment_dist}")
-    
-    concept_network = _concept_network(articles)
-    logger.debug(f"Built concept network: {len(concept_network.get('nodes', []))} nodes")
-    
-    timeline_depth = _calculate_timeline_depth(articles)
-    structures = _calculate_structures(articles)
-    
-    # Optional: Use LLM for topic naming (can be skipped for speed)
-    draft_topics = _draft_topics(articles)
-    topics: List[TopicItem] = []
-    try:
-        messages = _build_reduce_prompt(articles, draft_topics)
-        raw = call_llm(messages, temperature=0.5)
-        parsed = json.loads(raw)
-        topics = [TopicItem(**t) for t in parsed.get("topics", []) if isinstance(t, dict)]
-        logger.info(f"LLM generated {len(topics)} named topics")
-    except Exception as e:
-        logger.warning(f"Failed to get LLM topic naming, using draft topics: {e}")
-        # Fallback to draft topics
-        topics = [
-            TopicItem(name=name, ratio=ratio, representatives=[])
-            for name, ratio in draft_topics
-        ]
-    
-    summary = Summary(
-        style={"toneAvg": tone_avg},
-        avgSentenceLen=avg_sentence,
-        sentimentDist=sentiment_dist,
-        topics=topics,
-        conceptNetwork=concept_network,
-        timelineDepth=timeline_depth,
-        structures=structures,
-        topicSentiment=[],  # Can be calculated later if needed
-    )
-
-    logger.info("✅ Global summary calculation complete")
-    return GlobalAnalysis(summary=summary, perArticle=articles)
-
-
+        avg_sentence = round(self._sentence_sum / self._sentence_n, 2) if self._sentence_n else 0.0
+        total = sum(self._sentiment.values())
+        if total == 0:
+            sentiment_dist = {k: 0.0 for k in SENTIMENT_CATEGORIES}
+        else:
+            sentiment_dist = {k: round(v / total, 3) for k, v in self._sentiment.items()}
+        concept_network = network_from_counts(self._concept_docs, self._node_df, self._pair_df)
+        logger.debug(
+            f"Built concept network: {len(concept_network['nodes'])} nodes, "
+            f"{len(concept_network['links'])} links"
+        )
+        totals = self._topic_sentiment.sum(axis=1, keepdims=True)
+        dist = np.divide(
+            self._topic_sentiment, totals, out=np.zeros_like(self._topic_sentiment), where=totals > 0
+        )
+        return Summary(
+            style={"toneAvg": tone_avg},
+            avgSentenceLen=avg_sentence,
+            sentimentDist=sentiment_dist,
+            topics=self.topics,
+            conceptNetwork=concept_network,
+            # Article count and mean depth level per month (not per article)
+            timelineDepth=[
+                {"period": m, "count": int(c), "depth": round(d / c, 2)}
+                for m, (c, d) in sorted(self._depth.items())
+            ],
+            structures=[StructureItem(pattern=p, count=c) for p, c in self._structures.most_common()],
+            topicSentiment=[
+                TopicSentiment(topic=topic.name, **{k: round(float(v), 3) for k, v in zip(SENTIMENT_CATEGORIES, row)})
+                for topic, row in zip(self.topics, dist)
+            ],
+            sentenceLenBuckets={k: int(v) for k, v in zip(BUCKET_KEYS, self._buckets)},
+            keywordFreq=[{"name": k, "value": c} for k, c in self._keywords.most_common(MAX_CLOUD_WORDS)],
+            cube=self._cube.result(),
+        )
@@ -0,0 +1,254 @@
+"""Related-posts index from cached analyses and body text, computed locally.
+
+Each article becomes an L2-normalized, feature-hashed vector of RELATED_DIM
+dimensions. Tags, concepts and keywords from its cached analysis form the
+main part, and character bigrams of the body add a smaller share
+(BODY_WEIGHT). Cosine similarity is then a dot product, computed as a blocked
+matrix multiply (RELATED_BLOCK rows at a time), so memory stays at
+block x N. Beyond RELATED_LSH_MIN articles, random-hyperplane LSH picks the
+candidates and only those are scored.
+
+Updates are incremental. Vectors and each article's top-(2k) neighbors persist
+in related_state.npz. Only new or changed articles (by feature signature) are
+re-vectorized and scored against everything. Unchanged articles merge the
+changed scores into their kept lists. A kept list is rescored in full only
+when fewer than k of its entries are still valid.
+
+Output `public/data/related.json` (compact):
+`{"k": K, "paths": [...], "neighbors": [[j, ...], ...], "scores": [[s, ...], ...]}`
+where `neighbors[i]` indexes into `paths`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import (
+    RELATED_BLOCK,
+    RELATED_DIM,
+    RELATED_K,
+    RELATED_LSH_MIN,
+    RELATED_PATH,
+    RELATED_STATE_PATH,
+)
+from .records import ArticleRecord
+from .store import article_path, normalize_key
+from .utils import md5_hash_text, parse_frontmatter_and_body, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+FEATURE_VERSION = 1
+FIELD_WEIGHTS = {"tag": 3.0, "concept": 2.0, "keyword": 2.0}
+BODY_WEIGHT = 0.35  # share of the final vector carried by body bigrams
+
+# LSH: hash tables, and the target articles per bucket that sets the bits per
+# table (log2(N / LSH_BUCKET), at least 4)
+LSH_TABLES = 16
+LSH_BUCKET = 64
+
+_WORD_RE = re.compile(r"[\w一-鿿]+")
+# Function characters that make bigrams match across unrelated posts
+_STOP_CHARS = set("的了是在我你他她它们这那和与就也都而及着个有不为以之")
+
+
+def _bucket(feature: str) -> Tuple[int, float]:
+    """Feature hashing with a sign bit, so collisions cancel out on average."""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % RELATED_DIM, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+
+def _signature(rec: ArticleRecord) -> str:
+    payload = [FEATURE_VERSION, RELATED_DIM, rec.md5, rec.tags, rec.concepts, rec.keywords]
+    return md5_hash_text(json.dumps(payload, ensure_ascii=False))
+
+
+def _body_bigrams(body: str) -> Counter:
+    grams: Counter = Counter()
+    for word in _WORD_RE.findall(body.lower()):
+        for i in range(len(word) - 1):
+            g = word[i : i + 2]
+            if g[0] not in _STOP_CHARS and g[1] not in _STOP_CHARS:
+                grams[g] += 1
+    return grams
+
+
+def vectorize(rec: ArticleRecord, body: str) -> np.ndarray:
+    """Unit feature vector of one article."""
+    terms = np.zeros(RELATED_DIM, dtype=np.float64)
+    for field, values in (("tag", rec.tags), ("concept", rec.concepts), ("keyword", rec.keywords)):
+        for value in set(values):
+            idx, sign = _bucket(f"{field}:{value.lower()}")
+            terms[idx] += sign * FIELD_WEIGHTS[field]
+    text = np.zeros(RELATED_DIM, dtype=np.float64)
+    for gram, count in _body_bigrams(body).items():
+        idx, sign = _bucket(f"b:{gram}")
+        text[idx] += sign * (1.0 + math.log(count))  # sublinear tf
+    v = math.sqrt(1.0 - BODY_WEIGHT**2) * _unit(terms) + BODY_WEIGHT * _unit(text)
+    return _unit(v).astype(np.float32)
+
+
+def _top(cands: np.ndarray, scores: np.ndarray, keep: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Best `keep` (candidate, score) pairs by descending score."""
+    if len(cands) > keep:
+        part = np.argpartition(-scores, keep - 1)[:keep]
+        cands, scores = cands[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return cands[order], scores[order]
+
+
+class _Lsh:
+    """Random-hyperplane LSH: articles sharing a bucket in any table are candidates."""
+
+    def __init__(self, X: np.ndarray) -> None:
+        nbits = max(4, int(math.log2(max(len(X), 1) / LSH_BUCKET)))
+        rng = np.random.default_rng(FEATURE_VERSION)
+        planes = rng.standard_normal((X.shape[1], LSH_TABLES * nbits)).astype(np.float32)
+        bits = (X @ planes > 0).reshape(len(X), LSH_TABLES, nbits)
+        self.keys = bits.astype(np.int64) @ (1 << np.arange(nbits, dtype=np.int64))  # N x tables
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(LSH_TABLES)]
+        for i, row in enumerate(self.keys):
+            for t, key in enumerate(row):
+                self.buckets[t].setdefault(int(key), []).append(i)
+
+    def candidates(self, i: int) -> np.ndarray:
+        found = set()
+        for t, key in enumerate(self.keys[i]):
+            found.update(self.buckets[t][int(key)])
+        found.discard(i)
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+
+def _neighbors(X: np.ndarray, rows: Sequence[int], keep: int) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Top-`keep` neighbors of `rows` against all of X."""
+    out: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    n = len(X)
+    if n < 2 or not rows:
+        return {r: (np.empty(0, np.int64), np.empty(0, np.float32)) for r in rows}
+    if n >= RELATED_LSH_MIN:
+        lsh = _Lsh(X)
+        for r in rows:
+            cands = lsh.candidates(r)
+            out[r] = _top(cands, X[cands] @ X[r], keep)
+        return out
+    everyone = np.arange(n)
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in range(0, len(rows), RELATED_BLOCK):
+        block = rows[start : start + RELATED_BLOCK]
+        S = X[block] @ X.T  # block x N
+        S[np.arange(len(block)), block] = -np.inf  # never related to itself
+        for r, s in zip(block, S):
+            out[int(r)] = _top(everyone, s, min(keep, n - 1))
+    return out
+
+
+def _load_state() -> Optional[Dict]:
+    try:
+        with np.load(RELATED_STATE_PATH, allow_pickle=False) as z:
+            state = {k: z[k] for k in z.files}
+    except (OSError, ValueError):
+        return None
+    if state.get("dim") is None or int(state["dim"]) != RELATED_DIM:
+        return None
+    return state
+
+
+def _save_state(paths, sigs, X, nbr, nbs) -> None:
+    tmp = RELATED_STATE_PATH.with_name(f".{RELATED_STATE_PATH.name}.tmp.npz")
+    np.savez(tmp, dim=np.int64(RELATED_DIM), paths=np.array(paths), sigs=np.array(sigs), X=X, nbr=nbr, nbs=nbs)
+    os.replace(tmp, RELATED_STATE_PATH)
+
+
+def build_related(records: Iterable[ArticleRecord], k: int = RELATED_K) -> Dict[str, int]:
+    """Update the related-posts index for `records` and write related.json.
+
+    Returns counts of `changed`, `rescored` (unchanged rows rescored in full)
+    and `total` articles.
+    """
+    keep = 2 * k
+    state = _load_state()
+    old_pos: Dict[str, int] = {}
+    if state is not None:
+        old_pos = {str(p): i for i, p in enumerate(state["paths"])}
+
+    # One pass over the records: unchanged vectors come from the state, only
+    # new or changed articles are read and vectorized
+    paths: List[str] = []
+    sigs: List[str] = []
+    rows: List[np.ndarray] = []
+    unchanged: List[int] = []
+    changed: List[int] = []
+    for rec in records:
+        path, sig = normalize_key(rec.path), _signature(rec)
+        o = old_pos.get(path)
+        if o is not None and str(state["sigs"][o]) == sig:
+            unchanged.append(len(paths))
+            rows.append(state["X"][o])
+        else:
+            changed.append(len(paths))
+            _, body = parse_frontmatter_and_body(article_path(path))
+            rows.append(vectorize(rec, body))
+        paths.append(path)
+        sigs.append(sig)
+    n = len(paths)
+    X = np.stack(rows) if rows else np.zeros((0, RELATED_DIM), dtype=np.float32)
+    del rows
+
+    nbr = np.full((n, keep), -1, dtype=np.int32)
+    nbs = np.zeros((n, keep), dtype=np.float32)
+    removed = len(old_pos) - len(unchanged)
+    full = state is None or len(changed) + removed > n // 2
+    rescore: List[int] = list(range(n)) if full else list(changed)
+
+    if not full and unchanged:
+        # Old lists hold the true top neighbors among articles that are still
+        # unchanged; merge in exact scores against every changed article.
+        new_index = {old_pos[paths[i]]: i for i in unchanged}
+        u = np.asarray(unchanged, dtype=np.int64)
+        c = np.asarray(changed, dtype=np.int64)
+        cross = X[u] @ X[c].T if len(c) else np.zeros((len(u), 0), dtype=np.float32)
+        for row, i in enumerate(unchanged):
+            o = old_pos[paths[i]]
+            was_full = int((state["nbr"][o] >= 0).sum()) >= min(keep, len(old_pos) - 1)
+            kept = [(new_index[int(j)], float(s)) for j, s in zip(state["nbr"][o], state["nbs"][o])
+                    if j >= 0 and int(j) in new_index]
+            if was_full and len(kept) < min(k, len(unchanged) - 1):
+                rescore.append(i)
+                continue
+            cands = np.array([j for j, _ in kept] + list(c), dtype=np.int64)
+            scores = np.array([s for _, s in kept] + list(cross[row]), dtype=np.float32)
+            top_j, top_s = _top(cands, scores, keep)
+            nbr[i, : len(top_j)] = top_j
+            nbs[i, : len(top_s)] = top_s
+
+    for i, (top_j, top_s) in _neighbors(X, rescore, keep).items():
+        nbr[i], nbs[i] = -1, 0.0
+        nbr[i, : len(top_j)] = top_j
+        nbs[i, : len(top_s)] = top_s
+
+    _save_state(paths, sigs, X, nbr, nbs)
+    neighbors, scores = [], []
+    for i in range(n):
+        pairs = [(int(j), round(float(s), 3)) for j, s in zip(nbr[i, :k], nbs[i, :k]) if j >= 0 and s > 0]
+        neighbors.append([j for j, _ in pairs])
+        scores.append([s for _, s in pairs])
+    safe_write_json(RELATED_PATH, {"k": k, "paths": paths, "neighbors": neighbors, "scores": scores}, compact=True)
+    stats = {"changed": len(changed), "rescored": len(rescore) - (0 if full else len(changed)), "total": n}
+    logger.info(
+        f"Related posts: {stats['changed']} changed, {stats['rescored']} rescored in full, "
+        f"{n} articles -> {RELATED_PATH.name}"
+    )
+    return stats
@@ -0,0 +1,225 @@
+"""Model tier routing for map prompts.
+
+Each map task (a whole short article or one section of a long one) is
+measured first: body length, the share of Latin letters among all letters,
+and how often this exact text produced invalid output before. Most tasks go
+to the first, cheapest tier in MODEL_TIERS. Long bodies, mostly-English
+bodies and texts that already failed validation start at the next tier up.
+When a tier's output fails to parse or validate, the same task escalates to
+the next tier in the same call. Only the last tier's failure is returned to
+the caller.
+
+Every attempt is recorded in a small SQLite table (ROUTING_DB): task, text
+key, tier, model, routing reason, outcome, latency, tokens and cost from
+MODEL_PRICES. The failure counts used for routing come from the same table,
+so they carry over between runs and processes. `summarize` aggregates it per
+tier for the end-of-run log.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .config import (
+    MODEL_PRICES,
+    MODEL_TIERS,
+    ROUTE_LATIN_RATIO,
+    ROUTE_LONG_CHARS,
+    ROUTE_MAX_FAILURES,
+    ROUTING_DB,
+)
+from .llm import call_llm_usage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_CJK_RE = re.compile(r"[一-鿿]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    ts REAL NOT NULL,
+    task TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    model TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    latency_s REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_key ON attempts (key, outcome);
+"""
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    model: str
+    base_url: str
+
+
+@dataclass(frozen=True)
+class TaskFeatures:
+    chars: int
+    latin_ratio: float
+    failures: int
+
+
+TIERS: List[Tier] = [Tier(*t) for t in MODEL_TIERS]
+
+
+def _connect() -> sqlite3.Connection:
+    ROUTING_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(ROUTING_DB, timeout=30, isolation_level=None)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _failures(key: str) -> int:
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM attempts WHERE key = ? AND outcome = 'invalid'", (key,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        # Bookkeeping only: route as if the text never failed
+        logger.debug(f"Failed to read routing history: {e}")
+        return 0
+    return int(row[0])
+
+
+def measure(text: str, key: str) -> TaskFeatures:
+    """Routing features of `text`; `key` identifies it across runs (e.g. its MD5)."""
+    latin = len(_LATIN_RE.findall(text))
+    cjk = len(_CJK_RE.findall(text))
+    return TaskFeatures(
+        chars=len(text),
+        latin_ratio=latin / (latin + cjk) if latin + cjk else 0.0,
+        failures=_failures(key),
+    )
+
+
+def choose_tier(features: TaskFeatures) -> Tuple[int, str]:
+    """Index into TIERS to start from, and the reason for it."""
+    if len(TIERS) < 2:
+        return 0, "single"
+    if features.failures >= ROUTE_MAX_FAILURES:
+        return 1, "failures"
+    if features.chars >= ROUTE_LONG_CHARS:
+        return 1, "long"
+    if features.latin_ratio >= ROUTE_LATIN_RATIO:
+        return 1, "latin"
+    return 0, "default"
+
+
+def cost_of(model: str, usage: Dict) -> float:
+    """USD cost of one call from its reported usage (0 for unpriced models)."""
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (
+        int(usage.get("prompt_tokens") or 0) * price_in + int(usage.get("completion_tokens") or 0) * price_out
+    ) / 1e6
+
+
+def record_attempt(
+    task: str,
+    key: str,
+    tier: Tier,
+    reason: str,
+    outcome: str,
+    latency: float,
+    usage: Dict,
+    price_factor: float = 1.0,
+) -> None:
+    try:
+        with closing(_connect()) as conn:
+            conn.execute(
+                "INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    task,
+                    key,
+                    tier.name,
+                    tier.model,
+                    reason,
+                    outcome,
+                    latency,
+                    int(usage.get("prompt_tokens") or 0),
+                    int(usage.get("completion_tokens") or 0),
+                    cost_of(tier.model, usage) * price_factor,
+                ),
+            )
+    except sqlite3.Error as e:
+        # Bookkeeping only: never fail an analysis over it
+        logger.debug(f"Failed to record routing attempt: {e}")
+
+
+def call_routed(
+    task: str,
+    key: str,
+    messages: List[dict],
+    text: str,
+    validate: Callable[[str], T],
+    temperature: float = 0.7,
+) -> Optional[T]:
+    """Run `messages` on the tier chosen for `text`, escalating on invalid output.
+
+    `validate` parses the raw reply and raises on invalid output. Returns its
+    result, or None when every tier from the chosen one up returned invalid
+    output. Request errors (after retries) propagate as with `call_llm`.
+    """
+    start_tier, reason = choose_tier(measure(text, key))
+    for i in range(start_tier, len(TIERS)):
+        tier = TIERS[i]
+        started = time.perf_counter()
+        try:
+            raw, usage = call_llm_usage(messages, model=tier.model, temperature=temperature, base_url=tier.base_url)
+        except Exception:
+            record_attempt(task, key, tier, reason, "error", time.perf_counter() - started, {})
+            raise
+        latency = time.perf_counter() - started
+        try:
+            result = validate(raw)
+        except Exception as e:
+            record_attempt(task, key, tier, reason, "invalid", latency, usage)
+            logger.warning(f"Invalid {task} output from {tier.name} tier ({tier.model}): {e}")
+            reason = "escalated"
+            continue
+        record_attempt(task, key, tier, reason, "ok", latency, usage)
+        logger.debug(f"{task} routed to {tier.name} ({reason}) in {latency:.1f}s")
+        return result
+    return None
+
+
+def summarize(since: float = 0.0) -> List[Dict]:
+    """Per-tier attempts, outcomes, mean latency, tokens and cost since `since`."""
+    try:
+        with closing(_connect()) as conn:
+            rows = conn.execute(
+                "SELECT tier, model, COUNT(*), SUM(outcome = 'ok'), SUM(outcome = 'invalid'), "
+                "SUM(outcome = 'error'), AVG(latency_s), SUM(prompt_tokens + completion_tokens), SUM(cost) "
+                "FROM attempts WHERE ts >= ? GROUP BY tier, model ORDER BY tier",
+                (since,),
+            ).fetchall()
+    except sqlite3.Error:
+        return []
+    keys = ("tier", "model", "calls", "ok", "invalid", "error", "latency_s", "tokens", "cost")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def log_summary(since: float = 0.0) -> None:
+    for s in summarize(since):
+        logger.info(
+            f"Routing {s['tier']} ({s['model']}): {s['calls']} calls, {s['ok']} ok, "
+            f"{s['invalid']} invalid, {s['error']} errors, {s['latency_s']:.1f}s avg, "
+            f"{s['tokens']} tokens, ${s['cost']:.4f}"
+        )
@@ -1,9 +1,17 @@
 """CLI entry: scan blog posts, map-reduce analysis with MD5 caching.
 
 Usage:
-  python -m scripts.ai_analysis.run [--force] [--limit N] [--verbose] [--dry-run]
+  python -m scripts.ai_analysis.run [analyze|reduce|export|import|merge] [--bundle PATH] [--shard I/N] [--force] [--resume] [--limit N] [--verbose] [--dry-run] [--columnar] [--batch] [--watch] [--priority P] [--publish-every K] [--publish-interval T]
   or
-  python scripts/ai_analysis/run.py [--force] [--limit N] [--verbose] [--dry-run]
+  python scripts/ai_analysis/run.py [analyze|reduce|export|import|merge] [--bundle PATH] [--shard I/N] [--force] [--resume] [--limit N] [--verbose] [--dry-run] [--columnar] [--batch] [--watch] [--priority P] [--publish-every K] [--publish-interval T]
+
+Each finished article is journaled immediately, so an interrupted run keeps
+its paid work; `--resume` continues exactly the unfinished tasks and `reduce`
+rebuilds the global output from the cache without any map calls.
+
+Tasks run in priority order (`--priority`, default missing,newest,recent) and
+the global output is republished every K completions or T seconds, so the
+most important articles go live early in a long backfill.
 """
 
 from __future__ import annotations
@@ -13,8 +21,9 @@ import concurrent.futures
 import json
 import logging
 import sys
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Support both direct script execution and module execution
 if __name__ == "__main__" and __package__ is None:
@@ -25,11 +34,37 @@ if __name__ == "__main__" and __package__ is None:
         sys.path.insert(0, str(_parent_dir))
     __package__ = "ai_analysis"
 
-from .config import CACHE_DIR, CONTENT_BLOG_DIR, MANIFEST_PATH, OUTPUT_GLOBAL
-from .reduce_analyze import reduce_global
-from .schema import ArticleAnalysis
+from .batch import run_batch
+from .bundle import BundleError, export_bundle, import_bundle
+from .checkpoint import Journal, RunState, apply_entry, commit_manifest, load_manifest
+from .columnar import export_columnar
+from .parallel import map_local
+from .plan import HIT, LOCAL, REUSED, inspect_article
+from .config import (
+    BUNDLE_PATH,
+    CACHE_DIR,
+    CONTENT_BLOG_DIR,
+    JOURNAL_PATH,
+    MANIFEST_PATH,
+    OUTPUT_GLOBAL,
+    OUTPUT_SUMMARY,
+    PRIORITY,
+    PUBLISH_EVERY,
+    PUBLISH_INTERVAL_S,
+    RUN_STATE_PATH,
+    WATCH_DEBOUNCE_S,
+    WATCH_SETTLE_S,
+)
+from .fingerprint import fingerprint
+from .publish import iter_records, publish_global, read_previous_assignment
+from .related import build_related
+from .router import log_summary as log_routing_summary
+from .scheduler import Publisher, parse_priority, prioritize
+from .shard import merge_shards, parse_shard, write_shard_manifest
+from .store import article_id, normalize_key, object_name, object_path, relative_key
 from .utils import md5_hash_text, parse_frontmatter_and_body, safe_load_json, safe_write_json
-from .map_analyze import analyze_single_article
+from .map_analyze import analyze_single_article, compute_metrics
+from .watch import watch
 
 # Logger will be configured in main()
 logger = logging.getLogger(__name__)
@@ -43,22 +78,232 @@ def _article_candidates() -> List[Path]:
     return sorted(paths)
 
 
-def _safe_article_name(article_path: Path) -> str:
-    return article_path.parent.name if article_path.name.lower() == "index.md" else article_path.stem
+def _plan_tasks(
+    candidates: List[Path], manifest: Dict, journal: Journal, force: bool, dry_run: bool
+) -> Tuple[List[Path], int, int]:
+    """Hash every candidate and return (tasks needing the LLM, near-duplicate reuse
+    count, count recomputed locally after a local stage version bump).
+
+    Articles are inspected on the local process pool; only the returned
+    entries are applied to the manifest and journal here.
+    """
+    jobs = []
+    for ap in candidates:
+        key = relative_key(ap)
+        jobs.append((ap, force, dry_run, manifest["latest"].get(key), manifest["fingerprints"].get(key)))
+
+    tasks: List[Path] = []
+    reused = 0
+    recomputed = 0
+    for ap, (outcome, entry) in zip(candidates, map_local(inspect_article, jobs)):
+        if outcome == HIT:
+            logger.debug(f"Cache hit: {ap.name}")
+            # Record latest mapping
+            manifest["latest"][entry["path"]] = entry["cache"]
+            if entry.get("fingerprint"):
+                manifest["fingerprints"].setdefault(entry["path"], entry["fingerprint"])
+        elif outcome == LOCAL:
+            # Only local stages changed: recomputed without an LLM call
+            recomputed += 1
+            if not dry_run:
+                journal.append(entry)
+                apply_entry(manifest, entry)
+        elif outcome == REUSED:
+            logger.info(f"Near-duplicate edit, reusing analysis: {ap.name}")
+            journal.append(entry)
+            apply_entry(manifest, entry)
+            reused += 1
+        else:
+            tasks.append(ap)
+    return tasks, reused, recomputed
+
 
+def _run_tasks(
+    tasks: List[Path],
+    manifest: Dict,
+    journal: Journal,
+    on_done: Optional[Callable[[], None]] = None,
+    force: bool = False,
+) -> int:
+    """Analyze tasks concurrently, journaling each article as soon as it finishes.
 
-def _cache_filename(article_path: Path, body_md5: str) -> Path:
-    safe_name = _safe_article_name(article_path)
-    return CACHE_DIR / f"{safe_name}_{body_md5}.json"
+    Tasks are submitted in the given order, which the pool's FIFO queue keeps.
+    `on_done` runs on the calling thread after each finished article is applied
+    to the manifest.
+    """
+
+    def _work(p: Path) -> Optional[Dict]:
+        try:
+            analysis = analyze_single_article(p, force=force)
+            # Write cache
+            safe_write_json(object_path(analysis.md5), analysis.model_dump())
+            _, body = parse_frontmatter_and_body(p)
+            entry = {
+                "path": relative_key(p),
+                "cache": object_name(analysis.md5),
+                "md5": analysis.md5,
+                "fingerprint": fingerprint(body, analysis.md5),
+                "analyzed": True,
+            }
+            # Journal from the worker so finished work survives an interrupt
+            journal.append(entry)
+            return entry
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Failed to analyze {p.name}: {e}")
+            return None
+
+    analyzed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as ex:
+        futures = [ex.submit(_work, t) for t in tasks]
+        for fut in concurrent.futures.as_completed(futures):
+            entry = fut.result()
+            if entry is None:
+                continue
+            apply_entry(manifest, entry)
+            analyzed += 1
+            if on_done is not None:
+                on_done()
+    return analyzed
+
+
+def _reduce_and_write(
+    candidates: List[Path], manifest: Dict, columnar: bool, name_topics: bool = True
+) -> None:
+    # The reduce streams over the cache (publish.py): records are loaded a
+    # chunk at a time and per-article output is written as it goes
+    cache_files: List[Path] = []
+    for ap in candidates:
+        entry = manifest["latest"].get(relative_key(ap))
+        if entry:
+            cache_files.append(CACHE_DIR / entry)
+
+    previous_topics = None
+    previous_assignment = None
+    if not name_topics:
+        previous = safe_load_json(OUTPUT_SUMMARY) or safe_load_json(OUTPUT_GLOBAL) or {}
+        previous_topics = (previous.get("summary") or {}).get("topics")
+        previous_assignment = read_previous_assignment(OUTPUT_GLOBAL)
+    publish_global(
+        cache_files,
+        name_topics=name_topics,
+        previous_topics=previous_topics,
+        previous_assignment=previous_assignment,
+    )
+    build_related(iter_records(cache_files, warn=False))
+    if columnar:
+        export_columnar(js for js in (safe_load_json(cf) for cf in cache_files) if js)
+    logger.info(f"✅ Global analysis written to: {OUTPUT_GLOBAL}")
+
+
+def _publish_local_metrics(ap: Path) -> None:
+    """Patch one article's local metrics into the published output (no LLM)."""
+    js = safe_load_json(OUTPUT_GLOBAL) or {"summary": {}, "perArticle": []}
+    key = relative_key(ap)
+    per_article = [a for a in js.get("perArticle", []) if normalize_key(a.get("path", "")) != key]
+    entry = next((a for a in js.get("perArticle", []) if normalize_key(a.get("path", "")) == key), None)
+    if ap.exists():
+        meta, body = parse_frontmatter_and_body(ap)
+        if entry is None:
+            entry = {
+                "title": meta.get("title", article_id(ap)),
+                "path": key,
+                "tags": [],
+                "content": {"keywords": [], "concepts": []},
+            }
+        entry["id"] = article_id(ap)
+        entry["md5"] = md5_hash_text(body)
+        entry["metrics"] = compute_metrics(body)
+        per_article.append(entry)
+    js["perArticle"] = per_article
+    safe_write_json(OUTPUT_GLOBAL, js)
+    # Keep the About page's compact summary in step, as publish_global does
+    safe_write_json(OUTPUT_SUMMARY, {"summary": js.get("summary", {})}, compact=True)
+    logger.info(f"Local metrics refreshed: {ap.name}")
+
+
+def _watch(manifest: Dict, journal: Journal, columnar: bool) -> None:
+    def _on_settled(ap: Path) -> None:
+        key = relative_key(ap)
+        if ap.exists():
+            tasks, _, _ = _plan_tasks([ap], manifest, journal, force=False, dry_run=False)
+            _run_tasks(tasks, manifest, journal)
+        else:
+            manifest["latest"].pop(key, None)
+            manifest["fingerprints"].pop(key, None)
+        commit_manifest(MANIFEST_PATH, manifest, journal)
+        # Incremental republish keeps existing topic names: no reduce LLM call
+        _reduce_and_write(_article_candidates(), manifest, columnar, name_topics=False)
+
+    watch(
+        CONTENT_BLOG_DIR,
+        on_local=_publish_local_metrics,
+        on_settled=_on_settled,
+        debounce_s=WATCH_DEBOUNCE_S,
+        settle_s=WATCH_SETTLE_S,
+    )
 
 
 def main():
     parser = argparse.ArgumentParser(description="AI analysis for blog posts")
-    parser.add_argument("--force", action="store_true", help="recompute and ignore cache")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="analyze",
+        choices=["analyze", "reduce", "export", "import", "merge"],
+        help=(
+            "analyze (map + reduce, default), reduce only from the existing cache, "
+            "export/import the cache as a portable bundle, or merge shard outputs and reduce"
+        ),
+    )
+    parser.add_argument(
+        "--bundle",
+        type=Path,
+        action="append",
+        help=f"bundle path for export/import (default {BUNDLE_PATH.name}); repeatable for merge",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="analyze only shard I of N (I/N, 0-based); skips reduce, combine with 'merge'",
+    )
+    parser.add_argument("--force", action="store_true", help="recompute and ignore cache (including near-duplicate reuse)")
+    parser.add_argument("--resume", action="store_true", help="continue the unfinished tasks of an interrupted run")
     parser.add_argument("--limit", type=int, default=0, help="limit number of articles")
     parser.add_argument("--verbose", action="store_true", help="verbose logging")
     parser.add_argument("--dry-run", action="store_true", help="no LLM calls, only list targets")
+    parser.add_argument("--columnar", action="store_true", help="also export per-article analyses to Parquet")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="send the pending map prompts as provider batch jobs first, then analyze from the filled cache",
+    )
+    parser.add_argument(
+        "--priority",
+        default=PRIORITY,
+        help="comma-separated task order policies: missing, newest, recent (empty for path order)",
+    )
+    parser.add_argument(
+        "--publish-every",
+        type=int,
+        default=PUBLISH_EVERY,
+        help="republish the global output after every K analyzed articles (0 disables)",
+    )
+    parser.add_argument(
+        "--publish-interval",
+        type=float,
+        default=PUBLISH_INTERVAL_S,
+        help="republish the global output at least every T seconds while analyzing (0 disables)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after the initial run, keep watching the blog and re-analyze edited articles",
+    )
     args = parser.parse_args()
+    try:
+        policies = parse_priority(args.priority)
+    except ValueError as e:
+        parser.error(str(e))
 
     # Setup logging - configure root logger and all handlers
     log_level = logging.DEBUG if args.verbose else logging.INFO
@@ -85,75 +330,97 @@ def main():
         candidates = candidates[: args.limit]
         logger.info(f"Limited to {args.limit} articles")
 
-    manifest = safe_load_json(MANIFEST_PATH) or {"latest": {}, "history": []}
+    shard = args.shard
+    if shard is not None:
+        candidates = [ap for ap in candidates if shard.owns(relative_key(ap))]
+        logger.info(f"{shard.label}: {len(candidates)} articles in this shard")
 
-    tasks: List[Path] = []
-    for ap in candidates:
-        _, body = parse_frontmatter_and_body(ap)
-        h = md5_hash_text(body)
-        cache_file = _cache_filename(ap, h)
-        if args.force:
-            tasks.append(ap)
-        else:
-            if cache_file.exists():
-                logger.debug(f"Cache hit: {ap.name}")
-                # Record latest mapping
-                manifest["latest"][str(ap)] = cache_file.name
-                continue
-            tasks.append(ap)
+    journal = Journal(shard.journal_path if shard else JOURNAL_PATH)
+    run_state = RunState(shard.run_state_path if shard else RUN_STATE_PATH)
+    manifest = load_manifest(MANIFEST_PATH, journal)
+    bundles = args.bundle or [BUNDLE_PATH]
+
+    if args.command == "export":
+        export_bundle(bundles[0], manifest)
+        return
+    if args.command in ("import", "merge"):
+        try:
+            # merge only imports bundles that were passed explicitly
+            for b in bundles if args.command == "import" else args.bundle or []:
+                import_bundle(b, manifest)
+        except BundleError as e:
+            logger.error(f"Bundle import failed: {e}")
+            sys.exit(1)
+        merged = merge_shards(manifest) if args.command == "merge" else []
+        commit_manifest(MANIFEST_PATH, manifest, journal, run_state)
+        for p in merged:
+            p.unlink(missing_ok=True)
+        if args.command == "merge":
+            _reduce_and_write(candidates, manifest, args.columnar)
+        return
 
-    logger.info(f"Processing {len(tasks)} articles ({len(candidates) - len(tasks)} cached)")
+    if args.command == "reduce":
+        _reduce_and_write(candidates, manifest, args.columnar)
+        commit_manifest(MANIFEST_PATH, manifest, journal, run_state)
+        return
+
+    pending = run_state.pending(journal) if args.resume else None
+    if pending is not None:
+        tasks, reused, recomputed = pending, 0, 0
+        logger.info(f"Resuming interrupted run: {len(tasks)} unfinished articles")
+    else:
+        if args.resume:
+            logger.info("No interrupted run to resume, scanning all articles")
+        tasks, reused, recomputed = _plan_tasks(candidates, manifest, journal, args.force, args.dry_run)
+        logger.info(
+            f"Processing {len(tasks)} articles "
+            f"({len(candidates) - len(tasks) - reused - recomputed} cached, {reused} near-duplicate reused, "
+            f"{recomputed} recomputed locally)"
+        )
+
+    tasks = prioritize(tasks, manifest, policies)
 
     if args.dry_run:
         for t in tasks:
             logger.info(f"DRY RUN target: {t}")
         return
 
-    results: List[ArticleAnalysis] = []
-
-    def _work(p: Path) -> Optional[ArticleAnalysis]:
-        try:
-            analysis = analyze_single_article(p)
-            # Write cache
-            cache_path = _cache_filename(p, analysis.md5)
-            safe_write_json(cache_path, analysis.model_dump())
-            return analysis
-        except Exception as e:  # noqa: BLE001
-            logger.error(f"Failed to analyze {p.name}: {e}")
-            return None
+    run_state.save(tasks)
+    run_started = time.time()
+    if args.batch and args.force:
+        # Forced tasks ignore the caches a batch would fill
+        logger.warning("--batch has no effect with --force, analyzing synchronously")
+    elif args.batch and tasks:
+        # Whatever the batch could not answer is called synchronously below
+        run_batch(tasks)
+    history_start = len(manifest["history"])
+    publisher = Publisher(
+        # Partial publishes keep the previous topic names: no reduce LLM call
+        lambda: _reduce_and_write(candidates, manifest, columnar=False, name_topics=False),
+        every=args.publish_every,
+        interval_s=args.publish_interval,
+    )
+    # Shards never publish; 'merge' reduces once over all of them
+    on_done = publisher.completed if shard is None and publisher.enabled and len(tasks) > 1 else None
+    analyzed = _run_tasks(tasks, manifest, journal, on_done, force=args.force)
+    logger.info(f"Successfully analyzed {analyzed}/{len(tasks)} new articles")
+    if reused:
+        logger.info(f"Near-duplicate reuse saved {reused} LLM calls")
+    log_routing_summary(run_started)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as ex:
-        for res in ex.map(_work, tasks):
-            if res is not None:
-                results.append(res)
-                ap = Path(res.path)
-                manifest["latest"][str(ap)] = f"{_safe_article_name(ap)}_{res.md5}.json"
-                manifest["history"].append({"path": res.path, "md5": res.md5})
-    
-    logger.info(f"Successfully analyzed {len(results)}/{len(tasks)} new articles")
+    if shard is not None:
+        # Shards only publish their own entries; 'merge' commits and reduces once
+        write_shard_manifest(shard, manifest, history_start)
+        run_state.drop_finished(journal)
+        journal.clear()
+        return
 
-    # Load latest from cache for all candidates to build full perArticle list
-    per_article: List[ArticleAnalysis] = []
-    for ap in candidates:
-        entry = manifest["latest"].get(str(ap))
-        if not entry:
-            continue
-        cf = CACHE_DIR / entry
-        js = safe_load_json(cf)
-        if js:
-            try:
-                per_article.append(ArticleAnalysis(**js))
-            except Exception as e:
-                logger.warning(f"Failed to load cached analysis for {ap.name}: {e}")
-
-    logger.info(f"Loaded {len(per_article)} total articles for global reduction")
-    global_js = reduce_global(per_article)
-    safe_write_json(OUTPUT_GLOBAL, global_js.model_dump())
-    safe_write_json(MANIFEST_PATH, manifest)
-    logger.info(f"✅ Global analysis written to: {OUTPUT_GLOBAL}")
+    # Commit before reducing so a reduce failure never loses map results
+    commit_manifest(MANIFEST_PATH, manifest, journal, run_state)
+    _reduce_and_write(candidates, manifest, args.columnar)
+    if args.watch:
+        _watch(manifest, journal, args.columnar)
 
 
 if __name__ == "__main__":
     main()
-
-
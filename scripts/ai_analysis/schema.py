@@ -5,7 +5,7 @@ Pydantic is used to validate and ensure consistent outputs.
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 
 
@@ -42,6 +42,16 @@ class Diagnostics(BaseModel):
     warnings: List[str] = Field(default_factory=list)
 
 
+class SectionAnalysis(BaseModel):
+    """LLM output for one heading-delimited section of a long article."""
+
+    style: Style = Field(default_factory=Style)
+    content: ContentInfo = Field(default_factory=ContentInfo)
+    sentiment: Sentiment = Field(default_factory=Sentiment)
+    structure: Structure = Field(default_factory=Structure)
+    depth: Optional[str] = None
+
+
 class ArticleAnalysis(BaseModel):
     id: str
     title: str
@@ -58,6 +68,10 @@ class ArticleAnalysis(BaseModel):
     stance: Dict[str, Optional[str]] = Field(default_factory=dict)
     structure: Structure = Field(default_factory=Structure)
     depth: Optional[str] = None
+    # Section MD5s for long articles analyzed per section (see sections.py)
+    sections: List[str] = Field(default_factory=list)
+    # Stage keys this analysis was produced with (see stages.py)
+    stages: Dict[str, str] = Field(default_factory=dict)
 
     diagnostics: Diagnostics = Field(default_factory=Diagnostics)
 
@@ -65,12 +79,17 @@ class ArticleAnalysis(BaseModel):
 class ConceptNode(BaseModel):
     id: str
     weight: int
+    # Precomputed layout position and community id
+    x: Optional[float] = None
+    y: Optional[float] = None
+    category: int = 0
 
 
 class ConceptLink(BaseModel):
     source: str
     target: str
-    weight: int
+    weight: float  # NPMI
+    count: int = 0
 
 
 class TopicItem(BaseModel):
@@ -97,9 +116,14 @@ class Summary(BaseModel):
     sentimentDist: Dict[str, float] = Field(default_factory=dict)
     topics: List[TopicItem] = Field(default_factory=list)
     conceptNetwork: Dict[str, List[Dict]] = Field(default_factory=dict)  # nodes/links
-    timelineDepth: List[Dict[str, str]] = Field(default_factory=list)
+    # Per month: {period, count, depth}, depth = mean level (1 intro .. 3 principle)
+    timelineDepth: List[Dict[str, Union[str, int, float]]] = Field(default_factory=list)
     structures: List[StructureItem] = Field(default_factory=list)
     topicSentiment: List[TopicSentiment] = Field(default_factory=list)
+    sentenceLenBuckets: Dict[str, int] = Field(default_factory=dict)
+    keywordFreq: List[Dict[str, Union[str, int]]] = Field(default_factory=list)  # [{name, value}]
+    # Topic x period x tag aggregates (see cube.py)
+    cube: Dict[str, Any] = Field(default_factory=dict)
 
 
 class GlobalAnalysis(BaseModel):
@@ -0,0 +1,159 @@
+"""Section-level helpers for long articles.
+
+Long posts are split at their top-level headings, each section is analyzed
+and cached by the MD5 of its text, and the section results are merged back
+into one article-level analysis. Editing or appending a section then only
+re-sends that section to the LLM.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .records import TONE_KEYS
+from .utils import md5_hash_text
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+\S")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+MAX_MERGED_TERMS = 10
+MAX_MERGED_TROPES = 8
+
+
+@dataclass
+class Section:
+    heading: str
+    text: str
+    md5: str
+
+    @property
+    def chars(self) -> int:
+        return len(self.text)
+
+
+def _heading_lines(lines: List[str]) -> List[tuple]:
+    """Return (line index, heading level) for headings outside code fences."""
+    found = []
+    in_fence = False
+    for i, line in enumerate(lines):
+        if _FENCE_RE.match(line):
+            in_fence = not in_fence
+            continue
+        if not in_fence:
+            m = _HEADING_RE.match(line)
+            if m:
+                found.append((i, len(m.group(1))))
+    return found
+
+
+def split_sections(body: str) -> List[Section]:
+    """Split a markdown body at its top-level (shallowest) headings.
+
+    Text before the first heading becomes its own section. Splitting only at
+    the shallowest level keeps boundaries stable when subsections change.
+    """
+    lines = body.splitlines()
+    headings = _heading_lines(lines)
+    if not headings:
+        return [Section(heading="", text=body, md5=md5_hash_text(body))]
+
+    top = min(level for _, level in headings)
+    starts = [i for i, level in headings if level == top]
+    if starts[0] != 0:
+        starts = [0] + starts
+    bounds = starts + [len(lines)]
+
+    sections: List[Section] = []
+    for a, b in zip(bounds, bounds[1:]):
+        text = "\n".join(lines[a:b]).strip()
+        if not text:
+            continue
+        first = lines[a]
+        heading = first.lstrip("#").strip() if _HEADING_RE.match(first) else ""
+        sections.append(Section(heading=heading, text=text, md5=md5_hash_text(text)))
+    return sections
+
+
+def _ranked_terms(parts: List[Dict], weights: List[int], field: str, limit: int) -> List[str]:
+    # Earlier terms within a section count more; longer sections count more
+    scores: Counter[str] = Counter()
+    for part, w in zip(parts, weights):
+        for rank, term in enumerate((part.get("content") or {}).get(field) or []):
+            if term:
+                scores[term] += w / (rank + 1)
+    return [t for t, _ in scores.most_common(limit)]
+
+
+def _heaviest(parts: List[Dict], weights: List[int], getter) -> Optional:
+    best, best_w = None, -1
+    for part, w in zip(parts, weights):
+        value = getter(part)
+        if value and w > best_w:
+            best, best_w = value, w
+    return best
+
+
+def merge_section_analyses(parts: List[Dict], weights: List[int]) -> Dict:
+    """Merge per-section analysis dicts into article-level fields.
+
+    Numeric fields are length-weighted means; ranked lists are merged by
+    length- and rank-weighted scores; free-text fields come from the longest
+    section that has them, except opening/closing which come from the ends.
+    """
+    tone: Dict[str, float] = {}
+    for key in TONE_KEYS:
+        total = sum(
+            w for p, w in zip(parts, weights) if ((p.get("style") or {}).get("tone") or {}).get(key) is not None
+        )
+        if total:
+            tone[key] = round(
+                sum(
+                    float(p["style"]["tone"][key]) * w
+                    for p, w in zip(parts, weights)
+                    if ((p.get("style") or {}).get("tone") or {}).get(key) is not None
+                )
+                / total,
+                3,
+            )
+
+    scored = [
+        (float(p["sentiment"]["score"]), w)
+        for p, w in zip(parts, weights)
+        if (p.get("sentiment") or {}).get("score") is not None
+    ]
+    score = round(sum(s * w for s, w in scored) / sum(w for _, w in scored), 3) if scored else None
+
+    tropes: Counter[str] = Counter()
+    patterns: Counter[str] = Counter()
+    for p, w in zip(parts, weights):
+        for t in (p.get("style") or {}).get("tropes") or []:
+            if t:
+                tropes[t] += w
+        pattern = (p.get("structure") or {}).get("pattern")
+        if pattern:
+            patterns[pattern] += w
+
+    return {
+        "style": {
+            "tone": tone,
+            "rhythm": _heaviest(parts, weights, lambda p: (p.get("style") or {}).get("rhythm")),
+            "tropes": [t for t, _ in tropes.most_common(MAX_MERGED_TROPES)],
+        },
+        "content": {
+            "keywords": _ranked_terms(parts, weights, "keywords", MAX_MERGED_TERMS),
+            "concepts": _ranked_terms(parts, weights, "concepts", MAX_MERGED_TERMS),
+        },
+        "sentiment": {
+            "label": _heaviest(parts, weights, lambda p: (p.get("sentiment") or {}).get("label")),
+            "score": score,
+        },
+        "structure": {
+            "pattern": patterns.most_common(1)[0][0] if patterns else None,
+            "opening": (parts[0].get("structure") or {}).get("opening") if parts else None,
+            "closing": (parts[-1].get("structure") or {}).get("closing") if parts else None,
+        },
+        "depth": _heaviest(parts, weights, lambda p: p.get("depth")),
+    }
@@ -0,0 +1,136 @@
+"""Deterministic sharding of the map stage across processes or machines.
+
+An article belongs to shard `sha1(relative path) mod N`, which depends only on
+the article itself, so adding posts never moves existing ones between shards.
+Each shard run writes its manifest entries to `cache/shards/shard-I-of-N.json`
+(inside the cache, so bundles carry it). `merge` folds all shard manifests
+into the main manifest in shard order and then reduces once.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .config import AI_DIR, SHARD_DIR
+from .utils import safe_load_json, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+_SHARD_RE = re.compile(r"^(\d+)/(\d+)$")
+_SHARD_FILE_RE = re.compile(r"^shard-(\d+)-of-(\d+)\.json$")
+
+
+class ShardSpec:
+    __slots__ = ("index", "count")
+
+    def __init__(self, index: int, count: int) -> None:
+        self.index = index
+        self.count = count
+
+    @property
+    def label(self) -> str:
+        return f"shard-{self.index}-of-{self.count}"
+
+    @property
+    def manifest_path(self) -> Path:
+        return SHARD_DIR / f"{self.label}.json"
+
+    @property
+    def journal_path(self) -> Path:
+        # Per-shard run state so shards can share one checkout
+        return AI_DIR / f"manifest.{self.label}.journal"
+
+    @property
+    def run_state_path(self) -> Path:
+        return AI_DIR / f"run_state.{self.label}.json"
+
+    def owns(self, key: str) -> bool:
+        return shard_of(key, self.count) == self.index
+
+
+def parse_shard(value: str) -> ShardSpec:
+    """argparse type for `--shard I/N` (0-based I)."""
+    m = _SHARD_RE.match(value.strip())
+    if not m:
+        raise argparse.ArgumentTypeError("expected I/N, e.g. 0/4")
+    index, count = int(m.group(1)), int(m.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must satisfy 0 <= I < N")
+    return ShardSpec(index, count)
+
+
+def shard_of(key: str, count: int) -> int:
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def write_shard_manifest(spec: ShardSpec, manifest: Dict, history_start: int = 0) -> None:
+    """Persist only the entries this shard owns.
+
+    History entries before `history_start` predate this run and are already in
+    the main manifest, so they are not repeated.
+    """
+    owned = {
+        "shard": {"index": spec.index, "count": spec.count},
+        "latest": {k: v for k, v in manifest["latest"].items() if spec.owns(k)},
+        "fingerprints": {k: v for k, v in manifest["fingerprints"].items() if spec.owns(k)},
+        "history": [
+            h for h in manifest["history"][history_start:] if h.get("path") and spec.owns(h["path"])
+        ],
+    }
+    safe_write_json(spec.manifest_path, owned)
+    logger.info(f"{spec.label}: wrote {len(owned['latest'])} entries to {spec.manifest_path}")
+
+
+def _shard_files() -> List[Tuple[int, int, Path]]:
+    found = []
+    for p in SHARD_DIR.glob("shard-*-of-*.json"):
+        m = _SHARD_FILE_RE.match(p.name)
+        if m:
+            found.append((int(m.group(2)), int(m.group(1)), p))
+    return sorted(found)
+
+
+def merge_shards(manifest: Dict) -> List[Path]:
+    """Fold shard manifests into `manifest` deterministically.
+
+    Returns the merged shard files so the caller can remove them after the
+    merged manifest is committed.
+    """
+    files = _shard_files()
+    if not files:
+        logger.warning(f"No shard manifests found in {SHARD_DIR}")
+        return []
+    counts = sorted({count for count, _, _ in files})
+    if len(counts) > 1:
+        logger.warning(f"Shard manifests from different partitionings: N in {counts}")
+    for count in counts:
+        present = {idx for c, idx, _ in files if c == count}
+        missing = sorted(set(range(count)) - present)
+        if missing:
+            logger.warning(f"Merging {count}-way run with missing shards: {missing}")
+
+    merged: List[Path] = []
+    for count, idx, path in files:
+        js = safe_load_json(path)
+        if not js:
+            logger.warning(f"Skipping unreadable shard manifest {path.name}")
+            continue
+        spec = ShardSpec(idx, count)
+        for key, value in (js.get("latest") or {}).items():
+            if not spec.owns(key):
+                logger.warning(f"{spec.label}: ignoring foreign entry {key}")
+                continue
+            manifest["latest"][key] = value
+        manifest["fingerprints"].update(
+            {k: v for k, v in (js.get("fingerprints") or {}).items() if spec.owns(k)}
+        )
+        manifest["history"].extend(js.get("history") or [])
+        merged.append(path)
+    logger.info(f"Merged {len(merged)} shard manifests")
+    return merged
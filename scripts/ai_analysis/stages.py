@@ -0,0 +1,151 @@
+"""Small stage DAG with per-stage memoization.
+
+A pipeline is a list of `Stage`s. Each stage names its inputs (source values
+or earlier stages) and declares a version. Its key is the MD5 of
+(name, version, input keys), where a source's key is the MD5 of its value, so
+all keys are known before anything runs. Memoized outputs live under
+`cache/stages/<stage>/<key[:2]>/<key>.json`.
+
+Bumping one stage's version changes its own key and the keys of everything
+downstream of it, and nothing upstream: a new metrics version recomputes
+metrics and the final assembly locally, a new prompt version re-runs only the
+LLM stage.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .config import STAGE_CACHE_DIR
+from .utils import md5_hash_text, safe_load_json, safe_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """One pipeline step: `fn(**inputs)` memoized by hash(inputs, version)."""
+
+    __slots__ = ("name", "version", "inputs", "fn", "memo")
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        inputs: Sequence[str],
+        fn: Callable[..., Any],
+        memo: bool = True,
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.inputs = tuple(inputs)
+        self.fn = fn
+        # Cheap stages (or ones stored elsewhere) skip the memo and always run
+        self.memo = memo
+
+
+def source_key(value: Any) -> str:
+    """Key of a source value: MD5 of the string, or of its canonical JSON."""
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return md5_hash_text(value)
+
+
+def source_keys(sources: Dict[str, Any]) -> Dict[str, str]:
+    return {name: source_key(value) for name, value in sources.items()}
+
+
+class Pipeline:
+    """Stages in dependency order. Any input that is not a stage is a source."""
+
+    def __init__(self, stages: Sequence[Stage], memo_dir: Path = STAGE_CACHE_DIR) -> None:
+        names = {s.name for s in stages}
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"duplicate stage: {stage.name}")
+            later = [i for i in stage.inputs if i in names and i not in self.stages]
+            if later:
+                raise ValueError(f"stage {stage.name} depends on later stage(s): {', '.join(later)}")
+            self.stages[stage.name] = stage
+        self.memo_dir = memo_dir
+
+    def keys(self, source_keys: Dict[str, str]) -> Dict[str, str]:
+        """Key of every stage, from the keys of the source values."""
+        keys = dict(source_keys)
+        for name, stage in self.stages.items():
+            missing = [i for i in stage.inputs if i not in keys]
+            if missing:
+                raise KeyError(f"stage {name} is missing input(s): {', '.join(missing)}")
+            payload = [name, stage.version, [keys[i] for i in stage.inputs]]
+            keys[name] = md5_hash_text(json.dumps(payload))
+        return {name: keys[name] for name in self.stages}
+
+    def _memo_path(self, name: str, key: str) -> Path:
+        return self.memo_dir / name / key[:2] / f"{key}.json"
+
+    def _load(self, name: str, key: str) -> Optional[Dict]:
+        return safe_load_json(self._memo_path(name, key))
+
+    def is_memoized(self, name: str, keys: Dict[str, str]) -> bool:
+        return self._memo_path(name, keys[name]).exists()
+
+    def seed(self, name: str, keys: Dict[str, str], value: Any) -> None:
+        """Store a known output for a stage (e.g. recovered from a published result)."""
+        if not self.is_memoized(name, keys):
+            safe_write_json(self._memo_path(name, keys[name]), {"value": value})
+
+    def pending(self, target: str, keys: Dict[str, str]) -> List[str]:
+        """Stages that would actually execute to produce `target`.
+
+        The walk stops at memo hits, since their inputs are not needed.
+        """
+        out: List[str] = []
+
+        def visit(name: str) -> None:
+            stage = self.stages.get(name)
+            if stage is None or name in out:
+                return
+            if stage.memo and self.is_memoized(name, keys):
+                return
+            for i in stage.inputs:
+                visit(i)
+            out.append(name)
+
+        visit(target)
+        return out
+
+    def run(
+        self,
+        sources: Dict[str, Any],
+        target: str,
+        keys: Optional[Dict[str, str]] = None,
+        force: bool = False,
+    ) -> Tuple[Any, Dict[str, str]]:
+        """Produce `target`, running only stages without a memoized output.
+
+        With `force`, every stage runs and its memo is overwritten.
+        Returns (target value, stage keys).
+        """
+        if keys is None:
+            keys = self.keys(source_keys(sources))
+        values: Dict[str, Any] = dict(sources)
+
+        def resolve(name: str) -> Any:
+            if name in values:
+                return values[name]
+            stage = self.stages[name]
+            cached = self._load(name, keys[name]) if stage.memo and not force else None
+            if cached is not None and "value" in cached:
+                value = cached["value"]
+            else:
+                value = stage.fn(**{i: resolve(i) for i in stage.inputs})
+                if stage.memo:
+                    safe_write_json(self._memo_path(name, keys[name]), {"value": value})
+                logger.debug(f"Stage {name} v{stage.version} computed ({keys[name][:8]})")
+            values[name] = value
+            return value
+
+        return resolve(target), keys
@@ -0,0 +1,92 @@
+"""Portable cache keys and content-addressed cache layout.
+
+Manifest keys are article paths relative to PROJECT_ROOT (POSIX style), so a
+checkout on another machine or CI runner resolves the same entries. Analyses
+are stored under `cache/<md5[:2]>/<md5>.json`, addressed by the body MD5.
+Legacy `ARTICLENAME_MD5.json` files stay readable; manifest values are always
+paths relative to CACHE_DIR, which covers both layouts.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import CACHE_DIR, PROJECT_ROOT
+from .utils import safe_load_json
+
+# Marker used to relocate absolute keys written on another machine
+_CONTENT_MARKER = "src/content/blog/"
+_ABSOLUTE_RE = re.compile(r"^(/|[A-Za-z]:[\\/])")
+
+
+def relative_key(path: Path) -> str:
+    """Manifest key for an article path."""
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def article_id(path: Path) -> str:
+    """Article id: the directory name for `<slug>/index.md`, else the file stem."""
+    return path.parent.name if path.name.lower() == "index.md" else path.stem
+
+
+def normalize_key(key: str) -> str:
+    """Turn legacy absolute keys (possibly from another machine) into relative ones."""
+    if not _ABSOLUTE_RE.match(key):
+        return key
+    try:
+        return Path(key).relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        pass
+    posix = key.replace("\\", "/")
+    idx = posix.rfind(_CONTENT_MARKER)
+    return posix[idx:] if idx >= 0 else key
+
+
+def article_path(key: str) -> Path:
+    return PROJECT_ROOT / key
+
+
+def object_name(body_md5: str) -> str:
+    """Content-addressed cache entry for a body MD5, relative to CACHE_DIR."""
+    return f"{body_md5[:2]}/{body_md5}.json"
+
+
+def object_path(body_md5: str) -> Path:
+    return CACHE_DIR / object_name(body_md5)
+
+
+def legacy_name(article_path: Path, body_md5: str) -> str:
+    """Pre content-addressed cache file name, still honored for existing caches."""
+    return f"{article_id(article_path)}_{body_md5}.json"
+
+
+def find_cached(legacy_name: str, body_md5: str) -> Optional[str]:
+    """Return the manifest value of an existing cache entry for this body, if any."""
+    if object_path(body_md5).exists():
+        return object_name(body_md5)
+    if (CACHE_DIR / legacy_name).exists():
+        return legacy_name
+    return None
+
+
+def load_cached_analysis(article_path: Path, body_md5: str) -> Optional[Dict]:
+    """Cached ArticleAnalysis dict for this exact body, in either layout."""
+    name = find_cached(legacy_name(article_path, body_md5), body_md5)
+    return safe_load_json(CACHE_DIR / name) if name else None
+
+
+def normalize_manifest(manifest: Dict) -> Dict:
+    """Rewrite manifest keys in place to the relative form."""
+    for section in ("latest", "fingerprints"):
+        table = manifest.get(section) or {}
+        manifest[section] = {normalize_key(k): v for k, v in table.items()}
+    manifest["history"] = [
+        {**h, "path": normalize_key(h["path"])} if h.get("path") else h
+        for h in manifest.get("history") or []
+    ]
+    return manifest
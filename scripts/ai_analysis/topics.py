@@ -0,0 +1,302 @@
+"""Hierarchical (tree) reduce for LLM topic naming over the whole corpus.
+
+Level 0 splits the articles into batches of at most TOPIC_BATCH_SIZE and asks
+the LLM for candidate topics per batch, with member article ids. Each further
+level merges groups of at most TOPIC_MERGE_FANIN candidate lists, again by
+member ids, until a single call produces NUM_TOPICS final topics. Every prompt
+stays bounded, all calls of one level run concurrently, and the depth grows
+with log(corpus size).
+
+Members are tracked locally from the ids the LLM returns, so ratios stay
+exact no matter how the model rounds, and every article ends up with a topic
+index (or -1) for the aggregate cube. Batches follow the input
+(path, i.e. date) order, so a new post only changes the last leaf batch and
+the merge calls above it; everything else is served by the reduce memo.
+`TopicTree` runs the leaves while articles are still streaming in.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .config import NUM_TOPICS, REDUCE_CACHE_DIR, TOPIC_BATCH_SIZE, TOPIC_MERGE_FANIN, TOPIC_WORKERS
+from .llm import call_llm_cached
+from .records import ArticleRecord
+from .schema import TopicItem
+
+logger = logging.getLogger(__name__)
+
+MAX_REPRESENTATIVES = 3
+
+
+class Candidate:
+    """A (partial) topic: name, member article indices and representative titles."""
+
+    __slots__ = ("name", "members", "representatives")
+
+    def __init__(self, name: str, members: List[int], representatives: List[str]) -> None:
+        self.name = name
+        self.members = members
+        self.representatives = representatives
+
+    def to_payload(self, idx: int) -> Dict:
+        return {"id": idx, "name": self.name, "articles": len(self.members), "representatives": self.representatives}
+
+
+def _chunks(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _messages(system_prompt: str, payload: Dict) -> List[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+
+
+def _leaf_prompt(batch: Sequence[ArticleRecord], num_topics: int) -> List[dict]:
+    system_prompt = (
+        "你是一位负责整合多篇文章分析的高级编辑。把给定的文章归纳为不超过指定数量的主题，"
+        "每篇文章只归入一个主题，并为每个主题选出代表性文章。"
+        "返回严格的JSON格式：{\"topics\": [{\"name\": \"主题名\", \"members\": [文章id], \"representatives\": [\"文章标题\"]}]}"
+    )
+    articles = [
+        {
+            "id": i,
+            "title": a.title,
+            "tags": list(a.tags[:3]),  # Only top 3 tags
+            "keywords": list(a.keywords[:5]),  # Only top 5 keywords
+        }
+        for i, a in enumerate(batch)
+    ]
+    return _messages(system_prompt, {"articles": articles, "num_topics": num_topics})
+
+
+def _merge_prompt(candidates: Sequence[Candidate], num_topics: int, hints: List[Tuple[str, float]]) -> List[dict]:
+    system_prompt = (
+        "你是一位负责整合多篇文章分析的高级编辑。下面是从不同文章批次中归纳出的候选主题（含文章数和代表性文章）。"
+        "把含义相同或相近的候选主题合并，得到不超过指定数量的主题并重新命名，每个候选主题只归入一个主题。"
+        "返回严格的JSON格式：{\"topics\": [{\"name\": \"主题名\", \"members\": [候选主题id], \"representatives\": [\"文章标题\"]}]}"
+    )
+    payload = {
+        "candidates": [c.to_payload(i) for i, c in enumerate(candidates)],
+        "num_topics": num_topics,
+        "draft_topics": hints,
+    }
+    return _messages(system_prompt, payload)
+
+
+def _parse_groups(raw: str, size: int) -> List[Tuple[str, List[int], List[str]]]:
+    """Parse `{"topics": [{name, members, representatives}]}`, keeping each member once."""
+    parsed = json.loads(raw)
+    seen = set()
+    groups = []
+    for t in parsed.get("topics", []):
+        if not isinstance(t, dict) or not t.get("name"):
+            continue
+        members = []
+        for m in t.get("members") or []:
+            if isinstance(m, int) and 0 <= m < size and m not in seen:
+                seen.add(m)
+                members.append(m)
+        reps = [r for r in t.get("representatives") or [] if isinstance(r, str)]
+        groups.append((str(t["name"]), members, reps))
+    return groups
+
+
+def _summarize_batch(batch: Sequence[ArticleRecord], offset: int, num_topics: int) -> List[Candidate]:
+    """Level 0: candidate topics for one batch of articles starting at `offset`."""
+    raw = call_llm_cached(_leaf_prompt(batch, num_topics), REDUCE_CACHE_DIR, temperature=0.5)
+    titles = {a.title for a in batch}
+    out = []
+    for name, members, reps in _parse_groups(raw, len(batch)):
+        if not members:
+            continue
+        member_titles = [batch[m].title for m in members]
+        reps = [r for r in reps if r in titles] or member_titles
+        out.append(Candidate(name, [offset + m for m in members], reps[:MAX_REPRESENTATIVES]))
+    if not out:
+        raise ValueError("no topics with members")
+    return out
+
+
+def _merge_candidates(
+    candidates: Sequence[Candidate], num_topics: int, hints: List[Tuple[str, float]]
+) -> List[Candidate]:
+    """Level >= 1: merge candidate topics by id, pooling their members locally."""
+    raw = call_llm_cached(_merge_prompt(candidates, num_topics, hints), REDUCE_CACHE_DIR, temperature=0.5)
+    out = []
+    for name, members, reps in _parse_groups(raw, len(candidates)):
+        if not members:
+            continue
+        pool = [r for m in members for r in candidates[m].representatives]
+        reps = [r for r in reps if r in pool] or pool
+        pooled = [i for m in members for i in candidates[m].members]
+        out.append(Candidate(name, pooled, list(dict.fromkeys(reps))[:MAX_REPRESENTATIVES]))
+    if not out:
+        raise ValueError("no merged topics with members")
+    return out
+
+
+def _coalesce(candidates: Sequence[Candidate]) -> List[Candidate]:
+    """Pool candidates with the same name, in first-seen order."""
+    by_name: Dict[str, Candidate] = {}
+    for c in candidates:
+        kept = by_name.get(c.name)
+        if kept is None:
+            by_name[c.name] = Candidate(c.name, list(c.members), list(c.representatives))
+        else:
+            kept.members.extend(c.members)
+            reps = dict.fromkeys(kept.representatives + c.representatives)
+            kept.representatives = list(reps)[:MAX_REPRESENTATIVES]
+    return list(by_name.values())
+
+
+def _run_level(
+    jobs: List[Callable[[], List[Candidate]]], fallbacks: List[List[Candidate]]
+) -> Tuple[List[List[Candidate]], int]:
+    """Run one tree level concurrently; a failed job falls back to its input.
+
+    Returns (results, number of failed jobs).
+    """
+    results: List[List[Candidate]] = [[] for _ in jobs]
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=TOPIC_WORKERS) as ex:
+        futures = {ex.submit(job): i for i, job in enumerate(jobs)}
+        for fut in concurrent.futures.as_completed(futures):
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:  # noqa: BLE001 - degrade this node, keep the tree
+                logger.warning(f"Topic naming call failed, keeping local candidates: {e}")
+                results[i] = fallbacks[i]
+                failed += 1
+    return results, failed
+
+
+def _local_candidates(batch: Sequence[ArticleRecord], offset: int) -> List[Candidate]:
+    """Fallback for a failed leaf: one candidate per first tag."""
+    by_tag: Dict[str, List[int]] = {}
+    for i, a in enumerate(batch):
+        by_tag.setdefault(a.tags[0] if a.tags else "其他", []).append(i)
+    return [
+        Candidate(tag, [offset + i for i in idx], [batch[i].title for i in idx[:MAX_REPRESENTATIVES]])
+        for tag, idx in by_tag.items()
+    ]
+
+
+def _leaf(batch: Sequence[ArticleRecord], offset: int, num_topics: int) -> Tuple[List[Candidate], bool]:
+    """Candidates of one leaf batch, and whether they are the local fallback."""
+    try:
+        return _summarize_batch(batch, offset, num_topics), False
+    except Exception as e:  # noqa: BLE001 - degrade this leaf, keep the tree
+        logger.warning(f"Topic naming call failed, keeping local candidates: {e}")
+        return _local_candidates(batch, offset), True
+
+
+class TopicTree:
+    """Streaming form of the tree reduce.
+
+    Articles are added in order and every full leaf batch is submitted right
+    away, with at most 2 x TOPIC_WORKERS leaves in flight, so only the open
+    batch and the pending leaves hold records. The first batch waits for the
+    next article: a corpus that fits one batch is named in one final call.
+
+    The worker pool starts with the first leaf and stops in `finish`; a
+    caller that gives up before that must call `close` (or use `with`).
+    """
+
+    def __init__(self) -> None:
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._leaves: List[concurrent.futures.Future] = []
+        self._batch: List[ArticleRecord] = []
+        self._held: Optional[List[ArticleRecord]] = None
+        self.count = 0
+
+    def __enter__(self) -> "TopicTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker pool, dropping leaves that have not started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _submit(self, batch: List[ArticleRecord], offset: int, num_topics: int) -> None:
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=TOPIC_WORKERS)
+        pending = [f for f in self._leaves if not f.done()]
+        if len(pending) >= 2 * TOPIC_WORKERS:
+            concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        self._leaves.append(self._pool.submit(_leaf, batch, offset, num_topics))
+
+    def add(self, a: ArticleRecord) -> None:
+        if self._held is not None:
+            self._submit(self._held, 0, NUM_TOPICS + 2)
+            self._held = None
+        self._batch.append(a)
+        self.count += 1
+        if len(self._batch) == TOPIC_BATCH_SIZE:
+            offset = self.count - TOPIC_BATCH_SIZE
+            if offset == 0:
+                self._held = self._batch
+            else:
+                self._submit(self._batch, offset, NUM_TOPICS + 2)
+            self._batch = []
+
+    def finish(self, draft_topics: List[Tuple[str, float]]) -> Tuple[List[TopicItem], List[int]]:
+        """Merge the leaves and name NUM_TOPICS topics.
+
+        Returns (topics, topic index per added article, -1 when unassigned).
+        Raises when the final naming call fails: unmerged local candidates
+        are no topics, so the caller falls back to `draft_topics`.
+        """
+        try:
+            if self._held is not None:
+                self._submit(self._held, 0, NUM_TOPICS)
+            elif self._batch:
+                offset = self.count - len(self._batch)
+                self._submit(self._batch, offset, NUM_TOPICS if offset == 0 else NUM_TOPICS + 2)
+            self._held, self._batch = None, []
+            results = [f.result() for f in self._leaves]
+        finally:
+            self.close()
+        if not results:
+            return [], []
+        level = [cands for cands, _ in results]
+        final_failed = len(results) == 1 and results[0][1]
+        leaves = len(level)
+        depth = 1
+        while len(level) > 1:
+            groups = _chunks(level, TOPIC_MERGE_FANIN)
+            final = len(groups) == 1
+            target = NUM_TOPICS if final else NUM_TOPICS + 2
+            # Same-named candidates (e.g. from leaf fallbacks) enter a merge once
+            flat_groups = [_coalesce([c for part in g for c in part]) for g in groups]
+            level, failed = _run_level(
+                [lambda g=g: _merge_candidates(g, target, draft_topics if final else []) for g in flat_groups],
+                flat_groups,
+            )
+            final_failed = final and failed > 0
+            depth += 1
+        if final_failed:
+            raise ValueError("final topic naming call failed")
+
+        topics = sorted(level[0], key=lambda c: -len(c.members))[:NUM_TOPICS]
+        total = float(self.count)
+        assignment = [-1] * self.count
+        for t, c in enumerate(topics):
+            for i in c.members:
+                assignment[i] = t
+        logger.info(f"Named {len(topics)} topics over {self.count} articles ({leaves} batches, {depth} levels)")
+        items = [
+            TopicItem(name=c.name, ratio=round(len(c.members) / total, 3), representatives=c.representatives)
+            for c in topics
+        ]
+        return items, assignment
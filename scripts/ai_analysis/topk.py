@@ -0,0 +1,40 @@
+"""Bounded counters for the streaming reduce.
+
+`TopCounter` is a Counter that never holds more than 2 x capacity keys. When
+it overflows it keeps the `capacity` largest counts and drops the rest. Heavy
+hitters survive with exact or slightly low counts; keys rarer than the
+pruning point may be lost. Counts from one `update` are applied before
+pruning. Below capacity it is an exact Counter, so small corpora give the
+same numbers as before.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Hashable
+
+
+class TopCounter(Counter):
+    """Counter with at most 2 x `capacity` keys, pruned to the top `capacity`."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.pruned = 0
+        super().__init__()
+
+    def update(self, iterable=None, /, **kwds) -> None:
+        super().update(iterable, **kwds)
+        if len(self) > 2 * self.capacity:
+            self._prune()
+
+    def add(self, key: Hashable, n: int = 1) -> None:
+        self[key] += n
+        if len(self) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        keep = self.most_common(self.capacity)
+        self.clear()
+        for key, count in keep:
+            self[key] = count
+        self.pruned += 1
@@ -3,10 +3,9 @@
 Includes:
 - Frontmatter parsing
 - MD5 hashing
-- IO-safe JSON read/write
+- IO-safe JSON read/write (atomic writes)
 - Jieba-based top words
 - Sentence stats helpers
-- Co-occurrence network construction
 - Simple retry decorator
 """
 
@@ -14,7 +13,9 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
 import re
+import threading
 import time
 from functools import wraps
 from pathlib import Path
@@ -55,9 +56,19 @@ def safe_load_json(path: Path):
         return None
 
 
-def safe_write_json(path: Path, data) -> None:
+def safe_write_json(path: Path, data, compact: bool = False) -> None:
+    """Write JSON atomically (temp file + rename) so readers never see a torn file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if compact:
+            text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        else:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
 
 
 def sentence_lengths(text: str) -> List[int]:
@@ -81,18 +92,6 @@ def sentence_length_buckets(lengths: List[int]) -> Dict[str, int]:
     return buckets
 
 
-def build_cooccurrence(concepts: List[str], window: int = 50) -> List[Tuple[str, str, int]]:
-    # Simple fully-connected cooccurrence weighted by shared rank
-    # Assumes `concepts` already top-ranked; use index distance as proxy weight
-    edges: Dict[Tuple[str, str], int] = {}
-    for i, a in enumerate(concepts):
-        for j in range(i + 1, min(len(concepts), i + window)):
-            b = concepts[j]
-            key = (a, b) if a < b else (b, a)
-            edges[key] = edges.get(key, 0) + (window - (j - i))
-    return [(a, b, w) for (a, b), w in edges.items()]
-
-
 def retry_request(max_retries: int = 3, backoff_base: float = 0.8):
     import logging
     
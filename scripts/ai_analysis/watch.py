@@ -0,0 +1,133 @@
+"""Watch mode: continuous incremental analysis while writing.
+
+File change events under CONTENT_BLOG_DIR are debounced per article:
+- after `debounce_s` of quiet, `on_local(path)` runs (cheap local metrics);
+- after `settle_s` of quiet, `on_settled(path)` runs (LLM analysis + reduce).
+
+Events come from `watchdog` when it is installed; otherwise the tree is
+polled by mtime, which only stats files and never re-hashes them.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_S = 1.0
+
+
+class _QueueHandler(FileSystemEventHandler):
+    def __init__(self, events: "queue.Queue[Path]") -> None:
+        self.events = events
+
+    def on_any_event(self, event) -> None:  # noqa: D401 - watchdog hook
+        if event.is_directory:
+            return
+        for attr in ("src_path", "dest_path"):
+            p = getattr(event, attr, None)
+            if p and str(p).endswith(".md"):
+                self.events.put(Path(p).resolve())
+
+
+class _Poller:
+    """mtime-based fallback event source."""
+
+    def __init__(self, root: Path, events: "queue.Queue[Path]") -> None:
+        self.root = root
+        self.events = events
+        self.mtimes = self._scan()
+        self.last_poll = time.monotonic()
+
+    def _scan(self) -> Dict[Path, float]:
+        out: Dict[Path, float] = {}
+        for p in self.root.glob("**/*.md"):
+            try:
+                out[p.resolve()] = p.stat().st_mtime
+            except OSError:
+                continue
+        return out
+
+    def poll(self) -> None:
+        if time.monotonic() - self.last_poll < POLL_INTERVAL_S:
+            return
+        self.last_poll = time.monotonic()
+        current = self._scan()
+        for p, m in current.items():
+            if self.mtimes.get(p) != m:
+                self.events.put(p)
+        for p in self.mtimes.keys() - current.keys():
+            self.events.put(p)
+        self.mtimes = current
+
+
+def watch(
+    root: Path,
+    on_local: Callable[[Path], None],
+    on_settled: Callable[[Path], None],
+    debounce_s: float,
+    settle_s: float,
+    stop_after_s: Optional[float] = None,
+) -> None:
+    """Block and dispatch debounced per-article callbacks until interrupted."""
+    events: "queue.Queue[Path]" = queue.Queue()
+    observer = None
+    poller = None
+    if Observer is not None:
+        observer = Observer()
+        observer.schedule(_QueueHandler(events), str(root), recursive=True)
+        observer.start()
+        logger.info(f"Watching {root} (watchdog)")
+    else:
+        poller = _Poller(root, events)
+        logger.info(f"Watching {root} (polling every {POLL_INTERVAL_S:.0f}s; install watchdog for events)")
+
+    last_event: Dict[Path, float] = {}
+    local_pending: Dict[Path, float] = {}
+    started = time.monotonic()
+    try:
+        while stop_after_s is None or time.monotonic() - started < stop_after_s:
+            if poller is not None:
+                poller.poll()
+            try:
+                p = events.get(timeout=0.1)
+                now = time.monotonic()
+                last_event[p] = now
+                local_pending[p] = now
+                continue  # drain bursts before dispatching
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for p, t in list(local_pending.items()):
+                if now - t >= debounce_s:
+                    del local_pending[p]
+                    _safe_call(on_local, p)
+            for p, t in list(last_event.items()):
+                if now - t >= settle_s:
+                    del last_event[p]
+                    _safe_call(on_settled, p)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+
+def _safe_call(fn: Callable[[Path], None], p: Path) -> None:
+    try:
+        fn(p)
+    except Exception as e:  # noqa: BLE001 - keep the watcher alive
+        logger.error(f"Watch handler failed for {p.name}: {e}")
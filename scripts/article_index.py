@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+博客文章索引
+
+功能：
+- 把文章的 slug、日期、标题、规范化文本（以及可选的拼音/拼音首字母）映射到文件路径
+- 索引持久化到 article_index.json，按文件 mtime 增量失效：只重新解析新增或修改过的文章
+- 精确查询走哈希表 O(1)；模糊查询走字符二元组（bigram）倒排索引，只对候选文章打分
+- lookup() 只做 slug 精确/子串匹配（用于会写文件的场景），模糊结果只作为 search() 的候选建议
+- 供 generate_cover_image.py / generate_new_post.py 等内容脚本共用
+
+可选依赖：
+  pip install pypinyin   （支持用拼音或拼音首字母查找中文标题）
+
+使用示例：
+  python article_index.py 考研
+  python article_index.py kaoyan --limit 3
+"""
+
+import argparse
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 可选依赖
+    lazy_pinyin = None
+    Style = None
+
+
+# 路径（不依赖当前工作目录）
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+BLOG_DIR = PROJECT_ROOT / "src" / "content" / "blog"
+INDEX_PATH = SCRIPTS_DIR / "article_index.json"
+
+INDEX_VERSION = 1
+MIN_FUZZY_SCORE = 0.4
+
+_DATE_PREFIX_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})-?")
+_FRONTMATTER_RE = re.compile(r"^---\n(.*?)\n---", re.DOTALL)
+
+
+def normalize(text: str) -> str:
+    """
+    规范化用于匹配的文本：全角转半角、转小写、去掉空白和标点（保留中英文与数字）
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        规范化后的文本
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"[\W_]+", "", text)
+
+
+def _ngrams(text: str) -> Set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _pinyin_keys(title: str) -> List[str]:
+    if lazy_pinyin is None:
+        return []
+    full = lazy_pinyin(title)
+    initials = lazy_pinyin(title, style=Style.FIRST_LETTER)
+    return [normalize("".join(full)), normalize("".join(initials))]
+
+
+def _read_meta(path: Path) -> Dict[str, str]:
+    """只解析需要的 frontmatter 字段（title / publishDate），不依赖 PyYAML"""
+    meta: Dict[str, str] = {}
+    try:
+        head = path.read_text(encoding="utf-8")[:4096]
+    except OSError:
+        return meta
+    match = _FRONTMATTER_RE.match(head)
+    if not match:
+        return meta
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip() in ("title", "publishDate"):
+            meta[key.strip()] = value.strip().strip("'\"")
+    return meta
+
+
+def slug_of(path: Path) -> str:
+    """文章 slug：目录型文章取目录名，单文件文章取文件名"""
+    return path.parent.name if path.name.lower() == "index.md" else path.stem
+
+
+class ArticleIndex:
+    """文章索引：精确键哈希表 + bigram 倒排索引"""
+
+    def __init__(self, blog_dir: Path = BLOG_DIR, index_path: Path = INDEX_PATH):
+        self.blog_dir = blog_dir
+        self.index_path = index_path
+        self.entries: Dict[str, Dict] = {}  # 相对路径 -> {slug, date, title, mtime}
+        self._exact: Dict[str, Set[str]] = defaultdict(set)
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._keys: Dict[str, List[str]] = {}
+
+    # ---------- 构建与持久化 ----------
+
+    @classmethod
+    def load(cls, blog_dir: Path = BLOG_DIR, index_path: Path = INDEX_PATH) -> "ArticleIndex":
+        """
+        加载持久化索引，并按 mtime 增量刷新
+
+        Returns:
+            可查询的索引
+        """
+        index = cls(blog_dir, index_path)
+        try:
+            data = json.loads(index_path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                index.entries = data.get("entries", {})
+        except (OSError, json.JSONDecodeError):
+            pass
+        if index.refresh():
+            index.save()
+        index._build_lookup()
+        return index
+
+    def _scan(self) -> Iterable[Path]:
+        for path in self.blog_dir.glob("**/*.md"):
+            if path.parent == self.blog_dir or path.name.lower() == "index.md":
+                yield path
+
+    def refresh(self) -> bool:
+        """
+        只对新增/修改过的文章重新解析 frontmatter，删除已不存在的文章
+
+        Returns:
+            索引是否有变化
+        """
+        seen = set()
+        changed = False
+        for path in self._scan():
+            rel = path.resolve().relative_to(PROJECT_ROOT).as_posix()
+            seen.add(rel)
+            mtime = path.stat().st_mtime
+            if self.entries.get(rel, {}).get("mtime") == mtime:
+                continue
+            self.entries[rel] = self._entry(path, mtime)
+            changed = True
+        for rel in set(self.entries) - seen:
+            del self.entries[rel]
+            changed = True
+        return changed
+
+    def _entry(self, path: Path, mtime: float) -> Dict:
+        meta = _read_meta(path)
+        slug = slug_of(path)
+        date_match = _DATE_PREFIX_RE.match(slug)
+        return {
+            "slug": slug,
+            "date": meta.get("publishDate") or (date_match.group(1) if date_match else ""),
+            "title": meta.get("title", ""),
+            "mtime": mtime,
+        }
+
+    def save(self) -> None:
+        """原子写入索引文件"""
+        tmp = self.index_path.with_name(f".{self.index_path.name}.tmp")
+        tmp.write_text(
+            json.dumps({"version": INDEX_VERSION, "entries": self.entries}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.index_path)
+
+    def _build_lookup(self) -> None:
+        self._exact.clear()
+        self._grams.clear()
+        self._keys.clear()
+        for rel, entry in self.entries.items():
+            slug = entry["slug"]
+            keys = {
+                normalize(slug),
+                normalize(_DATE_PREFIX_RE.sub("", slug)),
+                normalize(entry.get("title", "")),
+                *_pinyin_keys(entry.get("title", "")),
+            }
+            keys.discard("")
+            self._keys[rel] = sorted(keys)
+            for key in keys:
+                self._exact[key].add(rel)
+                for gram in _ngrams(key):
+                    self._grams[gram].add(rel)
+            if entry.get("date"):
+                self._exact[entry["date"]].add(rel)
+
+    def add(self, path: Path) -> None:
+        """新建文章后立即加入索引（无需重新扫描）"""
+        rel = path.resolve().relative_to(PROJECT_ROOT).as_posix()
+        self.entries[rel] = self._entry(path, path.stat().st_mtime)
+        self.save()
+        self._build_lookup()
+
+    # ---------- 查询 ----------
+
+    def has_slug(self, slug: str) -> bool:
+        """是否已存在同 slug 的文章（单文件与目录模式会生成相同的路由，视为冲突）"""
+        return any(entry["slug"] == slug for entry in self.entries.values())
+
+    def search(self, query: str, limit: int = 5, dirs_only: bool = False) -> List[Tuple[Path, float]]:
+        """
+        模糊查找文章
+
+        打分：键完全相等 1.0；查询是键的子串 0.9~0.99；否则按 bigram Dice 系数打分
+
+        Args:
+            query: 标题、slug、日期、拼音或其片段
+            limit: 最多返回条数
+            dirs_only: 只返回目录型文章（index.md）
+
+        Returns:
+            [(文章路径, 分数)]，按分数从高到低
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        scores: Dict[str, float] = {}
+        for rel in self._exact.get(q, set()) | self._exact.get(query.strip(), set()):
+            scores[rel] = 1.0
+
+        # 只有与查询共享至少一个 bigram 的文章才需要打分
+        q_grams = _ngrams(q)
+        candidates: Set[str] = set()
+        for gram in q_grams:
+            candidates |= self._grams.get(gram, set())
+        for rel in candidates:
+            if rel in scores:
+                continue
+            best = 0.0
+            for key in self._keys[rel]:
+                if q in key:
+                    best = max(best, 0.9 + 0.09 * len(q) / len(key))
+                else:
+                    key_grams = _ngrams(key)
+                    dice = 2 * len(q_grams & key_grams) / (len(q_grams) + len(key_grams))
+                    best = max(best, dice * 0.85)
+            if best >= MIN_FUZZY_SCORE:
+                scores[rel] = best
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = []
+        for rel, score in ranked:
+            path = PROJECT_ROOT / rel
+            if dirs_only and path.name.lower() != "index.md":
+                continue
+            results.append((path, round(score, 3)))
+            if len(results) >= limit:
+                break
+        return results
+
+    def lookup(self, query: str, dirs_only: bool = False) -> Optional[Path]:
+        """
+        按 slug（目录名或文件名）精确或子串匹配文章，找不到时返回None
+
+        不使用模糊打分：调用方会据此写入文件（如覆盖封面），宁可找不到也不能找错。
+        模糊候选请用 search()。
+
+        Args:
+            query: slug 或其片段
+            dirs_only: 只匹配目录型文章（index.md）
+
+        Returns:
+            文章路径
+        """
+        query = query.strip()
+        if not query:
+            return None
+        slugs = sorted(
+            (entry["slug"], rel) for rel, entry in self.entries.items()
+            if not dirs_only or rel.endswith("/index.md")
+        )
+        for matches in (
+            lambda slug: slug == query,
+            lambda slug: query in slug,
+            lambda slug: query.lower() in slug.lower(),
+        ):
+            for slug, rel in slugs:
+                if matches(slug):
+                    return PROJECT_ROOT / rel
+        return None
+
+
+_DEFAULT_INDEX: Optional[ArticleIndex] = None
+
+
+def get_index() -> ArticleIndex:
+    """进程内共享的默认索引（首次调用时加载）"""
+    global _DEFAULT_INDEX
+    if _DEFAULT_INDEX is None:
+        _DEFAULT_INDEX = ArticleIndex.load()
+    return _DEFAULT_INDEX
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="博客文章索引查询工具")
+    parser.add_argument("query", help="标题、slug、日期、拼音或其片段")
+    parser.add_argument("--limit", type=int, default=5, help="最多返回条数")
+    args = parser.parse_args()
+
+    index = get_index()
+    results = index.search(args.query, limit=args.limit)
+    if not results:
+        print(f"未找到匹配的文章: {args.query}")
+        return
+    for path, score in results:
+        print(f"{score:.2f}  {path.relative_to(PROJECT_ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+离线全文搜索索引生成器
+
+功能：
+- 对 src/content/blog 下的文章分词：中文按字符二元组（bigram），英文/数字按单词
+- 生成压缩倒排索引：文档号差分（delta）+ varint 编码的倒排表
+- 按词项前缀分片，浏览器只需加载查询词所在的分片
+- 增量构建：按正文 MD5 只重新分词新增或修改过的文章，内容未变的分片不重写
+- 文档号按 slug 持久化在 search_index_state.json 中，新增（包括补发的旧日期）文章只分配新号，
+  不会挪动其他文章的文档号；删除的文章留空位，文档号不复用
+- 报告索引总大小，以及每个查询实际需要下载的数据量
+
+输出（public/search/）：
+  manifest.json   文档表（下标即文档号）[slug, 标题, 日期, 词数]，空位为 null；分片表、平均文档长度
+  <分片>.bin      分片二进制格式：
+                  b"BSI1" + varint(词项数)
+                  每个词项（按 UTF-8 字节序）：varint(字节长) + UTF-8 + varint(df)
+                                              + df × (varint(文档号差值), varint(tf))
+
+分片键：ASCII 词项取首字符（数字统一为 "0"），其余取 "u" + 首字符码位右移 8 位的十六进制，
+浏览器端用同样的规则计算。
+
+目前站点搜索页使用 Pagefind，src/ 中还没有读取 public/search/ 的前端；
+本脚本只负责生成索引，--query 用 SearchClient 模拟浏览器端的加载与打分。
+
+使用示例：
+  python build_search_index.py
+  python build_search_index.py --query "考研 复习"
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from article_index import PROJECT_ROOT, SCRIPTS_DIR, get_index
+
+OUTPUT_DIR = PROJECT_ROOT / "public" / "search"
+STATE_PATH = SCRIPTS_DIR / "search_index_state.json"
+
+INDEX_VERSION = 1
+MAGIC = b"BSI1"
+SHARD_SHIFT = 8
+TITLE_BOOST = 3  # 标题中的词项按 tf × 3 计入
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_FRONTMATTER_RE = re.compile(r"^---\n.*?\n---\n?", re.DOTALL)
+_CODE_FENCE_RE = re.compile(r"```.*?```", re.DOTALL)
+_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_URL_RE = re.compile(r"https?://\S+")
+_LATIN_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+
+
+# ---------- 分词 ----------
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文/数字按单词（至少 2 个字符，纯数字除外），中文连续片段按重叠二元组
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        词项列表（含重复）
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = [w for w in _LATIN_RE.findall(text) if len(w) > 1 or w.isdigit()]
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _plain_body(raw: str) -> str:
+    """去掉 frontmatter、代码块、链接地址，保留可读正文"""
+    body = _FRONTMATTER_RE.sub("", raw, count=1)
+    body = _CODE_FENCE_RE.sub(" ", body)
+    body = _LINK_RE.sub(r"\1", body)
+    return _URL_RE.sub(" ", body)
+
+
+def shard_key(term: str) -> str:
+    """词项所属分片"""
+    c = term[0]
+    if c.isascii():
+        return "0" if c.isdigit() else c
+    return f"u{ord(c) >> SHARD_SHIFT:x}"
+
+
+# ---------- varint 编解码 ----------
+
+def _varint(n: int, out: bytearray) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def encode_shard(postings: Dict[str, List[Tuple[int, int]]]) -> bytes:
+    """
+    把一个分片的倒排表编码为二进制
+
+    Args:
+        postings: 词项 -> [(文档号, tf)]，文档号升序
+
+    Returns:
+        分片字节串
+    """
+    out = bytearray(MAGIC)
+    _varint(len(postings), out)
+    for term in sorted(postings, key=lambda t: t.encode("utf-8")):
+        raw = term.encode("utf-8")
+        _varint(len(raw), out)
+        out += raw
+        plist = postings[term]
+        _varint(len(plist), out)
+        prev = 0
+        for doc, tf in plist:
+            _varint(doc - prev, out)
+            _varint(tf, out)
+            prev = doc
+    return bytes(out)
+
+
+def decode_shard(data: bytes) -> Dict[str, List[Tuple[int, int]]]:
+    """encode_shard 的逆操作（浏览器端解码逻辑的参考实现）"""
+    if data[:4] != MAGIC:
+        raise ValueError("不是有效的搜索索引分片")
+    count, pos = _read_varint(data, 4)
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for _ in range(count):
+        size, pos = _read_varint(data, pos)
+        term = data[pos:pos + size].decode("utf-8")
+        pos += size
+        df, pos = _read_varint(data, pos)
+        plist = []
+        doc = 0
+        for _ in range(df):
+            delta, pos = _read_varint(data, pos)
+            tf, pos = _read_varint(data, pos)
+            doc += delta
+            plist.append((doc, tf))
+        postings[term] = plist
+    return postings
+
+
+# ---------- 构建 ----------
+
+def _load_state() -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """读取上次的分词结果（按路径）和文档号表（按 slug）"""
+    try:
+        data = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}, {}
+    if data.get("version") != INDEX_VERSION:
+        return {}, {}
+    return data.get("docs", {}), data.get("ids", {})
+
+
+def assign_doc_ids(slugs: Iterable[str], ids: Dict[str, int]) -> Dict[str, int]:
+    """
+    为文章分配稳定的文档号：已有 slug 沿用旧号，新 slug 依次取下一个未用过的号
+
+    Args:
+        slugs: 当前文章的 slug，按首次建索引时的顺序（日期、路径）
+        ids: 上次持久化的 slug -> 文档号（包含已删除文章，保证号码不被复用）
+
+    Returns:
+        新的 slug -> 文档号表
+    """
+    ids = dict(ids)
+    next_id = max(ids.values(), default=-1) + 1
+    for slug in slugs:
+        if slug not in ids:
+            ids[slug] = next_id
+            next_id += 1
+    return ids
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _doc_terms(body: str, title: str) -> Dict[str, int]:
+    terms = Counter(tokenize(body))
+    for term in tokenize(title):
+        terms[term] += TITLE_BOOST
+    return dict(terms)
+
+
+def build(output_dir: Path = OUTPUT_DIR) -> Dict:
+    """
+    增量构建搜索索引
+
+    Args:
+        output_dir: 输出目录
+
+    Returns:
+        构建统计（文档数、重新分词数、分片数、重写分片数、字节数）
+    """
+    index = get_index()
+    previous, previous_ids = _load_state()
+    # 首次建索引时文档号按日期、路径分配；之后每篇文章的号固定，新文章只追加新号
+    docs = sorted(index.entries.items(), key=lambda item: (item[1].get("date", ""), item[0]))
+    ids = assign_doc_ids((entry["slug"] for _, entry in docs), previous_ids)
+    docs.sort(key=lambda item: ids[item[1]["slug"]])
+
+    state: Dict[str, Dict] = {}
+    retokenized = 0
+    for rel, entry in docs:
+        body = _plain_body((PROJECT_ROOT / rel).read_text(encoding="utf-8"))
+        body_md5 = hashlib.md5(body.encode("utf-8")).hexdigest()
+        title = entry.get("title", "")
+        cached = previous.get(rel)
+        if cached and cached.get("md5") == body_md5 and cached.get("title") == title:
+            state[rel] = cached
+            continue
+        state[rel] = {"md5": body_md5, "title": title, "terms": _doc_terms(body, title)}
+        retokenized += 1
+
+    shards: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+    doc_table: List[Optional[list]] = [None] * (max(ids.values(), default=-1) + 1)
+    for rel, entry in docs:
+        doc_id = ids[entry["slug"]]
+        terms = state[rel]["terms"]
+        doc_table[doc_id] = [entry["slug"], entry.get("title", ""), entry.get("date", ""), sum(terms.values())]
+        for term, tf in terms.items():
+            shards.setdefault(shard_key(term), {}).setdefault(term, []).append((doc_id, tf))
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    shard_table = {}
+    rewritten = 0
+    for key, postings in sorted(shards.items()):
+        data = encode_shard(postings)
+        target = output_dir / f"{key}.bin"
+        if not target.exists() or target.read_bytes() != data:
+            _write_atomic(target, data)
+            rewritten += 1
+        shard_table[key] = {"bytes": len(data), "terms": len(postings)}
+    for stale in output_dir.glob("*.bin"):
+        if stale.stem not in shards:
+            stale.unlink()
+
+    lengths = [d[3] for d in doc_table if d is not None]
+    manifest = {
+        "version": INDEX_VERSION,
+        "shardShift": SHARD_SHIFT,
+        "docCount": len(lengths),
+        "avgLength": round(sum(lengths) / len(lengths), 2) if lengths else 0,
+        "docs": doc_table,
+        "shards": shard_table,
+    }
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _write_atomic(output_dir / "manifest.json", manifest_bytes)
+    _write_atomic(
+        STATE_PATH,
+        json.dumps(
+            {"version": INDEX_VERSION, "docs": state, "ids": ids}, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8"),
+    )
+
+    shard_bytes = sum(s["bytes"] for s in shard_table.values())
+    gzip_bytes = sum(len(gzip.compress((output_dir / f"{k}.bin").read_bytes())) for k in shard_table)
+    return {
+        "docs": len(docs),
+        "retokenized": retokenized,
+        "shards": len(shard_table),
+        "rewritten": rewritten,
+        "manifest_bytes": len(manifest_bytes),
+        "shard_bytes": shard_bytes,
+        "shard_gzip_bytes": gzip_bytes,
+        "content_bytes": sum((PROJECT_ROOT / rel).stat().st_size for rel, _ in docs),
+    }
+
+
+# ---------- 查询（模拟浏览器端：只加载需要的分片） ----------
+
+class SearchClient:
+    """按需加载分片的查询客户端，统计实际下载的数据量"""
+
+    def __init__(self, output_dir: Path = OUTPUT_DIR):
+        self.output_dir = output_dir
+        raw = (output_dir / "manifest.json").read_bytes()
+        self.manifest = json.loads(raw)
+        self.payload = len(raw)
+        self._shards: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+
+    def _postings(self, term: str) -> List[Tuple[int, int]]:
+        key = shard_key(term)
+        if key not in self.manifest["shards"]:
+            return []
+        if key not in self._shards:
+            data = (self.output_dir / f"{key}.bin").read_bytes()
+            self.payload += len(data)
+            self._shards[key] = decode_shard(data)
+        return self._shards[key].get(term, [])
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, float]]:
+        """
+        BM25 排序查询
+
+        Args:
+            query: 查询文本，分词规则与索引一致
+            limit: 最多返回条数
+
+        Returns:
+            [(slug, 标题, 分数)]，按分数从高到低
+        """
+        docs = self.manifest["docs"]
+        n = self.manifest["docCount"]
+        avg = self.manifest["avgLength"] or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self._postings(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc, tf in plist:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * docs[doc][3] / avg)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [(docs[d][0], docs[d][1], round(s, 3)) for d, s in ranked]
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:.1f} KB"
+
+
+def _print_report(stats: Dict) -> None:
+    total = stats["manifest_bytes"] + stats["shard_bytes"]
+    print(f"文档: {stats['docs']} 篇（重新分词 {stats['retokenized']} 篇）")
+    print(f"分片: {stats['shards']} 个（重写 {stats['rewritten']} 个）")
+    print(f"索引大小: {_kb(total)}（manifest {_kb(stats['manifest_bytes'])}，分片 {_kb(stats['shard_bytes'])}，"
+          f"分片 gzip 后 {_kb(stats['shard_gzip_bytes'])}）")
+    if stats["content_bytes"]:
+        print(f"原文大小: {_kb(stats['content_bytes'])}，索引/原文 = {total / stats['content_bytes']:.2f}")
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="离线全文搜索索引生成器")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR, help="索引输出目录")
+    parser.add_argument("--query", action="append", default=[], help="构建后执行查询并报告下载量，可重复")
+    parser.add_argument("--limit", type=int, default=5, help="每个查询最多返回条数")
+    args = parser.parse_args(argv)
+
+    _print_report(build(args.output))
+    for query in args.query:
+        client = SearchClient(args.output)
+        results = client.search(query, limit=args.limit)
+        print(f"\n查询「{query}」：下载 {_kb(client.payload)}（{len(client._shards)} 个分片 + manifest）")
+        if not results:
+            print("  无结果")
+        for slug, title, score in results:
+            print(f"  {score:6.2f}  {title or slug}")
+
+
+if __name__ == "__main__":
+    main()
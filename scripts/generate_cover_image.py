@@ -4,18 +4,23 @@
 
 功能：
 - 根据文章标题读取博客内容（目录结构：/content/blog/TITLE/index.md）
-- 调用火山引擎豆包API提炼适合AI绘图的描述
+- 优先复用 ai_analysis 已缓存的文章分析（按正文MD5匹配）在本地构建绘图描述，
+  缓存未命中时才调用火山引擎豆包API提炼适合AI绘图的描述；描述本身也按正文MD5缓存
 - 调用文生图API生成封面图片
 - 将图片保存到博客文章目录下
+- 批量模式：扫描所有缺少 cover.* 的文章目录，描述/生图/下载三个阶段流水线并发执行，
+  任务状态写入 cover_jobs.json，中断后重新运行即可续跑
 
 依赖安装：
   pip install requests
 
 环境变量设置：
   export DOUBAO_API_KEY=your_api_key
+  可选：AI_RATE_LIMITS="模型=RPM/TPM;..." 设置共享限流（见 ai_analysis/README.md）
 
 使用示例：
   python generate_cover_image.py "astro博客迁移"
+  python generate_cover_image.py --all
 """
 
 import argparse
@@ -23,12 +28,22 @@ import json
 import os
 import re
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
 
+# 与 ai_analysis 共享的跨进程限流器（同一模型配额下两个脚本同时运行时不会互相挤爆）
+from ai_analysis.config import COVER_CACHE_DIR
+from ai_analysis.ratelimit import estimate_tokens, limiter_for, retry_after_seconds
+from ai_analysis.store import load_cached_analysis
+from ai_analysis.utils import md5_hash_text, parse_frontmatter_and_body, safe_load_json, safe_write_json
+from article_index import get_index
+from process_covers import pillow_available, process_cover
+
 
 # API配置常量
 ARK_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
@@ -36,6 +51,19 @@ TEXT_MODEL = "doubao-seed-1-6-251015"
 IMAGE_MODEL = "doubao-seedream-3-0-t2i-250415"
 IMAGE_SIZE = "1024x1024"
 
+# 路径（不依赖当前工作目录）
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BLOG_DIR = SCRIPTS_DIR.parent / "src" / "content" / "blog"
+JOB_STATE_PATH = SCRIPTS_DIR / "cover_jobs.json"
+
+# 由文章分析的主导语气选择画风（与描述提示词中的候选风格一致）
+TONE_STYLES = {
+    "reflective": "莫奈风",
+    "critical": "伦勃朗",
+    "humor": "像素风",
+    "teaching": "巴洛克风格",
+}
+
 # 获取API密钥
 DOUBAO_API_KEY = os.getenv("DOUBAO_API_KEY")
 if not DOUBAO_API_KEY:
@@ -46,7 +74,9 @@ if not DOUBAO_API_KEY:
 
 def find_article_path(article_title: str) -> Optional[Path]:
     """
-    根据文章标题查找对应的文章路径
+    根据文章标题查找对应的文章路径（目录型文章，封面需要保存在文章目录下）
+    
+    只接受目录名精确或子串匹配（找错文章会覆盖别人的封面）；未找到时打印模糊候选供参考
     
     Args:
         article_title: 文章标题
@@ -54,48 +84,28 @@ def find_article_path(article_title: str) -> Optional[Path]:
     Returns:
         文章路径，如果未找到返回None
     """
-    blog_dir = Path("src/content/blog")
-    
-    if not blog_dir.exists():
-        print(f"错误：博客目录 {blog_dir} 不存在")
+    if not BLOG_DIR.exists():
+        print(f"错误：博客目录 {BLOG_DIR} 不存在")
         return None
     
-    # 查找包含文章标题的目录
-    for item in blog_dir.iterdir():
-        if item.is_dir() and article_title in item.name:
-            index_file = item / "index.md"
-            if index_file.exists():
-                return index_file
-    
-    # 如果没有找到，尝试查找直接匹配的目录
-    potential_dirs = [d for d in blog_dir.iterdir() 
-                     if d.is_dir() and article_title.lower() in d.name.lower()]
-    
-    if potential_dirs:
-        index_file = potential_dirs[0] / "index.md"
-        if index_file.exists():
-            return index_file
-    
-    return None
+    index = get_index()
+    article_path = index.lookup(article_title, dirs_only=True)
+    if article_path is None:
+        for path, score in index.search(article_title, limit=3, dirs_only=True):
+            print(f"   你是不是要找: {path.parent.name}（相似度 {score:.2f}）")
+    return article_path
 
 
-def read_article_content(article_title: str) -> str:
+def read_article_body(article_path: Path) -> str:
     """
-    读取文章内容
+    读取文章正文（去掉frontmatter）
     
     Args:
-        article_title: 文章标题
+        article_path: 文章 index.md 路径
         
     Returns:
         文章内容字符串
     """
-    article_path = find_article_path(article_title)
-    
-    if not article_path:
-        raise FileNotFoundError(f"未找到文章: {article_title}")
-    
-    print(f"找到文章文件: {article_path}")
-    
     try:
         with open(article_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -163,7 +173,11 @@ def generate_description(content: str) -> str:
     
     print("正在生成图片描述...")
     
+    limiter = limiter_for(ARK_BASE_URL, TEXT_MODEL)
+    estimated = estimate_tokens(data["messages"], data["max_tokens"])
+    
     try:
+        limiter.acquire(estimated)
         response = requests.post(
             f"{ARK_BASE_URL}/chat/completions",
             headers=headers,
@@ -171,8 +185,11 @@ def generate_description(content: str) -> str:
             timeout=30
         )
         
+        if response.status_code == 429:
+            limiter.pause(retry_after_seconds(response.headers))
         response.raise_for_status()
         result = response.json()
+        limiter.settle(estimated, (result.get("usage") or {}).get("total_tokens"))
         
         if "choices" in result and len(result["choices"]) > 0:
             description = result["choices"][0]["message"]["content"].strip()
@@ -187,6 +204,82 @@ def generate_description(content: str) -> str:
         raise Exception(f"解析API响应失败: {e}")
 
 
+def build_description_from_analysis(analysis: Dict) -> str:
+    """
+    根据 ai_analysis 缓存的文章分析在本地构建绘图描述（不调用文本模型）
+    
+    Args:
+        analysis: ArticleAnalysis 字典
+        
+    Returns:
+        适合AI文生图的描述
+    """
+    style = analysis.get("style") or {}
+    tone = {k: v for k, v in (style.get("tone") or {}).items() if isinstance(v, (int, float))}
+    painter = TONE_STYLES.get(max(tone, key=tone.get) if tone else "", "莫奈风")
+    
+    sentiment = analysis.get("sentiment") or {}
+    score = sentiment.get("score")
+    if score is None:
+        light = "柔和而安静的光线"
+    elif score >= 0.6:
+        light = "温暖明亮的光线洒落"
+    elif score < 0:
+        light = "低沉的冷色调与阴影笼罩"
+    else:
+        light = "明暗交织、略带朦胧的光线"
+    
+    content = analysis.get("content") or {}
+    symbols = list(dict.fromkeys((content.get("concepts") or [])[:3] + (content.get("keywords") or [])[:3]))
+    structure = analysis.get("structure") or {}
+    
+    parts = [f"{painter}的画面，以「{analysis.get('title', '')}」为主题，{light}"]
+    if sentiment.get("label"):
+        parts.append(f"整体情绪是{sentiment['label']}")
+    if style.get("rhythm"):
+        parts.append(f"画面节奏{style['rhythm']}")
+    if symbols:
+        parts.append(f"以隐喻的方式融入{'、'.join(symbols)}等象征元素")
+    if structure.get("pattern"):
+        parts.append(f"构图呈现「{structure['pattern']}」的叙事流动")
+    if structure.get("closing"):
+        parts.append(f"余韵落在“{structure['closing']}”的意境")
+    return "，".join(parts) + "。富有叙事氛围和画面感，专注情绪传达，画面中不出现文字。"
+
+
+def describe_article(article_path: Path) -> str:
+    """
+    获取文章的绘图描述：描述缓存 → 已缓存的文章分析（本地构建）→ 文本模型
+    
+    Args:
+        article_path: 文章路径
+        
+    Returns:
+        图片描述
+    """
+    _, body = parse_frontmatter_and_body(article_path)
+    body_md5 = md5_hash_text(body)
+    cache_file = COVER_CACHE_DIR / f"{body_md5}.json"
+    
+    cached = safe_load_json(cache_file)
+    if cached and cached.get("description"):
+        print(f"命中描述缓存: {article_path.parent.name}")
+        return cached["description"]
+    
+    analysis = load_cached_analysis(article_path, body_md5)
+    if analysis:
+        print("复用 ai_analysis 已缓存的文章分析，本地构建描述（跳过文本模型调用）")
+        description = build_description_from_analysis(analysis)
+        source = "analysis"
+        print(f"生成的描述: {description}")
+    else:
+        description = generate_description(read_article_body(article_path))
+        source = "llm"
+    
+    safe_write_json(cache_file, {"description": description, "source": source})
+    return description
+
+
 def generate_image(description: str) -> str:
     """
     调用图像API生成图片
@@ -213,7 +306,11 @@ def generate_image(description: str) -> str:
     
     print("正在生成封面图片...")
     
+    # 图像接口只按请求数限流
+    limiter = limiter_for(ARK_BASE_URL, IMAGE_MODEL)
+    
     try:
+        limiter.acquire()
         response = requests.post(
             f"{ARK_BASE_URL}/images/generations",
             headers=headers,
@@ -221,6 +318,8 @@ def generate_image(description: str) -> str:
             timeout=60
         )
         
+        if response.status_code == 429:
+            limiter.pause(retry_after_seconds(response.headers))
         response.raise_for_status()
         result = response.json()
         
@@ -254,9 +353,36 @@ def download_and_save_image(image_url: str, article_title: str) -> bool:
         print(f"错误：未找到文章目录")
         return False
     
-    # 确定保存路径
-    article_dir = article_path.parent
+    try:
+        save_path = save_cover(image_url, article_path.parent)
+        color = cover_color(save_path)
+        if color:
+            print(f"📝 建议在文章frontmatter中添加: heroImage: {{ src: './{save_path.name}', color: '{color}' }}")
+            print("   或运行 python scripts/process_covers.py --update-frontmatter 自动写入主色与占位图")
+        else:
+            print(f"📝 建议在文章frontmatter中添加: heroImage: {{ src: './{save_path.name}', color: '#9698C1' }}")
+        return True
+    
+    except requests.exceptions.RequestException as e:
+        print(f"下载图片失败: {e}")
+        return False
+    except Exception as e:
+        print(f"保存图片失败: {e}")
+        return False
+
+
+def save_cover(image_url: str, article_dir: Path) -> Path:
+    """
+    流式下载图片到临时文件，完成后原子重命名为文章目录下的 cover.<ext>，
+    安装了 Pillow 时随即生成占位图与主色（见 process_covers.py）
     
+    Args:
+        image_url: 图片URL
+        article_dir: 文章目录
+        
+    Returns:
+        保存路径（失败时抛出异常）
+    """
     # 从URL获取文件扩展名，默认使用jpg
     parsed_url = urlparse(image_url)
     file_extension = os.path.splitext(parsed_url.path)[1] or '.jpg'
@@ -264,25 +390,172 @@ def download_and_save_image(image_url: str, article_title: str) -> bool:
     
     print(f"正在下载图片到: {save_path}")
     
+    # 流式下载，不在内存中缓冲整张图片；中断时不会留下半张 cover
+    tmp_path = article_dir / f".{save_path.name}.part"
     try:
-        # 下载图片
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-        
-        # 保存文件
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
+        with requests.get(image_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        os.replace(tmp_path, save_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    
+    print(f"✅ 封面图片保存成功: {save_path}")
+    
+    if pillow_available():
+        sidecar = process_cover(save_path, force=True)
+        print(f"🖼️  已生成占位图与主色 {sidecar['color']}: {save_path.with_name('cover.json')}")
+    else:
+        print("提示：安装 Pillow 后可生成占位图与主色（pip install Pillow）")
+    return save_path
+
+
+def cover_color(save_path: Path) -> Optional[str]:
+    """
+    读取 process_covers.py 从封面提取的主色
+    
+    Args:
+        save_path: 封面路径
         
-        print(f"✅ 封面图片保存成功: {save_path}")
-        print(f"📝 建议在文章frontmatter中添加: heroImage: {{ src: './cover{file_extension}', color: '#9698C1' }}")
-        return True
+    Returns:
+        十六进制主色，未生成侧车文件时返回None
+    """
+    try:
+        return json.loads(save_path.with_name("cover.json").read_text(encoding="utf-8")).get("color")
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def find_articles_without_cover() -> List[Path]:
+    """
+    扫描博客目录，返回缺少 cover.* 的目录型文章
     
-    except requests.exceptions.RequestException as e:
-        print(f"下载图片失败: {e}")
-        return False
-    except Exception as e:
-        print(f"保存图片失败: {e}")
-        return False
+    Returns:
+        文章 index.md 路径列表（按目录名排序）
+    """
+    articles = []
+    for index_file in sorted(BLOG_DIR.glob("*/index.md")):
+        article_dir = index_file.parent
+        if any(article_dir.glob("cover.*")):
+            continue
+        # 已经指定远程封面的文章不重复生成
+        frontmatter = index_file.read_text(encoding='utf-8').split('---', 2)[1:2]
+        if frontmatter and re.search(r"heroImage:\s*\{?\s*src:\s*'https?://", frontmatter[0]):
+            print(f"跳过（已有远程封面）: {article_dir.name}")
+            continue
+        articles.append(index_file)
+    return articles
+
+
+class CoverJobState:
+    """批量任务状态（描述/图片URL/完成标记），每次更新后原子写入，支持续跑"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            self.jobs: Dict[str, Dict] = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, json.JSONDecodeError):
+            self.jobs = {}
+    
+    def get(self, key: str) -> Dict:
+        with self.lock:
+            return dict(self.jobs.get(key, {}))
+    
+    def update(self, key: str, **fields) -> None:
+        with self.lock:
+            self.jobs.setdefault(key, {}).update(fields)
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            tmp.write_text(json.dumps(self.jobs, ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(tmp, self.path)
+
+
+def run_batch(articles: List[Path], text_workers: int, image_workers: int, download_workers: int) -> Tuple[int, int]:
+    """
+    流水线批量生成封面：每个阶段一个独立并发度的线程池，
+    一篇文章完成上一阶段后立即进入下一阶段，总耗时约等于最慢阶段的耗时
+    
+    Args:
+        articles: 文章 index.md 路径列表
+        text_workers: 描述生成并发数
+        image_workers: 图像生成并发数
+        download_workers: 下载并发数
+        
+    Returns:
+        (成功数, 失败数)
+    """
+    state = CoverJobState(JOB_STATE_PATH)
+    text_pool = ThreadPoolExecutor(max_workers=text_workers)
+    image_pool = ThreadPoolExecutor(max_workers=image_workers)
+    download_pool = ThreadPoolExecutor(max_workers=download_workers)
+    
+    lock = threading.Lock()
+    all_done = threading.Event()
+    counts = {"pending": len(articles), "ok": 0, "failed": 0}
+    
+    def finish(name: str, error: Optional[BaseException] = None) -> None:
+        with lock:
+            if error is None:
+                counts["ok"] += 1
+            else:
+                counts["failed"] += 1
+                print(f"❌ {name}: {error}")
+            counts["pending"] -= 1
+            if counts["pending"] == 0:
+                all_done.set()
+    
+    def describe(article_path: Path) -> str:
+        key = article_path.parent.name
+        job = state.get(key)
+        if job.get("description"):
+            return job["description"]
+        description = describe_article(article_path)
+        state.update(key, description=description)
+        return description
+    
+    def draw(key: str, description: str) -> str:
+        job = state.get(key)
+        if job.get("image_url"):
+            return job["image_url"]
+        image_url = generate_image(description)
+        state.update(key, image_url=image_url)
+        return image_url
+    
+    def download(article_path: Path, image_url: str) -> Path:
+        key = article_path.parent.name
+        try:
+            save_path = save_cover(image_url, article_path.parent)
+        except Exception:
+            # 图片URL有时效，失败后清除，下次重新生图
+            state.update(key, image_url=None)
+            raise
+        state.update(key, done=True, cover=save_path.name)
+        return save_path
+    
+    def on_described(article_path: Path, fut: Future) -> None:
+        if fut.exception():
+            return finish(article_path.parent.name, fut.exception())
+        image_pool.submit(draw, article_path.parent.name, fut.result()).add_done_callback(
+            lambda f: on_drawn(article_path, f))
+    
+    def on_drawn(article_path: Path, fut: Future) -> None:
+        if fut.exception():
+            return finish(article_path.parent.name, fut.exception())
+        download_pool.submit(download, article_path, fut.result()).add_done_callback(
+            lambda f: finish(article_path.parent.name, f.exception()))
+    
+    if not articles:
+        return 0, 0
+    for article_path in articles:
+        text_pool.submit(describe, article_path).add_done_callback(
+            lambda f, p=article_path: on_described(p, f))
+    
+    all_done.wait()
+    for pool in (text_pool, image_pool, download_pool):
+        pool.shutdown()
+    return counts["ok"], counts["failed"]
 
 
 def main():
@@ -293,17 +566,32 @@ def main():
         epilog="""
 使用示例:
   python generate_cover_image.py "astro博客迁移"
+  python generate_cover_image.py --all --image-workers 2
   
 环境变量:
   ARK_API_KEY - 火山引擎API密钥
         """
     )
     
-    # 必需参数
-    parser.add_argument('title', help='文章标题（目录名称的一部分）')
+    parser.add_argument('title', nargs='?', default='', help='文章标题（目录名称的一部分）')
+    parser.add_argument('--all', action='store_true', help='批量为所有缺少 cover.* 的文章生成封面（可续跑）')
+    parser.add_argument('--text-workers', type=int, default=4, help='批量模式：描述生成并发数')
+    parser.add_argument('--image-workers', type=int, default=2, help='批量模式：图像生成并发数')
+    parser.add_argument('--download-workers', type=int, default=4, help='批量模式：下载并发数')
     
     args = parser.parse_args()
     
+    if args.all:
+        articles = find_articles_without_cover()
+        print(f"🎨 批量生成封面: {len(articles)} 篇文章缺少封面")
+        print("=" * 50)
+        ok, failed = run_batch(articles, args.text_workers, args.image_workers, args.download_workers)
+        print(f"\n🎉 批量完成: 成功 {ok} 篇，失败 {failed} 篇")
+        if failed:
+            print(f"失败的任务可直接重新运行续跑（状态文件: {JOB_STATE_PATH}）")
+            sys.exit(1)
+        return
+    
     # 参数验证
     if not args.title.strip():
         print("错误：文章标题不能为空")
@@ -317,13 +605,17 @@ def main():
     try:
         # 步骤1：读取文章内容
         print("📖 步骤1: 读取文章内容...")
-        content = read_article_content(title)
+        article_path = find_article_path(title)
+        if not article_path:
+            raise FileNotFoundError(f"未找到文章: {title}")
+        print(f"找到文章文件: {article_path}")
+        content = read_article_body(article_path)
         if len(content) < 100:
             print("⚠️  警告：文章内容较短，可能影响描述生成质量")
         
-        # 步骤2：生成图片描述
+        # 步骤2：生成图片描述（优先复用缓存的文章分析）
         print("\n🤖 步骤2: 生成图片描述...")
-        description = generate_description(content)
+        description = describe_article(article_path)
         
         # 步骤3：生成图片
         print("\n🎨 步骤3: 生成封面图片...")
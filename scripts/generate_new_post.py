@@ -7,6 +7,7 @@
 - 自动生成前置元数据
 - 随机莫兰迪配色
 - 自动填充当前日期
+- 通过文章索引（article_index.py）检查 slug 冲突与重复标题
 """
 
 import argparse
@@ -15,6 +16,8 @@ import os
 import random
 import sys
 
+from article_index import BLOG_DIR, get_index
+
 # 莫兰迪配色数组
 MORANDI_COLORS = [
     '#64574D',  # 温暖棕色
@@ -65,15 +68,38 @@ language: 'Chinese'
     return frontmatter
 
 
+def check_conflicts(title):
+    """
+    检查新文章是否与已有文章冲突
+
+    单文件与目录模式生成的路由相同，任一形式已存在同 slug 即视为冲突；
+    标题相同只给出提示
+
+    Args:
+        title: 文章标题
+
+    Returns:
+        是否可以创建
+    """
+    index = get_index()
+    slug = f"{get_today_date()}-{title}"
+    if index.has_slug(slug):
+        print(f"错误：已存在 slug 为 {slug} 的文章")
+        return False
+    for path, score in index.search(title, limit=3):
+        if score >= 1.0:
+            print(f"⚠️  提示：已有同名文章 {path}")
+    return True
+
+
 def create_single_file(title):
     """创建单文件模式的博客文章"""
     # 文件路径
-    blog_dir = "src/content/blog"
+    blog_dir = str(BLOG_DIR)
     file_path = os.path.join(blog_dir, f"{get_today_date()}-{title}.md")
     
-    # 检查文件是否已存在
-    if os.path.exists(file_path):
-        print(f"错误：文件 {file_path} 已存在")
+    # 检查是否与已有文章冲突
+    if not check_conflicts(title):
         return False
     
     # 生成内容
@@ -88,6 +114,7 @@ def create_single_file(title):
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        get_index().add(BLOG_DIR / f"{get_today_date()}-{title}.md")
         print(f"成功创建单文件: {file_path}")
         return True
     except Exception as e:
@@ -98,13 +125,12 @@ def create_single_file(title):
 def create_directory_structure(title):
     """创建目录模式的博客文章"""
     # 目录路径
-    blog_dir = "src/content/blog"
+    blog_dir = str(BLOG_DIR)
     article_dir = os.path.join(blog_dir, f"{get_today_date()}-{title}")
     index_path = os.path.join(article_dir, "index.md")
     
-    # 检查目录是否已存在
-    if os.path.exists(article_dir):
-        print(f"错误：目录 {article_dir} 已存在")
+    # 检查是否与已有文章冲突
+    if not check_conflicts(title):
         return False
     
     # 生成内容
@@ -119,6 +145,7 @@ def create_directory_structure(title):
         with open(index_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        get_index().add(BLOG_DIR / f"{get_today_date()}-{title}" / "index.md")
         print(f"成功创建目录结构:")
         print(f"  - 目录: {article_dir}")
         print(f"  - 文件: {index_path}")
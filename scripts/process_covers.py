@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+封面图后处理脚本
+
+功能：
+- 生成极小的 LQIP 占位图（base64 data URI，几百字节）
+- NumPy 向量化 k-means 提取主色与调色板（缩略图像素上聚类）
+- 结果写入同目录的 cover.json 侧车文件（尺寸、占位图、主色与调色板）
+- 可选把主色与占位图回写到文章 frontmatter 的 heroImage（color / placeholder）
+- 批量处理 src/content/blog 下的所有封面，多进程并行；源图未变化时自动跳过
+
+多尺寸 WebP/AVIF 版本不在这里生成：Hero.astro 与 PostPreview.astro 通过 astro:assets 的
+<Picture> 在构建时输出 320/640/1024 宽的 AVIF/WebP srcset，封面原图保持不变。
+
+依赖安装：
+  pip install Pillow
+
+使用示例：
+  python process_covers.py
+  python process_covers.py --force --workers 4
+  python process_covers.py --update-frontmatter
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # 可选依赖
+    Image = None
+
+
+# 路径（不依赖当前工作目录）
+BLOG_DIR = Path(__file__).resolve().parent.parent / "src" / "content" / "blog"
+
+# 输出配置
+LQIP_WIDTH = 16
+PALETTE_SIZE = 5
+PALETTE_SAMPLE = 64  # 聚类前缩到 64x64，共 4096 个像素
+SIDECAR_NAME = "cover.json"
+SOURCE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def pillow_available() -> bool:
+    """Pillow 是否可用"""
+    return Image is not None
+
+
+def find_covers(blog_dir: Path = BLOG_DIR) -> List[Path]:
+    """
+    查找博客目录下所有原始封面（cover.jpg/jpeg/png/webp）
+
+    Returns:
+        封面路径列表
+    """
+    return sorted(
+        p for p in blog_dir.glob("*/cover.*")
+        if p.suffix.lower() in SOURCE_SUFFIXES
+    )
+
+
+def _file_md5(path: Path) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_lqip(img) -> str:
+    """
+    生成极小的模糊占位图
+
+    Args:
+        img: 已转换为 RGB 的 PIL 图像
+
+    Returns:
+        data URI 字符串
+    """
+    height = max(1, round(img.height * LQIP_WIDTH / img.width))
+    tiny = img.resize((LQIP_WIDTH, height), Image.Resampling.BOX)
+    buf = io.BytesIO()
+    tiny.save(buf, format="WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def _to_hex(rgb) -> str:
+    return "#" + "".join(f"{int(round(c)):02X}" for c in rgb)
+
+
+def dominant_palette(img, k: int = PALETTE_SIZE, iterations: int = 12) -> List[Tuple[str, float]]:
+    """
+    k-means 提取调色板（固定随机种子，结果可复现）
+
+    Args:
+        img: 已转换为 RGB 的 PIL 图像
+        k: 聚类数
+        iterations: 最大迭代次数
+
+    Returns:
+        [(十六进制颜色, 像素占比)]，按占比从大到小排序，第一个即主色
+    """
+    small = img.resize((PALETTE_SAMPLE, PALETTE_SAMPLE), Image.Resampling.BOX)
+    pixels = np.asarray(small, dtype=np.float32).reshape(-1, 3)
+    rng = np.random.default_rng(0)
+
+    # k-means++ 初始化：按到已选中心距离的平方加权抽样
+    centers = pixels[rng.integers(len(pixels))][None, :]
+    for _ in range(1, k):
+        dist = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        if dist.sum() == 0:
+            break  # 纯色图
+        centers = np.vstack([centers, pixels[rng.choice(len(pixels), p=dist / dist.sum())]])
+
+    for _ in range(iterations):
+        labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers)).astype(np.float32)
+        sums = np.stack(
+            [np.bincount(labels, weights=pixels[:, c], minlength=len(centers)) for c in range(3)], axis=1
+        )
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(updated, centers, atol=0.5):
+            break
+        centers = updated
+
+    labels = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    counts = np.bincount(labels, minlength=len(centers))
+    order = np.argsort(-counts)
+    return [(_to_hex(centers[i]), round(float(counts[i]) / len(pixels), 3)) for i in order if counts[i]]
+
+
+def process_cover(cover_path: Path, force: bool = False) -> Optional[Dict]:
+    """
+    为单个封面生成占位图、调色板和侧车文件
+
+    Args:
+        cover_path: 原始封面路径
+        force: 即使源图未变化也重新生成
+
+    Returns:
+        侧车文件内容；源图未变化而跳过时返回 None
+    """
+    if not pillow_available():
+        raise RuntimeError("未安装 Pillow，请运行: pip install Pillow")
+
+    sidecar_path = cover_path.with_name(SIDECAR_NAME)
+    source_md5 = _file_md5(cover_path)
+    if not force and sidecar_path.exists():
+        try:
+            previous = json.loads(sidecar_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            previous = {}
+        if previous.get("source", {}).get("md5") == source_md5 and previous.get("color"):
+            return None
+
+    with Image.open(cover_path) as opened:
+        img = opened.convert("RGB")
+
+    palette = dominant_palette(img)
+    sidecar = {
+        "source": {"path": cover_path.name, "md5": source_md5, "bytes": cover_path.stat().st_size},
+        "width": img.width,
+        "height": img.height,
+        "color": palette[0][0],
+        "palette": [{"color": color, "share": share} for color, share in palette],
+        "lqip": make_lqip(img),
+    }
+    # 保留其他步骤（如主色提取）写入的字段
+    if sidecar_path.exists():
+        try:
+            existing = json.loads(sidecar_path.read_text(encoding="utf-8"))
+            existing.pop("variants", None)  # 旧版本生成的多尺寸文件列表，已不再产出
+            sidecar = {**existing, **sidecar}
+        except (OSError, json.JSONDecodeError):
+            pass
+    tmp = sidecar_path.with_name(f".{sidecar_path.name}.tmp")
+    tmp.write_text(json.dumps(sidecar, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, sidecar_path)
+    return sidecar
+
+
+def _set_flow_key(mapping: str, key: str, value: str) -> str:
+    """在 YAML 行内映射 `{ src: ..., color: ... }` 的内容中设置一个字符串键"""
+    pattern = re.compile(rf"(\b{key}:\s*)(?:'[^']*'|\"[^\"]*\"|[^,}}\s](?:[^,}}]*[^,}}\s])?)")
+    if pattern.search(mapping):
+        return pattern.sub(lambda m: f"{m.group(1)}'{value}'", mapping, count=1)
+    return f"{mapping.rstrip()}, {key}: '{value}' "
+
+
+def update_frontmatter(index_path: Path, color: str, placeholder: Optional[str]) -> bool:
+    """
+    把主色和占位图写回文章 frontmatter 的 heroImage（仅限使用本地 cover.* 的文章）
+
+    Args:
+        index_path: 文章 index.md 路径
+        color: 主色
+        placeholder: 占位图 data URI
+
+    Returns:
+        文件是否被修改
+    """
+    text = index_path.read_text(encoding="utf-8")
+    fm = re.match(r"^---\n.*?\n---", text, flags=re.DOTALL)
+    if not fm:
+        return False
+    hero = re.search(r"(heroImage:\s*\{)([^}]*)(\})", fm.group(0))
+    if not hero or not re.search(r"src:\s*['\"]?(\./)?cover\.", hero.group(2)):
+        return False
+    mapping = _set_flow_key(hero.group(2), "color", color)
+    if placeholder:
+        mapping = _set_flow_key(mapping, "placeholder", placeholder)
+    new_fm = fm.group(0)[: hero.start(2)] + mapping + fm.group(0)[hero.end(2):]
+    if new_fm == fm.group(0):
+        return False
+    tmp = index_path.with_name(f".{index_path.name}.tmp")
+    tmp.write_text(new_fm + text[fm.end():], encoding="utf-8")
+    os.replace(tmp, index_path)
+    return True
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="封面图占位图/主色提取工具")
+    parser.add_argument("--force", action="store_true", help="忽略侧车文件，全部重新生成")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="并行进程数")
+    parser.add_argument("--update-frontmatter", action="store_true",
+                        help="把主色和占位图写回文章 frontmatter 的 heroImage")
+    args = parser.parse_args()
+
+    if not pillow_available():
+        print("错误：未安装 Pillow")
+        print("请安装依赖：pip install Pillow")
+        sys.exit(1)
+
+    covers = find_covers()
+    print(f"🖼️  找到 {len(covers)} 张封面")
+    print("=" * 50)
+
+    processed = skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(process_cover, c, args.force) for c in covers]
+        for cover_path, fut in zip(covers, futures):
+            try:
+                result = fut.result()
+            except Exception as e:  # noqa: BLE001 - 单张失败不影响其余封面
+                failed += 1
+                print(f"❌ {cover_path.parent.name}: {e}")
+                continue
+            if result is None:
+                skipped += 1
+                continue
+            processed += 1
+            print(f"✅ {cover_path.parent.name}: {result['width']}x{result['height']}，"
+                  f"主色 {result['color']}，占位图 {len(result['lqip'])} 字节")
+
+    if args.update_frontmatter:
+        updated = 0
+        for cover_path in covers:
+            index_path = cover_path.with_name("index.md")
+            try:
+                sidecar = json.loads(cover_path.with_name(SIDECAR_NAME).read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            if index_path.exists() and sidecar.get("color"):
+                updated += update_frontmatter(index_path, sidecar["color"], sidecar.get("lqip"))
+        print(f"📝 已更新 {updated} 篇文章的 heroImage 主色与占位图")
+
+    print(f"\n🎉 完成: 处理 {processed}，跳过 {skipped}（未变化），失败 {failed}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,7 +28,9 @@ const blog = defineCollection({
           width: z.number().optional(),
           height: z.number().optional(),
 
-          color: z.string().optional()
+          color: z.string().optional(),
+          // Tiny data URI painted until the cover loads (scripts/process_covers.py)
+          placeholder: z.string().optional()
         })
         .optional(),
       tags: z.array(z.string()).default([]).transform(removeDupsAndLowerCase),